@@ -0,0 +1,349 @@
+"""Backtest historique de la stratégie crypto
+
+Rejoue sur un historique de bougies les règles exactes du bot :
+    - indicateurs du graphe du bot (indicator_graph) sur toute la série
+      (EMAs et SuperTrend récurrents, OBV/VWAP cumulés sur CANDLE_HISTORY bougies)
+    - signaux LONG/SHORT par signal_rules de main.py, la fonction de get_signal,
+      appliquée aux tableaux (confirmation par les timeframes supérieurs comprise)
+    - taille, P&L et sorties via position_size, trade_pnl et evaluate_exit de main.py
+Les décisions sont prises à la clôture de chaque bougie, avec une horloge
+simulée (clôture = timestamp + intervalle) à la place de datetime.now().
+Les stops (initial, trailing) sont surveillés en continu par le bot : le
+backtest les teste d'abord au plus bas (LONG) / plus haut (SHORT) de la bougie
+et exécute au niveau du stop (à l'ouverture si elle l'a déjà franchi), puis
+applique les autres règles à la clôture.
+
+Les trades sont écrits dans une base au même schéma que la base live :
+    python backtest.py --csv-dir data/ --out backtest.db
+    python backtest.py --store candles/ --out backtest.db       # archive locale du bot
+    python backtest.py --synthetic 105120 --out backtest.db   # 1 an de 5m, données synthétiques
+    ./view_history.sh backtest.db
+
+Format CSV : une ligne par bougie, colonnes timestamp (ms), open, high, low, close, volume,
+un fichier <ACTIF>.csv par actif (voir la commande download).
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import main as bot
+from candle_buffer import COLUMNS, INTERVAL_MS
+from candle_store import CandleStore
+from indicator_engine import MIN_CANDLES
+from resample import first_complete_bucket
+from indicator_graph import IndicatorGraph
+
+LONG, SHORT = 1, -1
+
+
+# ==================== INDICATEURS ====================
+def indicator_frame(df, window=bot.CANDLE_HISTORY):
+    """Indicateurs de chaque bougie de df (une ligne par bougie, mêmes clés que calculate_all_indicators)
+
+    Graphe d'indicateurs du bot (indicator_graph) sur toute la série, OBV et
+    VWAP cumulés sur les window dernières bougies ; plus les OHLC (sorties
+    en cours de bougie) et la tendance de chaque timeframe supérieur.
+    """
+    df = df.reset_index(drop=True)
+    frame = IndicatorGraph(df[COLUMNS[1:]].astype(np.float64), window).frame()
+    for name in ("open", "high", "low"):
+        frame[name] = df[name].to_numpy(np.float64)
+
+    # === Timeframes supérieurs (tendance vue à chaque bougie, bougie supérieure en cours comprise) ===
+    for interval in bot.HIGHER_TIMEFRAMES:
+        frame[f"trend_{interval}"] = higher_timeframe_trend(df, interval)
+
+    frame.insert(0, "timestamp", df["timestamp"].to_numpy(np.int64))
+    return frame
+
+
+def higher_timeframe_trend(df, interval):
+    """Tendance EMA8/EMA21 du timeframe supérieur à chaque bougie : "UP", "DOWN", None pendant la chauffe
+
+    Comme add_higher_timeframes : tranches complètes uniquement, EMAs récurrentes
+    sur les bougies supérieures clôturées, prolongées par la bougie en cours.
+    """
+    interval_ms = INTERVAL_MS[interval]
+    ts = df["timestamp"].to_numpy(np.int64)
+    close = df["close"].to_numpy(np.float64)
+    trend = np.full(len(ts), None, dtype=object)
+    if len(ts) == 0:
+        return trend
+    first = np.searchsorted(ts, first_complete_bucket(int(ts[0]), interval_ms))
+    ts, close = ts[first:], close[first:]
+    if len(ts) == 0:
+        return trend
+
+    buckets = ts - ts % interval_ms
+    new_bar = np.r_[True, buckets[1:] != buckets[:-1]]
+    bar = np.cumsum(new_bar) - 1                                        # Bougie supérieure de chaque bougie
+    bar_close = close[np.r_[np.flatnonzero(new_bar)[1:], len(ts)] - 1]  # Clôture de chaque bougie supérieure
+    emas = []
+    for span in (8, 21):
+        alpha = 2 / (span + 1)
+        closed = pd.Series(bar_close).ewm(span=span, adjust=False).mean().to_numpy()
+        previous = np.r_[np.nan, closed[:-1]][bar]
+        emas.append(np.where(bar == 0, close, (1 - alpha) * previous + alpha * close))
+
+    current = np.where(emas[0] > emas[1], "UP", "DOWN").astype(object)
+    current[bar < MIN_CANDLES - 1] = None
+    trend[first:] = current
+    return trend
+
+
+MTF_COLUMNS = tuple(f"trend_{interval}" for interval in bot.HIGHER_TIMEFRAMES)
+SIGNAL_COLUMNS = ("price", "rsi", "ema8", "ema21", "ema50", "macd", "macd_signal", "macd_histogram",
+                  "stoch_k", "stoch_d", "bb_upper", "bb_lower", "volume_ratio", "supertrend_dir")
+PRICE_COLUMNS = ("open", "high", "low")
+
+
+def signal_arrays(columns, params=None):
+    """Signaux de chaque bougie par les règles du bot (signal_rules) : (signal ±1/0, bull_score, bear_score)
+
+    columns : DataFrame d'indicateurs ou dict {colonne: tableau}, de forme quelconque.
+    """
+    col = {name: np.asarray(columns[name]) for name in SIGNAL_COLUMNS + MTF_COLUMNS}
+    with np.errstate(invalid="ignore"):
+        long_ok, short_ok, bull_score, bear_score = bot.signal_rules(col, params)
+    signal = np.where(long_ok, LONG, np.where(short_ok, SHORT, 0)).astype(np.int8)
+    return signal, bull_score, bear_score
+
+
+# ==================== SIMULATION ====================
+def market_arrays(frames):
+    """Aligne les actifs sur une timeline commune (tableaux actifs × bougies, en lecture seule)
+
+    Les bougies absentes ont un prix NaN et des indicateurs NaN (aucun signal).
+    """
+    assets = list(frames)
+    timeline = np.unique(np.concatenate([f["timestamp"].to_numpy(np.int64) for f in frames.values()]))
+    shape = (len(assets), len(timeline))
+    rows = np.full(shape, -1)
+    columns = {name: np.full(shape, np.nan) for name in SIGNAL_COLUMNS + PRICE_COLUMNS}
+    columns.update({name: np.full(shape, None, dtype=object) for name in MTF_COLUMNS})
+    for a, asset in enumerate(assets):
+        f = frames[asset]
+        idx = np.searchsorted(timeline, f["timestamp"].to_numpy(np.int64))
+        rows[a, idx] = np.arange(len(f))
+        for name in SIGNAL_COLUMNS + PRICE_COLUMNS:
+            columns[name][a, idx] = f[name].to_numpy(np.float64)
+        for name in MTF_COLUMNS:
+            columns[name][a, idx] = f[name].to_numpy(object)
+    return {"assets": assets, "timeline": timeline, "rows": rows, "columns": columns}
+
+
+def intrabar_stop(pos, open_, high, low, duration, params):
+    """Stop touché pendant la bougie : (raison, prix d'exécution) ou (None, None)
+
+    Règles d'evaluate_exit au prix le plus défavorable de la bougie (plus bas
+    LONG, plus haut SHORT), avec la durée et le trailing stop du début de la
+    bougie ; exécution au niveau du stop, ou à l'ouverture si elle l'a déjà franchi.
+    """
+    long = pos["side"] == "LONG"
+    reason = bot.evaluate_exit(dict(pos), low if long else high, duration, params)
+    if reason == "Trailing Stop":
+        level = pos["trailing_stop"]
+    elif reason == "Stop-Loss Initial":
+        level = bot.initial_stop(pos, params)
+    else:
+        return None, None
+    return reason, min(level, open_) if long else max(level, open_)
+
+
+def run_backtest(frames=None, params=None, interval=bot.CANDLE_INTERVAL, initial_capital=bot.INITIAL_CAPITAL,
+                 cur=None, market=None):
+    """Simule le portefeuille sur les bougies de plusieurs actifs
+
+    frames : {actif: DataFrame d'indicateurs (indicator_frame)}, traités dans l'ordre du dict.
+    market : tableaux alignés déjà calculés (market_arrays), à la place de frames.
+    cur : curseur SQLite optionnel où écrire les trades (schéma de la table trades, frames requis).
+    Retourne un dict de résultats (capital, trades, win rate, drawdown, ...).
+    """
+    p = params or bot.strategy_params()
+    interval_ms = INTERVAL_MS[interval]
+    market = market or market_arrays(frames)
+    assets, timeline, rows = market["assets"], market["timeline"], market["rows"]
+    prices = market["columns"]["price"]
+    opens, highs, lows = (market["columns"][name] for name in PRICE_COLUMNS)
+    volume_ratios = market["columns"]["volume_ratio"]
+
+    signals, bull_scores, bear_scores = signal_arrays(market["columns"], p)
+    signals[rows < MIN_CANDLES - 1] = 0  # Pas d'indicateurs avant MIN_CANDLES bougies
+
+    capital = float(initial_capital)
+    peak = capital
+    max_drawdown = 0.0
+    positions = {}    # {indice actif: position}
+    pnls = []
+
+    # Seules les bougies avec un signal ou une position ouverte demandent du travail
+    has_signal = (signals != 0).any(axis=0)
+    for i in range(len(timeline)):
+        if not positions and not has_signal[i]:
+            continue
+        close_ms = int(timeline[i]) + interval_ms   # Horloge simulée : clôture de la bougie
+        candidates = []
+        for a in range(len(assets)):
+            price = prices[a, i]
+            if np.isnan(price):
+                continue
+            pos = positions.get(a)
+            if pos is not None:
+                duration = (close_ms - pos["entry_ms"]) / 60000
+                reason, fill = intrabar_stop(pos, opens[a, i], highs[a, i], lows[a, i], duration - interval_ms / 60000, p)
+                if reason is None:
+                    reason, fill = bot.evaluate_exit(pos, price, duration, p), price
+                if reason is not None:
+                    pnl_pct, pnl_usd = bot.trade_pnl(pos["side"], pos["entry_price"], fill, pos["size_usd"], p)
+                    capital += float(pnl_usd)
+                    peak = max(peak, capital)
+                    max_drawdown = max(max_drawdown, (peak - capital) / peak)
+                    pnls.append(pnl_usd)
+                    del positions[a]
+                    if cur is not None:
+                        cur.execute("""
+                            UPDATE trades
+                            SET exit_price = ?, pnl = ?, pnl_pct = ?, duration_minutes = ?,
+                                exit_reason = ?, status = 'CLOSED'
+                            WHERE id = ?
+                        """, (fill, pnl_usd, pnl_pct * 100, duration, reason, pos["id"]))
+                continue  # Pas de réouverture sur la bougie de sortie
+
+            if signals[a, i] != 0:
+                candidates.append(a)
+        
+        # Meilleurs signaux de la bougie dans la limite des positions (mêmes règles que open_best_signals)
+        slots = max(0, p["max_open_positions"] - len(positions))
+        ranked = sorted(candidates, reverse=True, key=lambda a: bot.signal_rank(
+            "LONG" if signals[a, i] == LONG else "SHORT", bull_scores[a, i], bear_scores[a, i], volume_ratios[a, i]))
+        for a in ranked[:slots]:
+            price = prices[a, i]
+            side = "LONG" if signals[a, i] == LONG else "SHORT"
+            size_usd, size_asset = bot.position_size(capital, price, p)
+            pos = {"side": side, "entry_price": price, "entry_ms": close_ms, "size_usd": size_usd,
+                   "highest_profit": 0.0, "trailing_stop": None, "id": None}
+            if cur is not None:
+                indicators = frames[assets[a]].iloc[rows[a, i]].to_dict()
+                indicators["bull_score"], indicators["bear_score"] = int(bull_scores[a, i]), int(bear_scores[a, i])
+                timestamp = datetime.fromtimestamp(close_ms / 1000, tz=timezone.utc).replace(tzinfo=None).isoformat()
+                cur.execute(bot.INSERT_TRADE_SQL, bot.trade_row(None, assets[a], timestamp, side, price, size_asset, indicators))
+                pos["id"] = cur.lastrowid
+            positions[a] = pos
+
+    pnls = np.asarray(pnls)
+    wins = int((pnls > 0).sum())
+    gross_loss = -pnls[pnls < 0].sum()
+    return {
+        "capital": capital,
+        "total_pnl": capital - initial_capital,
+        "total_trades": len(pnls),
+        "winning_trades": wins,
+        "win_rate": wins / len(pnls) * 100 if len(pnls) else 0.0,
+        "profit_factor": float(pnls[pnls > 0].sum() / gross_loss) if gross_loss > 0 else float("nan"),
+        "max_drawdown_pct": max_drawdown * 100,
+        "open_positions": len(positions),
+        "bars": len(timeline),
+    }
+
+
+# ==================== DONNÉES ====================
+def load_csv_dir(path, assets):
+    """Charge <path>/<ACTIF>.csv pour chaque actif présent"""
+    candles = {}
+    for asset in assets:
+        file = os.path.join(path, f"{asset}.csv")
+        if os.path.exists(file):
+            df = pd.read_csv(file)[COLUMNS]
+            candles[asset] = df.sort_values("timestamp").drop_duplicates("timestamp", keep="last").reset_index(drop=True)
+    return candles
+
+
+def load_store(root, assets, interval=bot.CANDLE_INTERVAL):
+    """Charge l'archive de bougies du bot (candle_store) pour chaque actif présent"""
+    store = CandleStore(root)
+    return {asset: store.frame(asset, interval) for asset in assets if len(store.series(asset, interval))}
+
+
+def synthetic_candles(assets, n_bars):
+    """Historique synthétique reproductible (une graine par actif)"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from benchmarks.fixtures import make_candles
+    return {asset: make_candles(n_bars, seed=i) for i, asset in enumerate(assets)}
+
+
+def download(out_dir, assets, days, interval=bot.CANDLE_INTERVAL):
+    """Télécharge l'historique disponible via candleSnapshot dans <out_dir>/<ACTIF>.csv"""
+    os.makedirs(out_dir, exist_ok=True)
+    interval_ms = INTERVAL_MS[interval]
+    end = int(time.time() * 1000)
+    for asset in assets:
+        chunks = []
+        start = end - days * 86_400_000
+        while start < end:
+            chunk_end = min(end, start + 5000 * interval_ms)  # 5000 bougies max par requête
+            candles = bot.fetch_candles(asset, start, chunk_end)
+            if candles is not None:
+                chunks.append(candles)
+            start = chunk_end
+        if not chunks:
+            print(f"⚠️ {asset}: aucune bougie")
+            continue
+        df = pd.DataFrame(np.concatenate([values for _, values in chunks]), columns=COLUMNS[1:])
+        df.insert(0, "timestamp", np.concatenate([timestamps for timestamps, _ in chunks]))
+        df = df.drop_duplicates("timestamp", keep="last").sort_values("timestamp")
+        df.to_csv(os.path.join(out_dir, f"{asset}.csv"), index=False)
+        print(f"✅ {asset}: {len(df)} bougies")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest de la stratégie crypto")
+    parser.add_argument("--assets", nargs="+", default=bot.ASSETS)
+    parser.add_argument("--csv-dir", help="dossier contenant <ACTIF>.csv")
+    parser.add_argument("--store", help="archive de bougies du bot (CANDLE_STORE_DIR)")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="N bougies synthétiques par actif")
+    parser.add_argument("--download", metavar="DIR", help="télécharger l'historique dans DIR puis quitter")
+    parser.add_argument("--days", type=int, default=17, help="jours d'historique pour --download")
+    parser.add_argument("--out", default="backtest.db", help="base SQLite des trades (même schéma que la base live)")
+    args = parser.parse_args()
+
+    if args.download:
+        download(args.download, args.assets, args.days)
+        return
+    if args.csv_dir:
+        candles = load_csv_dir(args.csv_dir, args.assets)
+    elif args.store:
+        candles = load_store(args.store, args.assets)
+    elif args.synthetic:
+        candles = synthetic_candles(args.assets, args.synthetic)
+    else:
+        parser.error("--csv-dir, --store, --synthetic ou --download requis")
+    if not candles:
+        parser.error("aucun historique trouvé")
+
+    start = time.perf_counter()
+    frames = {asset: indicator_frame(df) for asset, df in candles.items()}
+    indicators_s = time.perf_counter() - start
+
+    if os.path.exists(args.out):
+        os.remove(args.out)
+    conn = bot.init_db(args.out)
+    result = run_backtest(frames, cur=conn.cursor())
+    conn.commit()
+    conn.close()
+    total_s = time.perf_counter() - start
+
+    print("="*70)
+    print(f"📊 BACKTEST: {', '.join(frames)} | {result['bars']} bougies {bot.CANDLE_INTERVAL}")
+    print(f"   Capital final: ${result['capital']:.2f} | P&L: ${result['total_pnl']:+.2f}")
+    print(f"   Trades: {result['total_trades']} | Win Rate: {result['win_rate']:.1f}% | Drawdown max: {result['max_drawdown_pct']:.1f}% | Positions ouvertes: {result['open_positions']}")
+    print(f"   Durée: {total_s:.2f}s (indicateurs {indicators_s:.2f}s) | Trades: {args.out}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Calcul des indicateurs pour tous les actifs en une passe vectorisée
+
+Les OHLCV de chaque actif sont empilés dans des tableaux 2-D (actifs × bougies),
+alignés à droite sur la dernière bougie de chaque actif ; les actifs plus
+courts sont complétés à gauche par des NaN. Chaque indicateur est calculé pour
+tous les actifs à la fois, et uniquement sur les bougies dont la dernière
+valeur dépend (les EMAs et le SuperTrend restent récursifs sur tout l'axe).
+
+Mêmes formules que calculate_all_indicators ; per_asset() rend un dictionnaire
+par actif utilisable tel quel par get_signal et open_position_simulation.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from supertrend import supertrend_batch
+
+EPS = 1e-10
+MIN_CANDLES = 50
+EMA_PERIODS = [8, 21, 50, 200]
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def stack_ohlcv(frames, length=300, dtype=np.float64):
+    """Empile les DataFrames OHLCV {actif: df} en tableaux 2-D alignés à droite
+
+    Les actifs sans données (None) ou avec moins de MIN_CANDLES bougies sont ignorés.
+    Retourne (actifs, {colonne: tableau (actifs × length)}).
+    """
+    assets = [a for a, df in frames.items() if df is not None and len(df) >= MIN_CANDLES]
+    arrays = {col: np.full((len(assets), length), np.nan, dtype=dtype) for col in COLUMNS}
+    for i, asset in enumerate(assets):
+        df = frames[asset].iloc[-length:]
+        n = len(df)
+        for col in COLUMNS:
+            arrays[col][i, length - n:] = df[col].to_numpy(dtype)
+    return assets, arrays
+
+
+def _ema_pass(close, dtype):
+    """EMAs 8/21/50/200/12/26 + signal MACD en une seule boucle sur les bougies
+
+    La boucle porte sur l'axe du temps ; chaque pas est vectorisé sur tous les
+    actifs et toutes les périodes. Chaque EMA démarre à la première bougie
+    valide de l'actif (ewm adjust=False).
+    """
+    periods = EMA_PERIODS + [12, 26]
+    alpha = np.array([2 / (p + 1) for p in periods], dtype=dtype)[:, None]
+    alpha_signal = dtype(2 / (9 + 1))
+    ema = np.full((len(periods), close.shape[0]), np.nan, dtype=dtype)
+    signal = np.full(close.shape[0], np.nan, dtype=dtype)
+    for t in range(close.shape[1]):
+        x = close[:, t]
+        ema = np.where(np.isnan(ema), x, (1 - alpha) * ema + alpha * x)
+        macd = ema[-2] - ema[-1]
+        signal = np.where(np.isnan(signal), macd, (1 - alpha_signal) * signal + alpha_signal * macd)
+    emas = dict(zip(periods, ema))
+    return emas, emas[12] - emas[26], signal
+
+
+def _windows(x, size, count):
+    """Les `count` dernières fenêtres de taille `size` : tableau (actifs × count × size)"""
+    return sliding_window_view(x[:, -(size + count - 1):], size, axis=1)
+
+
+def _std(x, axis=-1):
+    return x.std(axis=axis, ddof=1)
+
+
+def compute_indicators_batch(arrays):
+    """Calcule les indicateurs de tous les actifs : {nom: tableau (actifs,)}"""
+    c, h, l, v = arrays["close"], arrays["high"], arrays["low"], arrays["volume"]
+    dtype = c.dtype.type
+    ind = {"price": c[:, -1]}
+    price = c[:, -1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # === 1. RSI ===
+        delta = np.diff(c, axis=1)
+        gain = np.maximum(delta[:, -14:], 0).mean(axis=1)
+        loss = np.maximum(-delta[:, -14:], 0).mean(axis=1)
+        rs = gain / (loss + EPS)
+        ind["rsi"] = 100 - (100 / (1 + rs))
+
+        # === 2. EMAs (8, 21, 50, 200) ===
+        emas, macd, macd_signal = _ema_pass(c, dtype)
+        for period in EMA_PERIODS:
+            ind[f"ema{period}"] = emas[period]
+            ind[f"price_vs_ema{period}"] = (price - emas[period]) / emas[period] * 100
+
+        # === 3. MACD ===
+        ind["macd"] = macd
+        ind["macd_signal"] = macd_signal
+        ind["macd_histogram"] = macd - macd_signal
+
+        # === 4. Stochastic (3 dernières valeurs de %K pour %D) ===
+        low14 = _windows(l, 14, 3).min(axis=-1)
+        high14 = _windows(h, 14, 3).max(axis=-1)
+        k = 100 * (c[:, -3:] - low14) / (high14 - low14 + EPS)
+        ind["stoch_k"] = k[:, -1]
+        ind["stoch_d"] = k.mean(axis=1)
+
+        # === 5. Bollinger Bands ===
+        last20 = c[:, -20:]
+        bb_mid = last20.mean(axis=1)
+        bb_std = _std(last20)
+        ind["bb_upper"] = bb_mid + 2 * bb_std
+        ind["bb_middle"] = bb_mid
+        ind["bb_lower"] = bb_mid - 2 * bb_std
+        ind["bb_width"] = (ind["bb_upper"] - ind["bb_lower"]) / bb_mid * 100
+
+        # === 6. ATR (série complète, nécessaire au SuperTrend) ===
+        prev_c = np.concatenate([np.full((c.shape[0], 1), np.nan, dtype=dtype), c[:, :-1]], axis=1)
+        tr = np.fmax(h - l, np.fmax(np.abs(h - prev_c), np.abs(l - prev_c)))
+        atr = np.full_like(c, np.nan)
+        atr[:, 13:] = sliding_window_view(tr, 14, axis=1).mean(axis=-1)
+        ind["atr"] = atr[:, -1]
+
+        # === 7. ADX (14 derniers DX, chacun sur 14 bougies) ===
+        plus_dm = np.maximum(np.diff(h, axis=1), 0)
+        minus_dm = np.maximum(-np.diff(l, axis=1), 0)
+        tr_sum = _windows(tr, 14, 14).sum(axis=-1)
+        plus_di = 100 * (_windows(plus_dm, 14, 14).sum(axis=-1) / tr_sum)
+        minus_di = 100 * (_windows(minus_dm, 14, 14).sum(axis=-1) / tr_sum)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + EPS)
+        ind["adx"] = dx.mean(axis=1)
+
+        # === 8. CCI ===
+        tp = (h + l + c) / 3
+        tp20 = tp[:, -20:]
+        ind["cci"] = (tp[:, -1] - tp20.mean(axis=1)) / (0.015 * _std(tp20) + EPS)
+
+        # === 9. ROC ===
+        ind["roc"] = (price - c[:, -11]) / c[:, -11] * 100
+
+        # === 10. Williams %R ===
+        ind["williams_r"] = -100 * (high14[:, -1] - price) / (high14[:, -1] - low14[:, -1] + EPS)
+
+        # === 11. OBV (cumul sur la fenêtre, NaN ignorés comme cumsum) ===
+        ind["obv"] = np.nansum(v[:, 1:] * np.sign(delta), axis=1)
+
+        # === 12. VWAP ===
+        vwap = np.nansum(v * tp, axis=1) / np.nansum(v, axis=1)
+        ind["vwap"] = vwap
+        ind["price_vs_vwap"] = (price - vwap) / vwap * 100
+
+        # === 13. Volume ===
+        ind["volume_ratio"] = v[:, -1] / v[:, -20:].mean(axis=1)
+
+        # === 14. Volatilité ===
+        returns = c[:, -20:] / prev_c[:, -20:] - 1
+        ind["volatility"] = _std(returns) * 100
+
+        # === 15. Momentum ===
+        ind["momentum"] = price - c[:, -10]
+
+        # === 16. SuperTrend ===
+        supertrend, supertrend_dir = supertrend_batch(c, h, l, atr)
+        ind["supertrend"] = supertrend[:, -1]
+        ind["supertrend_dir"] = supertrend_dir[:, -1]
+
+    return ind
+
+
+def per_asset(assets, batch):
+    """Vue par actif {actif: indicateurs} compatible avec get_signal"""
+    result = {}
+    for i, asset in enumerate(assets):
+        ind = {name: float(values[i]) for name, values in batch.items()}
+        # === 17. Trends (court/moyen/long terme) ===
+        ind["trend_short"] = "UP" if ind["ema8"] > ind["ema21"] else "DOWN"
+        ind["trend_medium"] = "UP" if ind["ema21"] > ind["ema50"] else "DOWN"
+        ind["trend_long"] = "UP" if ind["ema50"] > ind["ema200"] else "DOWN"
+        result[asset] = ind
+    return result
+
+
+def calculate_indicators_batch(frames, length=300, float32=False):
+    """Indicateurs de tous les actifs {actif: df} en une passe : {actif: indicateurs}"""
+    dtype = np.float32 if float32 else np.float64
+    assets, arrays = stack_ohlcv(frames, length, dtype)
+    if not assets:
+        return {}
+    return per_asset(assets, compute_indicators_batch(arrays))
@@ -0,0 +1,292 @@
+"""Benchmarks des chemins chauds : décodage des bougies, indicateurs, signal, sorties et journal des features
+
+Bougies synthétiques à graine fixe (fixtures.py) de plusieurs tailles. La
+référence des indicateurs est une copie figée du calcul pandas d'origine
+(indicators_reference) : calculate_all_indicators (graphe paresseux),
+IndicatorEngine et calculate_indicators_batch doivent la reproduire. Pour le
+reste, le code de référence est celui du bot (get_signal, check_stop_loss /
+evaluate_exit) ; ses sorties sont enregistrées dans la baseline avec les temps,
+backtest.indicator_frame doit retrouver la référence sur sa dernière bougie et
+backtest.signal_arrays (signal_rules sur tableaux) doit reproduire get_signal. Le décodage candleSnapshot (CandleParser) est comparé à l'ancien
+chemin par DataFrame, en temps et en pic mémoire.
+
+Usage:
+    python benchmarks/bench_hot_paths.py            # compare à benchmarks/baseline.json
+    python benchmarks/bench_hot_paths.py --save     # enregistre une nouvelle baseline
+    python benchmarks/bench_hot_paths.py --sizes 300 5000
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as bot  # noqa: E402
+from backtest import LONG, SHORT, indicator_frame, signal_arrays  # noqa: E402
+from batch_indicators import calculate_indicators_batch  # noqa: E402
+from candle_parser import CandleParser  # noqa: E402
+from feature_log import FeatureLog  # noqa: E402
+from indicator_engine import MIN_CANDLES, IndicatorEngine  # noqa: E402
+from indicator_graph import LazyIndicators  # noqa: E402
+from supertrend import supertrend as supertrend_kernel  # noqa: E402
+from benchmarks.fixtures import make_candles, make_snapshot  # noqa: E402
+from benchmarks.harness import Suite, finish, parse_args  # noqa: E402
+
+SIZES = [300, 5_000, 50_000]
+SNAPSHOT_SIZES = [2, 300, 5_000]  # Réponses candleSnapshot : fil de l'eau, chauffe, téléchargement
+SIGNAL_BARS = 5_000           # Dictionnaires d'indicateurs évalués par get_signal
+EXIT_STEPS = 2_000            # Prix successifs présentés aux règles de sortie
+ENGINE_RTOL = 1e-7            # Sommes glissantes du moteur incrémental : arrondis différents
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def indicators_reference(df):
+    """Calcul d'origine de calculate_all_indicators, figé (référence de tous les chemins)"""
+    if df is None or len(df) < 50:
+        return None
+
+    c = df["close"]
+    h = df["high"]
+    l = df["low"]
+    v = df["volume"]
+
+    indicators = {"price": c.iloc[-1]}
+
+    # === 1. RSI ===
+    delta = c.diff()
+    gain = delta.clip(lower=0).rolling(14).mean()
+    loss = -delta.clip(upper=0).rolling(14).mean()
+    rs = gain / (loss + 1e-10)
+    rsi = 100 - (100 / (1 + rs))
+    indicators["rsi"] = rsi.iloc[-1]
+
+    # === 2. EMAs (8, 21, 50, 200) ===
+    for period in [8, 21, 50, 200]:
+        ema = c.ewm(span=period, adjust=False).mean()
+        indicators[f"ema{period}"] = ema.iloc[-1]
+        indicators[f"price_vs_ema{period}"] = (c.iloc[-1] - ema.iloc[-1]) / ema.iloc[-1] * 100
+
+    # === 3. MACD ===
+    ema12 = c.ewm(span=12, adjust=False).mean()
+    ema26 = c.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+    macd_histogram = macd - macd_signal
+    indicators["macd"] = macd.iloc[-1]
+    indicators["macd_signal"] = macd_signal.iloc[-1]
+    indicators["macd_histogram"] = macd_histogram.iloc[-1]
+
+    # === 4. Stochastic ===
+    low14 = l.rolling(14).min()
+    high14 = h.rolling(14).max()
+    k = 100 * (c - low14) / (high14 - low14 + 1e-10)
+    d = k.rolling(3).mean()
+    indicators["stoch_k"] = k.iloc[-1]
+    indicators["stoch_d"] = d.iloc[-1]
+
+    # === 5. Bollinger Bands ===
+    bb_mid = c.rolling(20).mean()
+    bb_std = c.rolling(20).std()
+    bb_upper = bb_mid + 2 * bb_std
+    bb_lower = bb_mid - 2 * bb_std
+    indicators["bb_upper"] = bb_upper.iloc[-1]
+    indicators["bb_middle"] = bb_mid.iloc[-1]
+    indicators["bb_lower"] = bb_lower.iloc[-1]
+    indicators["bb_width"] = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / bb_mid.iloc[-1] * 100
+
+    # === 6. ATR (Average True Range) ===
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    atr = tr.rolling(14).mean()
+    indicators["atr"] = atr.iloc[-1]
+
+    # === 7. ADX (Average Directional Index) ===
+    plus_dm = h.diff().clip(lower=0)
+    minus_dm = -l.diff().clip(upper=0)
+    tr_sum = tr.rolling(14).sum()
+    plus_di = 100 * (plus_dm.rolling(14).sum() / tr_sum)
+    minus_di = 100 * (minus_dm.rolling(14).sum() / tr_sum)
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di + 1e-10)
+    adx = dx.rolling(14).mean()
+    indicators["adx"] = adx.iloc[-1]
+
+    # === 8. CCI (Commodity Channel Index) ===
+    tp = (h + l + c) / 3
+    cci = (tp - tp.rolling(20).mean()) / (0.015 * tp.rolling(20).std() + 1e-10)
+    indicators["cci"] = cci.iloc[-1]
+
+    # === 9. ROC (Rate of Change) ===
+    roc = ((c - c.shift(10)) / c.shift(10) * 100)
+    indicators["roc"] = roc.iloc[-1]
+
+    # === 10. Williams %R ===
+    williams_r = -100 * (high14 - c) / (high14 - low14 + 1e-10)
+    indicators["williams_r"] = williams_r.iloc[-1]
+
+    # === 11. OBV (On Balance Volume) ===
+    obv = (v * np.sign(c.diff())).cumsum()
+    indicators["obv"] = obv.iloc[-1]
+
+    # === 12. VWAP ===
+    vwap = (v * (h + l + c) / 3).cumsum() / v.cumsum()
+    indicators["vwap"] = vwap.iloc[-1]
+    indicators["price_vs_vwap"] = (c.iloc[-1] - vwap.iloc[-1]) / vwap.iloc[-1] * 100
+
+    # === 13. Volume ===
+    vol_avg = v.rolling(20).mean()
+    indicators["volume_ratio"] = v.iloc[-1] / vol_avg.iloc[-1]
+
+    # === 14. Volatilité ===
+    indicators["volatility"] = c.pct_change(fill_method=None).rolling(20).std().iloc[-1] * 100
+
+    # === 15. Momentum ===
+    indicators["momentum"] = c.iloc[-1] - c.iloc[-10]
+
+    # === 16. SuperTrend (noyau NumPy vectorisé) ===
+    supertrend, supertrend_dir = supertrend_kernel(
+        c.to_numpy(np.float64), h.to_numpy(np.float64), l.to_numpy(np.float64), atr.to_numpy(np.float64)
+    )
+
+    indicators["supertrend"] = supertrend[-1]
+    indicators["supertrend_dir"] = supertrend_dir[-1]
+
+    # === 17. Trends (court/moyen/long terme) ===
+    indicators["trend_short"] = "UP" if indicators["ema8"] > indicators["ema21"] else "DOWN"
+    indicators["trend_medium"] = "UP" if indicators["ema21"] > indicators["ema50"] else "DOWN"
+    indicators["trend_long"] = "UP" if indicators["ema50"] > indicators["ema200"] else "DOWN"
+
+    return indicators
+
+
+def bench_indicators(suite, n):
+    df = make_candles(n, seed=n)
+    reference = indicators_reference(df)
+    suite.check(f"calculate_all_indicators[{n}] == référence", reference, bot.calculate_all_indicators(df),
+                rtol=0, atol=0)
+    suite.bench(f"indicators_reference[{n}]", lambda: indicators_reference(df))
+    suite.bench(f"calculate_all_indicators[{n}]", lambda: bot.calculate_all_indicators(df), reference)
+    
+    # Mode full paresseux : seules les entrées de get_signal sont calculées
+    signal = bot.get_signal(reference)
+    suite.check(f"get_signal(LazyIndicators)[{n}] == référence", signal, bot.get_signal(LazyIndicators(df)))
+    suite.bench(f"get_signal(LazyIndicators)[{n}]", lambda: bot.get_signal(LazyIndicators(df)), signal)
+
+    batch = calculate_indicators_batch({"X": df}, length=n)["X"]
+    suite.check(f"calculate_indicators_batch[{n}] == référence", reference, batch, rtol=ENGINE_RTOL)
+    suite.bench(f"calculate_indicators_batch[{n}]", lambda: calculate_indicators_batch({"X": df}, length=n))
+
+    engine = IndicatorEngine(window=n)
+    suite.check(f"IndicatorEngine.feed[{n}] == référence", reference, engine.feed(df), rtol=ENGINE_RTOL)
+
+    # Graphe sur toute la série (backtest) : la dernière ligne est le calcul de référence
+    last_row = indicator_frame(df, window=None).iloc[-1]
+    suite.check(f"indicator_frame[{n}] (dernière bougie) == référence", reference,
+                {name: last_row[name] for name in reference}, rtol=0, atol=0)
+    last = tuple(df.iloc[-1][["timestamp", "open", "high", "low", "close", "volume"]])
+    suite.bench(f"IndicatorEngine.update (bougie en cours)[{n}]", lambda: engine.update(*last))
+
+
+def dataframe_parse(data):
+    """Ancien décodage de fetch_candles : dictionnaires par ligne, DataFrame, to_numeric, dropna"""
+    df = pd.DataFrame([{
+        "timestamp": row.get("t", row.get("timestamp")),
+        "open": row.get("o", row.get("open")),
+        "high": row.get("h", row.get("high")),
+        "low": row.get("l", row.get("low")),
+        "close": row.get("c", row.get("close")),
+        "volume": row.get("v", row.get("volume")),
+    } for row in data])
+    for col in df.columns:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.dropna()
+    return df["timestamp"].to_numpy(np.int64), df[["open", "high", "low", "close", "volume"]].to_numpy(np.float64)
+
+
+def bench_parser(suite, n):
+    data = make_snapshot(n, seed=n)
+    parser = CandleParser()
+    candles = make_candles(n, seed=n)
+    reference = candles["timestamp"].to_numpy(), candles[["open", "high", "low", "close", "volume"]].to_numpy()
+    # float() relit exactement les prix ; pd.to_numeric peut s'écarter du dernier bit
+    suite.check(f"CandleParser.parse[{n}] == bougies d'origine", reference, parser.parse(data), rtol=0, atol=0)
+    suite.check(f"décodage DataFrame[{n}] == bougies d'origine", reference, dataframe_parse(data), rtol=1e-15)
+    suite.bench(f"décodage DataFrame[{n}]", lambda: dataframe_parse(data), memory=True)
+    suite.bench(f"CandleParser.parse[{n}]", lambda: parser.parse(data), reference, memory=True)
+
+
+def bench_signal(suite):
+    frame = indicator_frame(make_candles(SIGNAL_BARS, seed=1)).iloc[MIN_CANDLES - 1:]
+    rows = frame.to_dict("records")
+    reference = [bot.get_signal(ind) for ind in rows]
+    suite.bench(f"get_signal x{len(rows)}", lambda: [bot.get_signal(ind) for ind in rows],
+                [list(r) for r in reference])
+
+    codes = {"LONG": LONG, "SHORT": SHORT, None: 0}
+    signal, bull, bear = signal_arrays(frame)
+    suite.check("signal_arrays == get_signal",
+                [(codes[s], b, r) for s, b, r in reference], list(zip(signal, bull, bear)))
+    suite.bench(f"signal_arrays x{len(rows)}", lambda: signal_arrays(frame))
+
+
+def exit_path(prices, side):
+    """Raisons de sortie le long d'un chemin de prix (une minute par prix, position rouverte après sortie)"""
+    reasons = []
+    pos = None
+    for minute, price in enumerate(prices):
+        if pos is None:
+            pos = {"side": side, "entry_price": price, "highest_profit": 0.0, "trailing_stop": None, "opened": minute}
+        reason = bot.evaluate_exit(pos, price, minute - pos["opened"])
+        reasons.append(reason)
+        if reason is not None:
+            pos = None
+    return reasons
+
+
+def bench_exits(suite):
+    prices = make_candles(EXIT_STEPS, seed=2)["close"].tolist()
+    for side in ("LONG", "SHORT"):
+        suite.bench(f"evaluate_exit {side} x{EXIT_STEPS}", lambda: exit_path(prices, side), exit_path(prices, side))
+
+    # check_stop_loss sur une position ouverte qui ne sort pas (chemin de chaque cycle)
+    bot.portfolio["positions"]["BENCH"] = {
+        "id": 0, "asset": "BENCH", "side": "LONG", "entry_price": 100.0, "entry_time": datetime.now(),
+        "size": 1.0, "size_usd": 100.0, "highest_profit": 0.0, "trailing_stop": None, "indicators": {},
+    }
+    try:
+        suite.bench("check_stop_loss (pas de sortie)", lambda: bot.check_stop_loss("BENCH", 100.2))
+    finally:
+        del bot.portfolio["positions"]["BENCH"]
+
+
+def bench_feature_log(suite):
+    indicators, signal = bot.with_signal(bot.calculate_all_indicators(make_candles(300, seed=3)))
+    with tempfile.TemporaryDirectory() as directory:
+        log = FeatureLog(directory, segment_bytes=2**20, max_segments=2)
+        suite.bench("FeatureLog.append", lambda: log.append(1_700_000_000_000, 1_700_000_000_000, "BTC", indicators, signal))
+        log.close()
+
+
+def main():
+    args = parse_args(__doc__.splitlines()[0], SIZES)
+    suite = Suite("crypto-bot", BASELINE_FILE)
+
+    for n in SNAPSHOT_SIZES:
+        print(f"\n📥 Décodage candleSnapshot ({n} bougies)")
+        bench_parser(suite, n)
+    for n in args.sizes:
+        print(f"\n📈 Indicateurs ({n} bougies)")
+        bench_indicators(suite, n)
+    print("\n🎯 Signal")
+    bench_signal(suite)
+    print("\n🛑 Sorties")
+    bench_exits(suite)
+    print("\n💾 Journal des features")
+    bench_feature_log(suite)
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Benchmark SuperTrend : boucle pandas .iloc historique vs noyau NumPy
+
+Usage: python benchmarks/bench_supertrend.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supertrend import supertrend, supertrend_batch  # noqa: E402
+from benchmarks.fixtures import make_candles  # noqa: E402
+
+SIZES = [300, 5_000, 50_000]
+BATCH_ASSETS = 100
+
+
+def supertrend_loop(c, h, l, atr):
+    """Boucle de référence (version d'origine de calculate_all_indicators)"""
+    hl2 = (h + l) / 2
+    upper_band = hl2 + 3 * atr
+    lower_band = hl2 - 3 * atr
+    supertrend = pd.Series(index=c.index, dtype=float)
+    supertrend_dir = pd.Series(index=c.index, dtype=int)
+    
+    for i in range(1, len(c)):
+        if c.iloc[i] > upper_band.iloc[i-1]:
+            supertrend.iloc[i] = lower_band.iloc[i]
+            supertrend_dir.iloc[i] = 1
+        elif c.iloc[i] < lower_band.iloc[i-1]:
+            supertrend.iloc[i] = upper_band.iloc[i]
+            supertrend_dir.iloc[i] = -1
+        else:
+            supertrend.iloc[i] = supertrend.iloc[i-1]
+            supertrend_dir.iloc[i] = supertrend_dir.iloc[i-1]
+    
+    return supertrend, supertrend_dir
+
+
+def atr_of(df):
+    c, h, l = df["close"], df["high"], df["low"]
+    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
+    return tr.rolling(14).mean()
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    print(f"{'Bougies':>8} {'Boucle .iloc':>14} {'NumPy':>12} {'Speedup':>10} {'Identique':>10}")
+    print("-" * 58)
+    for n in SIZES:
+        # Multiplicateur réduit pour avoir des croisements dans les données synthétiques
+        df = make_candles(n, seed=n)
+        atr = atr_of(df) / 10
+        c, h, l = df["close"], df["high"], df["low"]
+        arrays = [s.to_numpy(np.float64) for s in (c, h, l, atr)]
+
+        ref_st, ref_dir = supertrend_loop(c, h, l, atr)
+        st, direction = supertrend(*arrays)
+        same = (np.allclose(ref_st.to_numpy(float), st, equal_nan=True)
+                and np.allclose(ref_dir.to_numpy(float), direction, equal_nan=True))
+
+        t_loop = best_of(lambda: supertrend_loop(c, h, l, atr), 1 if n > 5_000 else 3)
+        t_np = best_of(lambda: supertrend(*arrays), 20)
+        print(f"{n:>8} {t_loop * 1e3:>12.2f}ms {t_np * 1e3:>10.3f}ms {t_loop / t_np:>9.0f}x {str(same):>10}")
+
+    # Forme batch : BATCH_ASSETS actifs × 300 bougies en un appel
+    frames = [make_candles(300, seed=i) for i in range(BATCH_ASSETS)]
+    stack = [np.vstack([f[col].to_numpy(np.float64) for f in frames]) for col in ("close", "high", "low")]
+    atr2d = np.vstack([(atr_of(f) / 10).to_numpy(np.float64) for f in frames])
+    t_batch = best_of(lambda: supertrend_batch(*stack, atr2d), 20)
+    t_single = best_of(lambda: [supertrend(stack[0][i], stack[1][i], stack[2][i], atr2d[i])
+                                for i in range(BATCH_ASSETS)], 5)
+    print(f"\nBatch {BATCH_ASSETS} actifs × 300 bougies: {t_batch * 1e3:.3f}ms "
+          f"(vs {t_single * 1e3:.3f}ms actif par actif)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark du mode univers : durée de calcul d'un cycle selon le nombre d'actifs
+
+Pour chaque taille d'univers, des buffers de CANDLE_HISTORY bougies synthétiques
+passent par le chemin du bot (evaluate_frames : moteurs de base et timeframes
+supérieurs, signaux, puis open_best_signals), à froid (tous les moteurs à
+chauffer : démarrage, nouveaux actifs) et au fil de l'eau (bougie en cours mise
+à jour), dans le thread principal puis avec le pool de INDICATOR_WORKERS
+processus. Le pool doit rendre exactement les mêmes indicateurs.
+
+Les requêtes réseau ne sont pas simulées : le rapport final y ajoute le
+nombre d'actifs rafraîchis par cycle dans le budget de poids REST
+(schedule_assets) ; en WebSocket, tout l'univers l'est à chaque cycle.
+
+Usage:
+    python benchmarks/bench_universe.py                # 50, 150 et 250 actifs
+    python benchmarks/bench_universe.py --sizes 200 --save
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as bot  # noqa: E402
+from candle_buffer import CandleBuffer  # noqa: E402
+from indicator_pool import IndicatorPool  # noqa: E402
+from benchmarks.fixtures import make_candles  # noqa: E402
+from benchmarks.harness import Suite, finish, format_seconds, parse_args  # noqa: E402
+
+SIZES = [50, 150, 250]
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_universe.json")
+
+
+def load_universe(n):
+    """Buffers de n actifs synthétiques ; retourne (actifs, {actif: DataFrame})"""
+    assets = [f"U{i:03d}" for i in range(n)]
+    bot.candle_buffers.clear()
+    for i, asset in enumerate(assets):
+        buffer = CandleBuffer(bot.CANDLE_HISTORY, bot.CANDLE_INTERVAL)
+        buffer.merge(make_candles(bot.CANDLE_HISTORY, seed=i))
+        bot.candle_buffers[asset] = buffer
+    return assets, {asset: bot.candle_buffers[asset].to_frame() for asset in assets}
+
+
+def reset_state():
+    """Aucun moteur ni timeframe supérieur : tout est à chauffer"""
+    bot.indicator_engines.clear()
+    bot.timeframe_engines.clear()
+    bot.timeframe_resamplers.clear()
+    bot.portfolio["positions"].clear()
+
+
+def run_cycle(assets, frames):
+    """Indicateurs + signaux de tous les actifs, puis classement (sans ouverture de position)"""
+    results = bot.evaluate_frames(assets, frames)
+    candidates = [(a, r[1], r[0]) for a, r in zip(assets, results) if r is not None and r[1]]
+    ranked = sorted(candidates, reverse=True, key=lambda c: bot.signal_rank(
+        c[1], c[2]["bull_score"], c[2]["bear_score"], c[2]["volume_ratio"]))
+    return results, [a for a, _, _ in ranked[:bot.MAX_OPEN_POSITIONS]]
+
+
+def cold_cycle(assets, frames):
+    reset_state()
+    return run_cycle(assets, frames)
+
+
+def live_frames(frames, step):
+    """Bougie en cours modifiée (nouveau prix) pour chaque actif"""
+    out = {}
+    for asset, df in frames.items():
+        df = df.copy()
+        df.iloc[-1, df.columns.get_loc("close")] *= 1 + 0.0005 * (step % 3 - 1)
+        out[asset] = df
+    return out
+
+
+def bench_size(suite, n, pool):
+    assets, frames = load_universe(n)
+    report = {}
+    outputs = {}
+    for label, workers in (("thread principal", None), (f"{pool.workers} workers", pool)):
+        bot.indicator_pool = workers
+        outputs[label] = cold_cycle(assets, frames)
+        cold = suite.bench(f"cycle froid [{n} actifs, {label}]", lambda: cold_cycle(assets, frames), repeat=2)
+
+        steps = [live_frames(frames, step) for step in range(3)]
+        counter = iter(range(10**9))
+        live = suite.bench(f"cycle au fil de l'eau [{n} actifs, {label}]",
+                           lambda: run_cycle(assets, steps[next(counter) % 3]), repeat=3)
+        report[label] = (cold, live)
+    bot.indicator_pool = None
+
+    sequential, pooled = outputs.values()
+    suite.check(f"pool == thread principal [{n} actifs]", sequential, pooled)
+    return report
+
+
+def rest_capacity():
+    """Actifs rafraîchis par cycle en REST (au fil de l'eau, chauffe)"""
+    budget = bot.WEIGHT_PER_MINUTE * bot.LOOP_INTERVAL / 60 * bot.REST_WEIGHT_SHARE
+    steady = bot.DEFAULT_WEIGHT + 2 // bot.CANDLES_PER_EXTRA_WEIGHT
+    warmup = bot.DEFAULT_WEIGHT + bot.CANDLE_HISTORY // bot.CANDLES_PER_EXTRA_WEIGHT
+    return int(budget // steady), int(budget // warmup)
+
+
+def main():
+    args = parse_args(__doc__.splitlines()[0], SIZES)
+    suite = Suite("crypto-bot-universe", BASELINE_FILE)
+    bot.candle_store = None  # Pas d'archive : timeframes supérieurs chauffés depuis le buffer seul
+    pool = IndicatorPool(max(bot.INDICATOR_WORKERS, 1))
+
+    reports = {}
+    try:
+        for n in args.sizes:
+            print(f"\n🌐 Univers de {n} actifs (HIGHER_TIMEFRAMES={bot.HIGHER_TIMEFRAMES}, {os.cpu_count()} CPU)")
+            reports[n] = bench_size(suite, n, pool)
+    finally:
+        pool.close()
+
+    steady, warmup = rest_capacity()
+    print(f"\n⏱️ Cycle de calcul selon la taille de l'univers (LOOP_INTERVAL = {bot.LOOP_INTERVAL}s)")
+    print(f"   {'Actifs':>7} {'Mode':<18} {'Froid':>10} {'Fil de l eau':>13} {'REST/cycle':>11} {'Tour REST':>10}")
+    for n, report in reports.items():
+        for label, (cold, live) in report.items():
+            rounds = -(-n // steady)
+            print(f"   {n:>7} {label:<18} {format_seconds(cold):>10} {format_seconds(live):>13} "
+                  f"{min(n, steady):>11} {rounds * bot.LOOP_INTERVAL:>9}s")
+    print(f"   Budget REST : ~{steady} actifs/cycle au fil de l'eau, ~{warmup} en chauffe "
+          f"(REST_WEIGHT_SHARE={bot.REST_WEIGHT_SHARE}) ; WebSocket : tout l'univers à chaque cycle")
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
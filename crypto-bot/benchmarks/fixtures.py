@@ -0,0 +1,36 @@
+"""Bougies synthétiques reproductibles pour les benchmarks"""
+import numpy as np
+import pandas as pd
+
+CANDLE_MS = 5 * 60 * 1000     # Bougies 5m
+START_TS = 1_700_000_000_000
+
+
+def make_candles(n, seed=0, start_price=100.0, volatility=0.003):
+    """Génère n bougies OHLCV 5m (marche aléatoire log-normale, graine fixe)"""
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    wick = np.abs(rng.normal(0, volatility / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = rng.lognormal(3, 0.5, n)
+    return pd.DataFrame({
+        "timestamp": START_TS + np.arange(n, dtype=np.int64) * CANDLE_MS,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    })
+
+
+def make_snapshot(n, seed=0, coin="BENCH"):
+    """Réponse candleSnapshot décodée (format Hyperliquid : prix et volumes en chaînes)"""
+    df = make_candles(n, seed=seed)
+    return [
+        {"t": t, "T": t + CANDLE_MS - 1, "s": coin, "i": "5m",
+         "o": str(o), "c": str(c), "h": str(h), "l": str(l), "v": str(v), "n": 100}
+        for t, o, h, l, c, v in zip(df["timestamp"].tolist(), df["open"].tolist(), df["high"].tolist(),
+                                    df["low"].tolist(), df["close"].tolist(), df["volume"].tolist())
+    ]
@@ -0,0 +1,222 @@
+"""Outils communs des benchmarks : chronométrage, baseline et comparaison des sorties
+
+Chaque mesure garde le meilleur temps par appel sur plusieurs répétitions
+(nombre d'appels par répétition ajusté pour durer au moins MIN_TIME). Les
+sorties de chaque benchmark sont enregistrées avec les temps dans la baseline :
+un run suivant signale les régressions de temps (au-delà de THRESHOLD) et toute
+sortie qui diffère, ainsi que les écarts entre une implémentation optimisée et
+le code de référence (check). bench(..., memory=True) mesure aussi le pic
+d'allocations Python d'un appel (tracemalloc).
+
+Même module dans crypto-bot/benchmarks/ et sp500-bot/benchmarks/.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+THRESHOLD = 0.20     # Plus lent de 20% que la baseline = régression
+MIN_TIME = 0.05      # Durée minimale d'une répétition (s)
+RTOL = 1e-9          # Tolérance relative des comparaisons de sorties
+ATOL = 1e-9          # Tolérance absolue (valeurs proches de 0)
+
+
+def measure(fn, repeat=5, min_time=MIN_TIME):
+    """Meilleur temps par appel de fn() (secondes)"""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def peak_memory(fn):
+    """Pic d'allocations (octets) pendant un appel de fn(), NumPy compris"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def to_plain(value):
+    """Sortie comparable et sérialisable en JSON (NumPy, pandas, tuples -> types Python)"""
+    if isinstance(value, dict):
+        return {str(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return [to_plain(v) for v in value.tolist()]
+    if hasattr(value, "to_numpy"):  # Series pandas
+        return to_plain(value.to_numpy())
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    return value
+
+
+def first_difference(expected, actual, rtol=RTOL, atol=ATOL, path="$"):
+    """Chemin et valeurs de la première différence, ou None si identiques (à la tolérance près)"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if expected.keys() != actual.keys():
+            return f"{path}: clés {sorted(expected.keys() ^ actual.keys())}"
+        for key in expected:
+            diff = first_difference(expected[key], actual[key], rtol, atol, f"{path}.{key}")
+            if diff:
+                return diff
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return f"{path}: longueur {len(expected)} != {len(actual)}"
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diff = first_difference(e, a, rtol, atol, f"{path}[{i}]")
+            if diff:
+                return diff
+        return None
+    numbers = (int, float)
+    if isinstance(expected, numbers) and isinstance(actual, numbers) \
+            and not isinstance(expected, bool) and not isinstance(actual, bool):
+        if math.isnan(expected) and math.isnan(actual):
+            return None
+        if math.isclose(expected, actual, rel_tol=rtol, abs_tol=atol):
+            return None
+        return f"{path}: {expected!r} != {actual!r}"
+    if expected != actual:
+        return f"{path}: {expected!r} != {actual!r}"
+    return None
+
+
+class Suite:
+    """Benchmarks d'un bot : temps, sorties de référence et contrôles d'équivalence"""
+
+    def __init__(self, name, baseline_file):
+        self.name = name
+        self.baseline_file = baseline_file
+        self.results = {}    # {benchmark: {"seconds", "outputs", "peak_bytes"}}
+        self.checks = []     # [(nom, différence ou None)]
+
+    def bench(self, name, fn, outputs=None, repeat=5, memory=False):
+        """Chronomètre fn ; outputs (optionnel) est comparé à celui de la baseline"""
+        seconds = measure(fn, repeat)
+        self.results[name] = {"seconds": seconds, "outputs": to_plain(outputs)}
+        line = f"   {name:<50} {format_seconds(seconds):>12}"
+        if memory:
+            peak = self.results[name]["peak_bytes"] = peak_memory(fn)
+            line += f" {format_bytes(peak):>12} pic"
+        print(line)
+        return seconds
+
+    def check(self, name, reference, candidate, rtol=RTOL, atol=ATOL):
+        """Implémentation optimisée (candidate) == code de référence, à la tolérance près"""
+        diff = first_difference(to_plain(reference), to_plain(candidate), rtol, atol)
+        self.checks.append((name, diff))
+        print(f"   {'✅' if diff is None else '❌'} {name}" + (f" -> {diff}" if diff else ""))
+        return diff is None
+
+    def load_baseline(self):
+        try:
+            with open(self.baseline_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_baseline(self):
+        baseline = {
+            "suite": self.name,
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "benchmarks": self.results,
+        }
+        with open(self.baseline_file, "w") as f:
+            json.dump(baseline, f, indent=1)
+
+    def compare(self, baseline, threshold=THRESHOLD):
+        """Rapport face à la baseline ; retourne le nombre de régressions et de sorties différentes"""
+        problems = 0
+        reference = baseline["benchmarks"]
+        print(f"\n📊 Comparaison avec la baseline du {baseline['saved_at']} ({baseline['machine']})")
+        print(f"   {'Benchmark':<50} {'Baseline':>12} {'Actuel':>12} {'Écart':>8}")
+        print("   " + "-" * 86)
+        for name, result in self.results.items():
+            if name not in reference:
+                print(f"   {name:<50} {'-':>12} {format_seconds(result['seconds']):>12}     nouveau")
+                continue
+            before = reference[name]["seconds"]
+            change = result["seconds"] / before - 1
+            status = ""
+            if change > threshold:
+                status = "  ⚠️ RÉGRESSION"
+                problems += 1
+            elif change < -threshold:
+                status = "  🚀"
+            print(f"   {name:<50} {format_seconds(before):>12} {format_seconds(result['seconds']):>12} "
+                  f"{change * 100:>+7.0f}%{status}")
+            if result["outputs"] is not None and reference[name].get("outputs") is not None:
+                diff = first_difference(reference[name]["outputs"], result["outputs"])
+                if diff:
+                    print(f"      ❌ sorties différentes de la baseline: {diff}")
+                    problems += 1
+        return problems
+
+    def failed_checks(self):
+        return sum(1 for _, diff in self.checks if diff is not None)
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+
+def format_bytes(size):
+    if size >= 1 << 20:
+        return f"{size / (1 << 20):.1f} Mo"
+    return f"{size / 1024:.0f} Ko"
+
+
+def parse_args(description, default_sizes):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes,
+                        help="tailles des jeux de bougies synthétiques")
+    parser.add_argument("--save", action="store_true", help="enregistre ce run comme nouvelle baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="écart relatif au-delà duquel un temps est une régression")
+    return parser.parse_args()
+
+
+def finish(suite, args):
+    """Compare à la baseline (ou l'enregistre) ; code de sortie 1 si régression ou différence"""
+    problems = suite.failed_checks()
+    baseline = suite.load_baseline()
+    if baseline is not None and not args.save:
+        problems += suite.compare(baseline, args.threshold)
+    if args.save or (baseline is None and not problems):
+        suite.save_baseline()
+        print(f"\n💾 Baseline enregistrée: {os.path.relpath(suite.baseline_file)}")
+    print(f"\n{'❌' if problems else '✅'} {problems} problème(s)")
+    return 1 if problems else 0
@@ -0,0 +1,97 @@
+"""Buffer local de bougies par actif
+
+Après la chauffe, on ne demande plus à l'API que les bougies depuis le dernier
+timestamp stocké : la dernière bougie (encore ouverte) est écrasée, les
+nouvelles sont ajoutées, et les trous dans la grille de temps sont détectés
+pour être comblés par une requête ciblée.
+"""
+import numpy as np
+import pandas as pd
+
+INTERVAL_MS = {"1m": 60_000, "5m": 300_000, "15m": 900_000, "1h": 3_600_000, "4h": 14_400_000}
+COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+class CandleBuffer:
+    """Dernières bougies d'un actif, triées et sans doublon"""
+
+    def __init__(self, maxlen=300, interval="5m"):
+        self.maxlen = maxlen
+        self.interval_ms = INTERVAL_MS[interval]
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, 5), dtype=np.float64)  # open, high, low, close, volume
+        self.revision = 0             # Incrémenté quand l'historique clôturé est réécrit
+        self.known_gaps = set()       # Trous déjà demandés à l'API sans réponse
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def last_timestamp(self):
+        return int(self.timestamps[-1]) if len(self.timestamps) else None
+
+    def next_start_time(self, now_ms):
+        """startTime de la prochaine requête : depuis la dernière bougie, ou chauffe complète"""
+        last = self.last_timestamp
+        warmup_start = now_ms - self.maxlen * self.interval_ms
+        if last is None or last < warmup_start:
+            return warmup_start
+        return last
+
+    def merge(self, df):
+        """Fusionne des bougies reçues (les plus récentes écrasent les anciennes)
+
+        Retourne True si des bougies antérieures à la dernière bougie stockée
+        ont été insérées ou modifiées (l'état incrémental dérivé est alors invalide).
+        """
+        if df is None or len(df) == 0:
+            return False
+        return self.merge_arrays(df["timestamp"].to_numpy(np.int64), df[COLUMNS[1:]].to_numpy(np.float64))
+
+    def merge_candle(self, timestamp, open_, high, low, close, volume):
+        """Fusionne une seule bougie (flux WebSocket)"""
+        return self.merge_arrays(np.array([timestamp], dtype=np.int64),
+                                 np.array([[open_, high, low, close, volume]], dtype=np.float64))
+
+    def merge_arrays(self, new_ts, new_values):
+        """Fusionne des timestamps (n,) et des valeurs OHLCV (n, 5)"""
+        last = self.last_timestamp
+
+        if last is not None and new_ts.min() >= last:
+            # Cas courant : écrasement de la bougie ouverte + ajout en fin
+            keep = self.timestamps < new_ts.min()
+            ts = np.concatenate([self.timestamps[keep], new_ts])
+            values = np.concatenate([self.values[keep], new_values])
+            rewritten = False
+        else:
+            ts = np.concatenate([self.timestamps, new_ts])
+            values = np.concatenate([self.values, new_values])
+            rewritten = last is not None and bool((new_ts < last).any())
+
+        # Dédoublonnage (la dernière occurrence gagne) et tri
+        _, idx = np.unique(ts[::-1], return_index=True)
+        idx = len(ts) - 1 - idx
+        self.timestamps = ts[idx][-self.maxlen:]
+        self.values = values[idx][-self.maxlen:]
+        if rewritten:
+            self.revision += 1
+        return rewritten
+
+    def gaps(self):
+        """Trous dans la grille de temps : liste de (début, fin) des bougies manquantes"""
+        if len(self.timestamps) < 2:
+            return []
+        steps = np.diff(self.timestamps)
+        holes = np.nonzero(steps > self.interval_ms)[0]
+        result = []
+        for i in holes:
+            gap = (int(self.timestamps[i]) + self.interval_ms, int(self.timestamps[i + 1]) - self.interval_ms)
+            if gap not in self.known_gaps:
+                result.append(gap)
+        return result
+
+    def to_frame(self):
+        """DataFrame OHLCV au même format que get_ohlcv"""
+        df = pd.DataFrame(self.values, columns=COLUMNS[1:])
+        df.insert(0, "timestamp", self.timestamps)
+        return df
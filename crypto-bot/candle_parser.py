@@ -0,0 +1,117 @@
+"""Décodage des réponses candleSnapshot directement en tableaux NumPy
+
+Le schéma (liste directe ou clé "data"/"candles"..., bougies en dictionnaires
+à clés courtes t/o/h/l/c/v ou longues, ou en listes de 6 valeurs) est détecté
+à la première réponse puis réutilisé : chaque colonne est ensuite décodée d'un
+seul passage dans un tableau préalloué (timestamps int64 (n,), OHLCV float64
+(n, 5)), sans dictionnaire intermédiaire ni DataFrame.
+
+Une réponse qui ne suit pas le schéma mémorisé le fait redétecter ; une
+bougie incomplète ou non numérique fait basculer la réponse sur le décodage
+ligne à ligne, qui écarte ces bougies (comme pd.to_numeric(errors="coerce")
+suivi de dropna()).
+"""
+import math
+from operator import itemgetter
+
+import numpy as np
+
+SHORT_KEYS = ("t", "o", "h", "l", "c", "v")
+LONG_KEYS = ("timestamp", "open", "high", "low", "close", "volume")
+CONTAINER_KEYS = ("data", "candles", "candle", "snapshot", "result")
+PARSE_ERRORS = (KeyError, IndexError, TypeError, ValueError, OverflowError)
+
+
+def detect_schema(response):
+    """(clé du conteneur ou None, champs des 6 colonnes), ou None si la réponse est vide ou inconnue"""
+    container, data = None, response
+    if isinstance(response, dict):
+        container = next((key for key in CONTAINER_KEYS if key in response), None)
+        if container is None:
+            return None
+        data = response[container]
+    if not isinstance(data, list) or not data:
+        return None
+    row = data[0]
+    if isinstance(row, dict):
+        return container, tuple(short if short in row else long for short, long in zip(SHORT_KEYS, LONG_KEYS))
+    if isinstance(row, (list, tuple)) and len(row) >= 6:
+        return container, tuple(range(6))
+    return None
+
+
+def to_number(value):
+    """float, ou NaN si la valeur est absente ou non numérique"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class CandleParser:
+    """Décodeur d'un endpoint de bougies (schéma détecté une fois)"""
+
+    def __init__(self):
+        self.schema = None       # (clé du conteneur ou None, champs des 6 colonnes)
+        self.getters = None
+        self.detections = 0
+        self.fallbacks = 0       # Réponses décodées ligne à ligne (bougies invalides)
+
+    def _use(self, schema):
+        self.schema = schema
+        self.getters = [itemgetter(field) for field in schema[1]]
+        self.detections += 1
+
+    def _rows(self, response):
+        container = self.schema[0]
+        data = response if container is None else response[container]
+        if not isinstance(data, list):
+            raise TypeError("conteneur de bougies inattendu")
+        return data
+
+    def _parse_columns(self, response):
+        if self.schema is None:
+            raise KeyError("schéma non détecté")
+        data = self._rows(response)
+        n = len(data)
+        if not n:
+            return None
+        timestamps = np.fromiter(map(self.getters[0], data), np.int64, n)
+        values = np.empty((n, 5), dtype=np.float64)
+        for j, getter in enumerate(self.getters[1:]):
+            values[:, j] = np.fromiter(map(float, map(getter, data)), np.float64, n)
+        if np.isnan(values).any():
+            raise ValueError("bougie non numérique")
+        return timestamps, values
+
+    def _parse_rows(self, data):
+        rows = []
+        for row in data:
+            if isinstance(row, dict):
+                rows.append([to_number(row.get(short, row.get(long))) for short, long in zip(SHORT_KEYS, LONG_KEYS)])
+            elif isinstance(row, (list, tuple)) and len(row) >= 6:
+                rows.append([to_number(value) for value in row[:6]])
+        table = np.array(rows, dtype=np.float64).reshape(-1, 6)
+        table = table[~np.isnan(table).any(axis=1)]
+        if not len(table):
+            return None
+        return table[:, 0].astype(np.int64), np.ascontiguousarray(table[:, 1:])
+
+    def parse(self, response):
+        """Réponse JSON décodée -> (timestamps int64 (n,), valeurs OHLCV float64 (n, 5)), ou None si vide"""
+        try:
+            return self._parse_columns(response)
+        except PARSE_ERRORS:
+            pass
+        # Hors du schéma mémorisé : nouvelle détection, sinon bougies invalides
+        schema = detect_schema(response)
+        if schema is None:
+            return None
+        if schema != self.schema:
+            self._use(schema)
+            try:
+                return self._parse_columns(response)
+            except PARSE_ERRORS:
+                pass
+        self.fallbacks += 1
+        return self._parse_rows(self._rows(response))
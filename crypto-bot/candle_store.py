@@ -0,0 +1,190 @@
+"""Archive locale des bougies, en fichiers binaires memory-mappés
+
+Une série par (actif, intervalle), stockée en deux fichiers à largeur fixe :
+    <racine>/<intervalle>/<ACTIF>.ts     int64   timestamps (ms), triés
+    <racine>/<intervalle>/<ACTIF>.ohlcv  float64 (n, 5) open, high, low, close, volume
+Les bougies postérieures à la dernière archivée sont ajoutées en fin de fichier,
+et seule la dernière bougie (encore ouverte) est réécrite en place. Les bougies
+antérieures absentes de l'archive (trous comblés après coup) y sont fusionnées :
+la série est alors réécrite dans des fichiers temporaires qui remplacent les
+anciens ; les bougies antérieures déjà archivées ne sont pas modifiées.
+Le tableau des timestamps, trié, sert d'index : une recherche par
+plage de temps est une recherche dichotomique (O(log n) pages lues) et les
+tranches retournées sont des vues NumPy sur le mmap, sans copie ni chargement
+complet en mémoire.
+
+Le fichier ohlcv est écrit avant le fichier ts : après une interruption, la
+longueur valide est celle du plus court des deux. Une fusion écrit
+<ACTIF>.ohlcv.new puis <ACTIF>.ts.new (renommé en dernier) avant de remplacer
+les deux fichiers : si <ACTIF>.ts.new existe, la fusion est complète et son
+remplacement est terminé au prochain accès, sinon les temporaires sont effacés.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from candle_buffer import COLUMNS
+
+TS_DTYPE = np.dtype("<i8")
+VALUES_DTYPE = np.dtype("<f8")
+ROW_BYTES = 5 * VALUES_DTYPE.itemsize
+
+
+class CandleSeries:
+    """Bougies d'un actif pour un intervalle"""
+
+    def __init__(self, directory, asset):
+        self.ts_path = os.path.join(directory, f"{asset}.ts")
+        self.values_path = os.path.join(directory, f"{asset}.ohlcv")
+        self._ts = None
+        self._values = None
+
+    def _repair(self):
+        """Termine ou abandonne une fusion interrompue, puis tronque les deux fichiers à la dernière bougie complète"""
+        if os.path.exists(self.ts_path + ".new"):
+            if os.path.exists(self.values_path + ".new"):
+                os.replace(self.values_path + ".new", self.values_path)
+            os.replace(self.ts_path + ".new", self.ts_path)
+            self._ts = None
+        for path in (self.values_path + ".new", self.ts_path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+        n = len(self)
+        for path, row_bytes in ((self.ts_path, TS_DTYPE.itemsize), (self.values_path, ROW_BYTES)):
+            if os.path.exists(path) and os.path.getsize(path) != n * row_bytes:
+                os.truncate(path, n * row_bytes)
+
+    def __len__(self):
+        if not os.path.exists(self.ts_path) or not os.path.exists(self.values_path):
+            return 0
+        return min(os.path.getsize(self.ts_path) // TS_DTYPE.itemsize,
+                   os.path.getsize(self.values_path) // ROW_BYTES)
+
+    def _map(self):
+        """(timestamps, valeurs) memory-mappés, remappés si les fichiers ont grandi"""
+        n = len(self)
+        if self._ts is None or len(self._ts) != n:
+            if n == 0:
+                self._ts = np.empty(0, dtype=TS_DTYPE)
+                self._values = np.empty((0, 5), dtype=VALUES_DTYPE)
+            else:
+                self._ts = np.memmap(self.ts_path, dtype=TS_DTYPE, mode="r", shape=(n,))
+                self._values = np.memmap(self.values_path, dtype=VALUES_DTYPE, mode="r", shape=(n, 5))
+        return self._ts, self._values
+
+    @property
+    def last_timestamp(self):
+        ts, _ = self._map()
+        return int(ts[-1]) if len(ts) else None
+
+    def append(self, timestamps, values):
+        """Archive des bougies triées ; retourne le nombre de bougies écrites
+
+        Les bougies antérieures à la dernière archivée sont fusionnées si elles
+        manquent à l'archive, celle de même timestamp est réécrite (bougie en
+        cours), les suivantes sont ajoutées.
+        """
+        timestamps = np.asarray(timestamps, dtype=TS_DTYPE)
+        values = np.ascontiguousarray(values, dtype=VALUES_DTYPE)
+        self._repair()
+        written = 0
+        last = self.last_timestamp
+        if last is not None:
+            start = np.searchsorted(timestamps, last)
+            if start:
+                written = self._merge(timestamps[:start], values[:start])
+            timestamps, values = timestamps[start:], values[start:]
+        if len(timestamps) == 0:
+            return written
+        n = len(self)
+
+        # Réécriture de la dernière bougie archivée si elle est présente dans le lot
+        offset = n - 1 if last is not None and timestamps[0] == last else n
+        os.makedirs(os.path.dirname(self.ts_path), exist_ok=True)
+        for path, data, row_bytes in ((self.values_path, values, ROW_BYTES),
+                                      (self.ts_path, timestamps, TS_DTYPE.itemsize)):
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(offset * row_bytes)
+                f.write(data.tobytes())
+        self._ts = None  # Remappage à la prochaine lecture
+        return written + len(timestamps)
+
+    def _merge(self, timestamps, values):
+        """Fusionne les bougies antérieures absentes de l'archive ; retourne leur nombre"""
+        ts, archived = self._map()
+        pos = np.searchsorted(ts, timestamps)
+        missing = ts[np.minimum(pos, len(ts) - 1)] != timestamps
+        if not missing.any():
+            return 0
+        timestamps, values = timestamps[missing], values[missing]
+        merged_ts = np.concatenate([ts, timestamps])
+        order = np.argsort(merged_ts, kind="stable")
+        merged_values = np.concatenate([archived, values])[order]
+        merged_ts = merged_ts[order]
+
+        with open(self.values_path + ".new", "wb") as f:
+            f.write(merged_values.tobytes())
+        with open(self.ts_path + ".tmp", "wb") as f:
+            f.write(merged_ts.tobytes())
+        os.replace(self.ts_path + ".tmp", self.ts_path + ".new")  # Fusion complète
+        self._ts = self._values = None
+        self._repair()
+        return len(timestamps)
+
+    def range(self, start_ms=None, end_ms=None):
+        """Vues (timestamps, valeurs) des bougies start_ms <= t < end_ms, sans copie"""
+        ts, values = self._map()
+        i = 0 if start_ms is None else int(np.searchsorted(ts, start_ms, side="left"))
+        j = len(ts) if end_ms is None else int(np.searchsorted(ts, end_ms, side="left"))
+        return ts[i:j], values[i:j]
+
+    def tail(self, n):
+        """Vues des n dernières bougies"""
+        ts, values = self._map()
+        start = max(0, len(ts) - n)
+        return ts[start:], values[start:]
+
+
+class CandleStore:
+    """Archive de bougies indexée par (actif, intervalle)"""
+
+    def __init__(self, root="candles"):
+        self.root = root
+        self._series = {}
+
+    def series(self, asset, interval):
+        key = (asset, interval)
+        if key not in self._series:
+            self._series[key] = CandleSeries(os.path.join(self.root, interval), asset)
+        return self._series[key]
+
+    def assets(self, interval):
+        """Actifs archivés pour un intervalle"""
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-3] for name in os.listdir(directory) if name.endswith(".ts"))
+
+    def append(self, asset, interval, timestamps, values):
+        return self.series(asset, interval).append(timestamps, values)
+
+    def append_frame(self, asset, interval, df):
+        """Archive un DataFrame OHLCV (format get_ohlcv)"""
+        if df is None or len(df) == 0:
+            return 0
+        df = df.sort_values("timestamp")
+        return self.append(asset, interval, df["timestamp"].to_numpy(np.int64), df[COLUMNS[1:]].to_numpy(np.float64))
+
+    def range(self, asset, interval, start_ms=None, end_ms=None):
+        return self.series(asset, interval).range(start_ms, end_ms)
+
+    def tail(self, asset, interval, n):
+        return self.series(asset, interval).tail(n)
+
+    def frame(self, asset, interval, start_ms=None, end_ms=None):
+        """DataFrame OHLCV (copie) des bougies start_ms <= t < end_ms"""
+        ts, values = self.range(asset, interval, start_ms, end_ms)
+        df = pd.DataFrame(np.asarray(values), columns=COLUMNS[1:])
+        df.insert(0, "timestamp", np.asarray(ts))
+        return df
@@ -0,0 +1,72 @@
+"""Checkpoint local pour redémarrage à chaud
+
+L'état en mémoire du bot (portfolio et positions avec leur trailing stop,
+statistiques, buffers de bougies, moteurs d'indicateurs) est sérialisé en
+pickle dans le thread de trading, puis écrit sur disque par un thread de fond
+(fichier temporaire + os.replace : jamais de checkpoint à moitié écrit).
+Un checkpoint d'une autre version, ou illisible, est ignoré : le bot repart
+alors de la base et de l'API comme avant.
+"""
+import os
+import pickle
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+def load_checkpoint(path):
+    """État sauvegardé, ou None (absent, illisible ou d'une autre version)"""
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError) as e:
+        print(f"⚠️ Checkpoint illisible ({e}), démarrage à froid")
+        return None
+    if not isinstance(state, dict) or state.get("version") != CHECKPOINT_VERSION:
+        print("⚠️ Checkpoint d'une autre version, démarrage à froid")
+        return None
+    return state
+
+
+class Checkpointer:
+    """Sauvegardes périodiques d'un état vers un fichier"""
+
+    def __init__(self, path, interval=60):
+        self.path = path
+        self.interval = interval
+        self.last_saved = time.monotonic()
+        self.last_size = 0
+        self._seq = 0
+        self._written_seq = 0
+        self._writing = threading.Lock()
+
+    def due(self):
+        return time.monotonic() - self.last_saved >= self.interval
+
+    def save(self, state, background=True):
+        """Sérialise l'état maintenant, l'écrit en arrière-plan (sauf background=False)"""
+        data = pickle.dumps({"version": CHECKPOINT_VERSION, "saved_at": time.time(), **state},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        self.last_saved = time.monotonic()
+        self._seq += 1
+        if background:
+            threading.Thread(target=self._write, args=(data, self._seq), daemon=True).start()
+        else:
+            self._write(data, self._seq)
+
+    def _write(self, data, seq):
+        with self._writing:  # Une écriture à la fois, jamais un état plus ancien que le dernier écrit
+            if seq < self._written_seq:
+                return
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, self.path)  # Écriture atomique
+                self.last_size = len(data)
+                self._written_seq = seq
+            except OSError as e:
+                print(f"⚠️ Checkpoint non écrit: {e}")
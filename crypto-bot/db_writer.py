@@ -0,0 +1,137 @@
+"""Écriture SQLite asynchrone avec commits groupés
+
+Le thread de trading ne fait qu'ajouter (requête, paramètres) dans une file.
+Un thread dédié, propriétaire de sa connexion, exécute les requêtes dans
+l'ordre et valide par lots : toutes les `commit_interval` secondes ou toutes
+les `commit_every` requêtes, au premier des deux. La base est en mode WAL :
+les lecteurs (view_*.sh, statistiques) ne bloquent pas l'écrivain et
+réciproquement. Les requêtes sont gardées préparées par le cache de
+statements du module sqlite3.
+
+Une requête en échec (erreur SQLite ou autre exception) est journalisée,
+comptée dans `errors` et signalée à on_error, sans arrêter le thread. Une
+requête passée avec expect_rows=True (UPDATE ... WHERE id = ?) qui ne
+modifie aucune ligne compte aussi comme une écriture perdue : la ligne visée
+n'existe pas, le plus souvent parce que son INSERT a échoué.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+
+
+def enable_wal(conn):
+    """Passe la base en WAL (persistant dans le fichier) avec synchronous=NORMAL"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+
+def statement(sql):
+    """Requête sur une ligne, tronquée, pour les journaux"""
+    return " ".join(sql.split())[:80]
+
+
+class DBWriter:
+    """Thread écrivain unique d'une base SQLite"""
+
+    def __init__(self, path, commit_interval=1.0, commit_every=100, on_commit=None, on_error=None):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.commit_every = commit_every
+        self.on_commit = on_commit      # on_commit(secondes) après chaque commit (métriques)
+        self.on_error = on_error        # on_error(type) à chaque écriture perdue : "execute", "no_row", "commit"
+        self.queue = queue.Queue()
+        self.statements = 0
+        self.commits = 0
+        self.errors = 0
+        self.last_error = None          # Dernière erreur (texte), pour l'appelant
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def execute(self, sql, params=(), expect_rows=False):
+        """Ajoute une requête d'écriture à la file (ne bloque jamais)
+
+        expect_rows : la requête doit modifier au moins une ligne, sinon elle compte comme une erreur.
+        """
+        self.queue.put((sql, params, expect_rows))
+
+    def flush(self, timeout=None):
+        """Attend que toutes les requêtes déjà en file soient validées"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Valide la file puis arrête le thread"""
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, cached_statements=256)
+        enable_wal(conn)
+        pending = 0
+        deadline = None
+        while True:
+            timeout = None if pending == 0 else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is None or item is _STOP or isinstance(item, threading.Event):
+                if pending:
+                    self._commit(conn)
+                    pending = 0
+                if item is _STOP:
+                    break
+                if item is not None:
+                    item.set()
+                continue
+
+            sql, params, expect_rows = item
+            try:
+                cursor = conn.execute(sql, params)
+                self.statements += 1
+            except Exception as e:
+                self._error("execute", f"{e} | {statement(sql)}")
+                continue
+            if expect_rows and cursor.rowcount == 0:
+                self._error("no_row", f"aucune ligne modifiée | {statement(sql)} {params!r}")
+            pending += 1
+            if pending == 1:
+                deadline = time.monotonic() + self.commit_interval
+            if pending >= self.commit_every:
+                self._commit(conn)
+                pending = 0
+        conn.close()
+
+    def _commit(self, conn):
+        start = time.perf_counter()
+        try:
+            conn.commit()
+            self.commits += 1
+        except Exception as e:
+            self._error("commit", f"commit: {e}")
+            return
+        if self.on_commit is not None:
+            self.on_commit(time.perf_counter() - start)
+
+    def _error(self, kind, message):
+        self.errors += 1
+        self.last_error = message
+        print(f"❌ ERREUR BDD: {message}")
+        if self.on_error is not None:
+            self.on_error(kind)
+
+    def summary(self):
+        return (f"BDD: {self.statements} écritures en {self.commits} commits | "
+                f"{self.queue.qsize()} en file | {self.errors} erreurs"
+                + (f" (dernière: {self.last_error})" if self.last_error else ""))
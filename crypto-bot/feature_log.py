@@ -0,0 +1,162 @@
+"""Journal binaire des indicateurs de chaque bougie évaluée (exemples ML)
+
+Une ligne à largeur fixe par actif et par évaluation : horodatage, bougie,
+actif, signal, scores bull/bear, tendances et les indicateurs de get_signal /
+trades (RECORD_FIELDS). Les lignes sont ajoutées par struct.pack dans un
+fichier bufferisé (quelques µs par ligne), en segments de taille bornée :
+    <dossier>/features-v<VERSION>-<numéro>.bin
+Au-delà de segment_bytes, un nouveau segment est ouvert ; au-delà de
+max_segments, le plus ancien est supprimé (anneau).
+
+L'actif est stocké sur ASSET_BYTES octets (UTF-8) : un nom plus long n'est
+pas tronqué (deux actifs pourraient se confondre), ses lignes sont refusées
+et comptées dans `rejected`.
+
+La bougie en cours est réévaluée à chaque cycle : la dernière ligne d'un couple
+(actif, candle_time) porte les valeurs à la clôture. Avec SIGNAL_MEMO, seules
+les bougies clôturées sont évaluées : une ligne par couple.
+
+Lecture : read_segment() / load_features() memory-mappent les segments avec
+RECORD_DTYPE (une ligne incomplète en fin de segment est ignorée).
+"""
+import glob
+import os
+import struct
+from operator import itemgetter
+
+import numpy as np
+
+FEATURE_LOG_VERSION = 2         # v2 : actif sur 16 octets (8 en v1)
+ASSET_BYTES = 16
+FEATURES = [
+    "price", "rsi", "ema8", "ema21", "ema50", "ema200",
+    "price_vs_ema8", "price_vs_ema21", "price_vs_ema50", "price_vs_ema200",
+    "macd", "macd_signal", "macd_histogram", "stoch_k", "stoch_d",
+    "bb_upper", "bb_middle", "bb_lower", "bb_width", "atr", "adx", "cci", "roc",
+    "williams_r", "obv", "vwap", "price_vs_vwap", "volume_ratio", "volatility",
+    "momentum", "supertrend", "supertrend_dir",
+]
+RECORD_FIELDS = [
+    ("time", "<i8"),          # Évaluation (ms)
+    ("candle_time", "<i8"),   # Ouverture de la bougie évaluée (ms)
+    ("asset", f"S{ASSET_BYTES}"),
+    ("signal", "i1"),         # 1 LONG, -1 SHORT, 0 aucun
+    ("bull_score", "i1"),
+    ("bear_score", "i1"),
+    ("trend_short", "i1"),    # 1 UP, -1 DOWN
+    ("trend_medium", "i1"),
+    ("trend_long", "i1"),
+] + [(name, "<f8") for name in FEATURES]
+RECORD_DTYPE = np.dtype(RECORD_FIELDS)
+RECORD = struct.Struct(f"<qq{ASSET_BYTES}s6b" + "d" * len(FEATURES))
+assert RECORD.size == RECORD_DTYPE.itemsize
+
+SIGNALS = {"LONG": 1, "SHORT": -1, None: 0}
+TRENDS = {"UP": 1, "DOWN": -1}
+
+
+def segments(directory):
+    """Segments de la version courante, du plus ancien au plus récent"""
+    return sorted(glob.glob(os.path.join(directory, f"features-v{FEATURE_LOG_VERSION}-*.bin")))
+
+
+class FeatureLog:
+    """Écrivain du journal (un seul par dossier, thread de trading)"""
+
+    def __init__(self, directory, segment_bytes=64 * 2**20, max_segments=16):
+        self.directory = directory
+        self.segment_bytes = segment_bytes - segment_bytes % RECORD.size
+        self.max_segments = max_segments
+        self.rows = 0
+        self.rejected = {}            # {actif: lignes refusées (nom trop long)}
+        self._file = None
+        self._size = 0
+        self._features = itemgetter(*FEATURES)
+        self._assets = {}
+        os.makedirs(directory, exist_ok=True)
+
+        existing = segments(directory)
+        if existing:
+            path = existing[-1]
+            size = os.path.getsize(path)
+            if size % RECORD.size:
+                os.truncate(path, size - size % RECORD.size)  # Ligne incomplète (arrêt brutal)
+            self._seq = int(path.rsplit("-", 1)[1].split(".")[0])
+            self._open(path)
+        else:
+            self._seq = 0
+            self._rotate()
+
+    def _open(self, path):
+        self._file = open(path, "ab", buffering=256 * RECORD.size)
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._seq += 1
+        self._open(os.path.join(self.directory, f"features-v{FEATURE_LOG_VERSION}-{self._seq:06d}.bin"))
+        for path in segments(self.directory)[:-self.max_segments]:
+            os.remove(path)
+
+    def append(self, time_ms, candle_time, asset, indicators, signal):
+        """Ajoute la ligne d'un actif évalué (indicateurs avec bull_score/bear_score) ; False si refusée"""
+        code = self._assets.get(asset)
+        if code is None:
+            code = asset.encode()
+            if len(code) > ASSET_BYTES:
+                if asset not in self.rejected:
+                    print(f"⚠️ Features: actif {asset!r} refusé (plus de {ASSET_BYTES} octets)")
+                self.rejected[asset] = self.rejected.get(asset, 0) + 1
+                return False
+            self._assets[asset] = code
+        self._file.write(RECORD.pack(
+            int(time_ms), int(candle_time), code, SIGNALS[signal],
+            indicators["bull_score"], indicators["bear_score"],
+            TRENDS[indicators["trend_short"]], TRENDS[indicators["trend_medium"]], TRENDS[indicators["trend_long"]],
+            *self._features(indicators),
+        ))
+        self.rows += 1
+        self._size += RECORD.size
+        if self._size >= self.segment_bytes:
+            self._rotate()
+        return True
+
+    def flush(self):
+        """Rend les lignes bufferisées visibles aux lecteurs"""
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self):
+        count = len(segments(self.directory))
+        rejected = f" | {sum(self.rejected.values())} refusées ({len(self.rejected)} actifs)" if self.rejected else ""
+        return f"Features: {self.rows} lignes cette session{rejected} | {count} segments ({self.directory}/)"
+
+
+def read_segment(path):
+    """Lignes complètes d'un segment, memory-mappées (RECORD_DTYPE)"""
+    rows = os.path.getsize(path) // RECORD_DTYPE.itemsize
+    if rows == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(rows,))
+
+
+def load_features(directory, columns=None, asset=None, since_ms=None):
+    """Lignes de tous les segments (copiées), filtrées par actif et horodatage d'évaluation"""
+    parts = []
+    for path in segments(directory):
+        records = read_segment(path)
+        if since_ms is not None:
+            if len(records) == 0 or records["time"][-1] < since_ms:
+                continue
+            records = records[records["time"] >= since_ms]
+        if asset is not None:
+            records = records[records["asset"] == asset.encode()]
+        parts.append(records[columns] if columns else records)
+    if not parts:
+        return np.empty(0, dtype=RECORD_DTYPE if not columns else RECORD_DTYPE[columns])
+    return np.concatenate(parts)
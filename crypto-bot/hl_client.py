@@ -0,0 +1,175 @@
+"""Client réutilisable pour l'endpoint /info de Hyperliquid
+
+- Connexions keep-alive mutualisées (requests.Session + pool HTTP)
+- Token bucket côté client qui suit le poids des requêtes Hyperliquid
+  (1200 de poids par minute et par IP)
+- Retries bornés avec backoff exponentiel et jitter, uniquement sur les
+  erreurs transitoires (réseau, timeout, 429, 5xx)
+- Compteurs de latence et d'erreurs par type de requête
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+INFO_URL = "https://api.hyperliquid.xyz/info"
+WEIGHT_PER_MINUTE = 1200
+
+# Poids des requêtes /info (documentation Hyperliquid, "Rate limits")
+REQUEST_WEIGHTS = {
+    "l2Book": 2,
+    "allMids": 2,
+    "clearinghouseState": 2,
+    "orderStatus": 2,
+    "spotClearinghouseState": 2,
+    "exchangeStatus": 2,
+    "userRole": 60,
+}
+DEFAULT_WEIGHT = 20
+CANDLES_PER_EXTRA_WEIGHT = 60  # candleSnapshot : +1 de poids par tranche de 60 bougies renvoyées
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HyperliquidAPIError(Exception):
+    """Échec d'une requête Hyperliquid après les retries"""
+
+
+class TokenBucket:
+    """Budget de poids côté client, rechargé en continu"""
+
+    def __init__(self, capacity=WEIGHT_PER_MINUTE, refill_per_second=WEIGHT_PER_MINUTE / 60):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def acquire(self, weight):
+        """Bloque jusqu'à ce que `weight` soit disponible, retourne le temps d'attente"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return waited
+                delay = (weight - self.tokens) / self.refill_per_second
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, weight):
+        """Débite un poids connu après coup (peut rendre le budget négatif)"""
+        with self.lock:
+            self._refill()
+            self.tokens -= weight
+
+
+class EndpointStats:
+    """Compteurs d'un type de requête"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled_s = 0.0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency):
+        self.requests += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    @property
+    def latency_avg(self):
+        return self.latency_sum / self.requests if self.requests else 0.0
+
+
+class HyperliquidInfoClient:
+    """Client /info mutualisé, limité en débit et instrumenté"""
+
+    def __init__(self, url=INFO_URL, timeout=10, max_retries=3, backoff=0.5,
+                 bucket=None, pool_size=10):
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = bucket or TokenBucket()
+        self.stats = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _stats(self, endpoint):
+        with self.bucket.lock:
+            if endpoint not in self.stats:
+                self.stats[endpoint] = EndpointStats()
+            return self.stats[endpoint]
+
+    def post(self, payload, timeout=None):
+        """Envoie une requête /info et retourne le JSON décodé
+
+        Lève HyperliquidAPIError si la requête échoue après les retries.
+        """
+        endpoint = payload.get("type", "unknown")
+        stats = self._stats(endpoint)
+        weight = REQUEST_WEIGHTS.get(endpoint, DEFAULT_WEIGHT)
+        lock = self.bucket.lock  # Compteurs partagés entre threads : même verrou que le budget
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                with lock:
+                    stats.retries += 1
+                # Backoff exponentiel avec "full jitter"
+                time.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            # Chaque tentative est une requête : son poids est débité (429 compris)
+            waited = self.bucket.acquire(weight)
+            start = time.perf_counter()
+            try:
+                r = self.session.post(self.url, json=payload, timeout=timeout or self.timeout)
+                with lock:
+                    stats.throttled_s += waited
+                    stats.record(time.perf_counter() - start)
+                if r.status_code == 200:
+                    data = r.json()
+                    if endpoint == "candleSnapshot" and isinstance(data, list):
+                        self.bucket.charge(len(data) // CANDLES_PER_EXTRA_WEIGHT)
+                    return data
+                last_error = HyperliquidAPIError(f"{endpoint}: HTTP {r.status_code}")
+                if r.status_code not in RETRY_STATUS:
+                    break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                with lock:
+                    stats.throttled_s += waited
+                    stats.record(time.perf_counter() - start)
+                last_error = HyperliquidAPIError(f"{endpoint}: {e}")
+            except ValueError as e:  # JSON invalide
+                last_error = HyperliquidAPIError(f"{endpoint}: réponse invalide ({e})")
+                break
+
+        with lock:
+            stats.errors += 1
+        raise last_error
+
+    def format_stats(self):
+        """Résumé lisible des compteurs par type de requête"""
+        lines = []
+        with self.bucket.lock:
+            stats = sorted(self.stats.items())
+        for endpoint, s in stats:
+            lines.append(
+                f"{endpoint}: {s.requests} req | {s.errors} erreurs | {s.retries} retries | "
+                f"latence moy {s.latency_avg * 1000:.0f}ms max {s.latency_max * 1000:.0f}ms | "
+                f"attente budget {s.throttled_s:.1f}s"
+            )
+        return lines
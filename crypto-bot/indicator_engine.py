@@ -0,0 +1,355 @@
+"""Moteur d'indicateurs incrémental - O(1) par bougie
+
+Garde l'état courant de chaque indicateur pour un actif (EMAs, MACD, RSI,
+ATR, OBV, VWAP, fenêtres glissantes, SuperTrend) et intègre chaque nouvelle
+bougie, ou la mise à jour de la bougie en cours, en temps constant.
+
+Le dictionnaire retourné a les mêmes clés que calculate_all_indicators.
+Nourri avec les mêmes bougies, il donne les mêmes valeurs ; ensuite les EMAs
+et le SuperTrend continuent leur récurrence au lieu d'être ré-amorcés sur les
+300 dernières bougies (OBV et VWAP restent cumulés sur la même fenêtre).
+"""
+import math
+from collections import deque
+from itertools import islice
+
+EPS = 1e-10
+MIN_CANDLES = 50              # Même minimum que calculate_all_indicators
+EMA_PERIODS = [8, 21, 50, 200]
+NAN = float("nan")
+
+
+class RollingWindow:
+    """Fenêtre glissante de taille fixe avec somme courante"""
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self._pushes = 0
+
+    def push(self, x):
+        if len(self.values) == self.size:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        self._pushes += 1
+        # Resynchronisation périodique pour éviter la dérive flottante (amorti O(1))
+        if self._pushes % self.size == 0:
+            self.total = math.fsum(self.values)
+
+    def is_ready_with(self):
+        """La fenêtre sera-t-elle complète si on ajoute une valeur ?"""
+        return len(self.values) >= self.size - 1
+
+    def sum_with(self, x, partial=False):
+        """Somme de la fenêtre si x était ajouté (NaN si incomplète, sauf partial)"""
+        if not partial and not self.is_ready_with():
+            return NAN
+        drop = self.values[0] if len(self.values) == self.size else 0.0
+        return self.total - drop + x
+
+    def mean_with(self, x):
+        return self.sum_with(x) / self.size
+
+    def tail_with(self, x):
+        """Valeurs de la fenêtre si x était ajouté (None si incomplète)"""
+        if not self.is_ready_with():
+            return None
+        start = len(self.values) - (self.size - 1)
+        tail = list(islice(self.values, start, None))
+        tail.append(x)
+        return tail
+
+    def __getitem__(self, i):
+        return self.values[i]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _std(values):
+    """Écart-type échantillon (ddof=1), comme pandas rolling().std()"""
+    n = len(values)
+    mean = sum(values) / n
+    return math.sqrt(sum((x - mean) ** 2 for x in values) / (n - 1))
+
+
+def _ema(prev, x, span):
+    """EMA récursive (équivalent ewm(span, adjust=False))"""
+    if prev is None:
+        return x
+    alpha = 2 / (span + 1)
+    return (1 - alpha) * prev + alpha * x
+
+
+def _div(a, b):
+    """Division avec la sémantique NumPy (inf/NaN au lieu d'une exception)"""
+    if b == 0:
+        return NAN if a == 0 or math.isnan(a) else math.copysign(math.inf, a)
+    return a / b
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+class IndicatorEngine:
+    """État incrémental des indicateurs pour un actif"""
+
+    def __init__(self, window=300):
+        self.window = window          # Fenêtre de cumul OBV/VWAP (= bougies conservées)
+        self.count = 0                # Bougies clôturées intégrées
+        self.prev = None              # Dernière bougie clôturée (t, o, h, l, c, v)
+        self.ema = {p: None for p in EMA_PERIODS + [12, 26]}
+        self.macd_signal = None
+
+        self.gains = RollingWindow(14)
+        self.losses = RollingWindow(14)
+        self.tr = RollingWindow(14)
+        self.plus_dm = RollingWindow(14)
+        self.minus_dm = RollingWindow(14)
+        self.dx = RollingWindow(14)
+        self.highs = RollingWindow(14)
+        self.lows = RollingWindow(14)
+        self.stoch_k = RollingWindow(3)
+        self.closes = RollingWindow(20)
+        self.returns = RollingWindow(20)
+        self.typical = RollingWindow(20)
+        self.volumes = RollingWindow(20)
+        self.obv_terms = RollingWindow(window - 1)
+        self.pv = RollingWindow(window)
+        self.vol_cum = RollingWindow(window)
+
+        self.supertrend = NAN
+        self.supertrend_dir = NAN
+        self.upper_band = NAN
+        self.lower_band = NAN
+
+        self.live = None              # Bougie en cours (t, o, h, l, c, v)
+        self._pending = None          # État calculé pour la bougie en cours
+        self.indicators = None
+
+    @property
+    def last_timestamp(self):
+        """Timestamp de la bougie la plus récente (en cours ou clôturée)"""
+        if self.live is not None:
+            return self.live[0]
+        return self.prev[0] if self.prev is not None else None
+
+    def is_contiguous(self, first_timestamp):
+        """Les nouvelles bougies recouvrent-elles l'état courant (pas de trou) ?"""
+        last = self.last_timestamp
+        return last is None or first_timestamp <= last
+
+    def update(self, timestamp, open_, high, low, close, volume):
+        """Intègre une bougie : nouvelle bougie ou mise à jour de la bougie en cours"""
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            return self.indicators  # Bougie déjà intégrée
+        if self.live is not None and timestamp > self.live[0]:
+            self._commit()
+
+        self.live = (timestamp, float(open_), float(high), float(low), float(close), float(volume))
+        self._pending, indicators = self._evaluate(self.live)
+        self.indicators = indicators if self.count + 1 >= MIN_CANDLES else None
+        return self.indicators
+
+    def feed(self, df):
+        """Intègre les lignes d'un DataFrame OHLCV postérieures à l'état courant"""
+        last = self.last_timestamp
+        if last is not None:
+            df = df[df["timestamp"] >= last]
+        rows = zip(df["timestamp"].tolist(), df["open"].tolist(), df["high"].tolist(),
+                   df["low"].tolist(), df["close"].tolist(), df["volume"].tolist())
+        for row in rows:
+            self.update(*row)
+        return self.indicators
+
+    def _commit(self):
+        """Clôture la bougie en cours : applique son état calculé"""
+        p = self._pending
+        for name in ("gains", "losses", "plus_dm", "minus_dm", "dx", "stoch_k",
+                     "returns", "obv_terms"):
+            if p[name] is not None:
+                getattr(self, name).push(p[name])
+        self.tr.push(p["tr"])
+        self.highs.push(p["high"])
+        self.lows.push(p["low"])
+        self.closes.push(p["close"])
+        self.typical.push(p["tp"])
+        self.volumes.push(p["volume"])
+        self.pv.push(p["pv"])
+        self.vol_cum.push(p["volume"])
+
+        self.ema.update(p["ema"])
+        self.macd_signal = p["macd_signal"]
+        self.supertrend = p["supertrend"]
+        self.supertrend_dir = p["supertrend_dir"]
+        self.upper_band = p["upper_band"]
+        self.lower_band = p["lower_band"]
+
+        self.prev = self.live
+        self.count += 1
+        self.live = None
+        self._pending = None
+
+    def _evaluate(self, bar):
+        """Calcule l'état et les indicateurs pour une bougie sans modifier l'état clôturé"""
+        _, _, h, l, c, v = bar
+        prev = self.prev
+        ind = {"price": c}
+        p = {"high": h, "low": l, "close": c, "volume": v}
+
+        # === 1. RSI ===
+        if prev is not None:
+            delta = c - prev[4]
+            p["gains"] = max(delta, 0.0)
+            p["losses"] = max(-delta, 0.0)
+            gain = self.gains.mean_with(p["gains"])
+            loss = self.losses.mean_with(p["losses"])
+        else:
+            p["gains"] = p["losses"] = None
+            gain = loss = NAN
+        rs = gain / (loss + EPS)
+        ind["rsi"] = 100 - (100 / (1 + rs))
+
+        # === 2. EMAs (8, 21, 50, 200) ===
+        emas = {p_: _ema(self.ema[p_], c, p_) for p_ in self.ema}
+        p["ema"] = emas
+        for period in EMA_PERIODS:
+            ind[f"ema{period}"] = emas[period]
+            ind[f"price_vs_ema{period}"] = (c - emas[period]) / emas[period] * 100
+
+        # === 3. MACD ===
+        macd = emas[12] - emas[26]
+        macd_signal = _ema(self.macd_signal, macd, 9)
+        p["macd_signal"] = macd_signal
+        ind["macd"] = macd
+        ind["macd_signal"] = macd_signal
+        ind["macd_histogram"] = macd - macd_signal
+
+        # === 4. Stochastic ===
+        highs = self.highs.tail_with(h)
+        lows = self.lows.tail_with(l)
+        if highs is not None:
+            high14, low14 = max(highs), min(lows)
+            k = 100 * (c - low14) / (high14 - low14 + EPS)
+            p["stoch_k"] = k
+            d = self.stoch_k.mean_with(k)
+        else:
+            high14 = low14 = k = d = NAN
+            p["stoch_k"] = None
+        ind["stoch_k"] = k
+        ind["stoch_d"] = d
+
+        # === 5. Bollinger Bands ===
+        closes = self.closes.tail_with(c)
+        if closes is not None:
+            bb_mid = sum(closes) / len(closes)
+            bb_std = _std(closes)
+        else:
+            bb_mid = bb_std = NAN
+        bb_upper = bb_mid + 2 * bb_std
+        bb_lower = bb_mid - 2 * bb_std
+        ind["bb_upper"] = bb_upper
+        ind["bb_middle"] = bb_mid
+        ind["bb_lower"] = bb_lower
+        ind["bb_width"] = (bb_upper - bb_lower) / bb_mid * 100
+
+        # === 6. ATR ===
+        if prev is not None:
+            tr = max(h - l, abs(h - prev[4]), abs(l - prev[4]))
+        else:
+            tr = h - l
+        p["tr"] = tr
+        tr_sum = self.tr.sum_with(tr)
+        atr = tr_sum / 14
+        ind["atr"] = atr
+
+        # === 7. ADX ===
+        if prev is not None:
+            p["plus_dm"] = max(h - prev[2], 0.0)
+            p["minus_dm"] = max(prev[3] - l, 0.0)
+            plus_di = 100 * _div(self.plus_dm.sum_with(p["plus_dm"]), tr_sum)
+            minus_di = 100 * _div(self.minus_dm.sum_with(p["minus_dm"]), tr_sum)
+            dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di + EPS)
+        else:
+            p["plus_dm"] = p["minus_dm"] = None
+            dx = NAN
+        p["dx"] = None if math.isnan(dx) or math.isinf(dx) else dx
+        ind["adx"] = self.dx.mean_with(dx) if p["dx"] is not None else NAN
+
+        # === 8. CCI ===
+        tp = (h + l + c) / 3
+        p["tp"] = tp
+        tps = self.typical.tail_with(tp)
+        if tps is not None:
+            ind["cci"] = (tp - sum(tps) / len(tps)) / (0.015 * _std(tps) + EPS)
+        else:
+            ind["cci"] = NAN
+
+        # === 9. ROC / 15. Momentum (clôtures passées) ===
+        past = self.closes.values
+        ind_roc = NAN
+        if len(past) >= 10:
+            c10 = past[-10]
+            ind_roc = (c - c10) / c10 * 100
+
+        # === 10. Williams %R ===
+        williams_r = -100 * (high14 - c) / (high14 - low14 + EPS)
+
+        # === 11. OBV ===
+        if prev is not None:
+            p["obv_terms"] = v * _sign(c - prev[4])
+            obv = self.obv_terms.sum_with(p["obv_terms"], partial=True)
+        else:
+            p["obv_terms"] = None
+            obv = NAN
+
+        # === 12. VWAP ===
+        p["pv"] = v * tp
+        vwap = _div(self.pv.sum_with(p["pv"], partial=True), self.vol_cum.sum_with(v, partial=True))
+
+        # === 13. Volume ===
+        volume_ratio = _div(v, self.volumes.mean_with(v))
+
+        # === 14. Volatilité ===
+        if prev is not None:
+            p["returns"] = c / prev[4] - 1
+            rets = self.returns.tail_with(p["returns"])
+            volatility = _std(rets) * 100 if rets is not None else NAN
+        else:
+            p["returns"] = None
+            volatility = NAN
+
+        ind["roc"] = ind_roc
+        ind["williams_r"] = williams_r
+        ind["obv"] = obv
+        ind["vwap"] = vwap
+        ind["price_vs_vwap"] = (c - vwap) / vwap * 100
+        ind["volume_ratio"] = volume_ratio
+        ind["volatility"] = volatility
+        ind["momentum"] = c - past[-9] if len(past) >= 9 else NAN
+
+        # === 16. SuperTrend ===
+        hl2 = (h + l) / 2
+        p["upper_band"] = hl2 + 3 * atr
+        p["lower_band"] = hl2 - 3 * atr
+        supertrend, supertrend_dir = self.supertrend, self.supertrend_dir
+        if prev is not None:
+            if c > self.upper_band:
+                supertrend, supertrend_dir = p["lower_band"], 1.0
+            elif c < self.lower_band:
+                supertrend, supertrend_dir = p["upper_band"], -1.0
+        p["supertrend"] = supertrend
+        p["supertrend_dir"] = supertrend_dir
+        ind["supertrend"] = supertrend
+        ind["supertrend_dir"] = supertrend_dir
+
+        # === 17. Trends ===
+        ind["trend_short"] = "UP" if ind["ema8"] > ind["ema21"] else "DOWN"
+        ind["trend_medium"] = "UP" if ind["ema21"] > ind["ema50"] else "DOWN"
+        ind["trend_long"] = "UP" if ind["ema50"] > ind["ema200"] else "DOWN"
+
+        return p, ind
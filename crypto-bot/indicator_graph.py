@@ -0,0 +1,270 @@
+"""Graphe des indicateurs : chaque sortie n'est calculée qu'à la demande
+
+Chaque nœud calcule la série complète (une valeur par bougie) d'un petit
+groupe de sorties à partir des bougies et de séries intermédiaires partagées
+(EMAs, plus haut / plus bas 14, true range, ATR), elles-mêmes calculées une
+seule fois (IndicatorGraph). Deux consommateurs :
+    LazyIndicators   mode full du bot : se comporte comme le dictionnaire de
+                     calculate_all_indicators (dernière valeur de chaque
+                     sortie) ; une clé absente déclenche son nœud, puis reste
+                     en cache
+    frame()          backtest : toutes les sorties à chaque bougie, OBV et
+                     VWAP cumulés sur la fenêtre de bougies du bot
+
+Consommateurs :
+    get_signal et l'affichage du cycle   une quinzaine de valeurs (RSI, EMA8/21/50,
+                                         MACD, stochastique, Bollinger, volume, SuperTrend)
+    INSERT trades à l'ouverture          toutes les sorties (trade_row)
+    journal des features                 toutes les sorties sauf les tendances
+
+Le journal des features (FEATURE_LOG_DIR) lit toutes les sorties de chaque
+bougie évaluée : tant qu'il est actif, le graphe calcule tout et le mode full
+paresseux n'économise rien (avec SIGNAL_MEMO, une fois par bougie clôturée).
+
+Mêmes formules, dans le même ordre d'opérations, que la version d'origine de
+calculate_all_indicators (résultats identiques au bit près, vérifiés par
+benchmarks/bench_hot_paths.py).
+"""
+import numpy as np
+import pandas as pd
+
+from supertrend import supertrend as supertrend_kernel
+
+EMA_PERIODS = [8, 21, 50, 200]
+
+
+# ==================== SÉRIES INTERMÉDIAIRES ====================
+def _ema(g, period):
+    return g.c.ewm(span=period, adjust=False).mean()
+
+
+SERIES = {
+    **{f"ema{p}": (lambda g, p=p: _ema(g, p)) for p in EMA_PERIODS + [12, 26]},
+    "low14": lambda g: g.l.rolling(14).min(),
+    "high14": lambda g: g.h.rolling(14).max(),
+    "tr": lambda g: pd.concat([g.h - g.l, (g.h - g.c.shift()).abs(), (g.l - g.c.shift()).abs()], axis=1).max(axis=1),
+    "atr": lambda g: g.series("tr").rolling(14).mean(),
+}
+
+
+# ==================== NŒUDS ====================
+def _rsi(g):
+    # === 1. RSI ===
+    delta = g.c.diff()
+    gain = delta.clip(lower=0).rolling(14).mean()
+    loss = -delta.clip(upper=0).rolling(14).mean()
+    rs = gain / (loss + 1e-10)
+    return {"rsi": 100 - (100 / (1 + rs))}
+
+
+def _ema_node(period):
+    # === 2. EMAs (8, 21, 50, 200) ===
+    def node(g):
+        ema = g.series(f"ema{period}")
+        return {f"ema{period}": ema, f"price_vs_ema{period}": (g.c - ema) / ema * 100}
+    return node
+
+
+def _macd(g):
+    # === 3. MACD ===
+    macd = g.series("ema12") - g.series("ema26")
+    macd_signal = macd.ewm(span=9, adjust=False).mean()
+    return {"macd": macd, "macd_signal": macd_signal, "macd_histogram": macd - macd_signal}
+
+
+def _stochastic(g):
+    # === 4. Stochastic ===
+    low14, high14 = g.series("low14"), g.series("high14")
+    k = 100 * (g.c - low14) / (high14 - low14 + 1e-10)
+    return {"stoch_k": k, "stoch_d": k.rolling(3).mean()}
+
+
+def _bollinger(g):
+    # === 5. Bollinger Bands ===
+    bb_mid = g.c.rolling(20).mean()
+    bb_std = g.c.rolling(20).std()
+    bb_upper = bb_mid + 2 * bb_std
+    bb_lower = bb_mid - 2 * bb_std
+    return {
+        "bb_upper": bb_upper,
+        "bb_middle": bb_mid,
+        "bb_lower": bb_lower,
+        "bb_width": (bb_upper - bb_lower) / bb_mid * 100,
+    }
+
+
+def _atr(g):
+    # === 6. ATR (Average True Range) ===
+    return {"atr": g.series("atr")}
+
+
+def _adx(g):
+    # === 7. ADX (Average Directional Index) ===
+    tr = g.series("tr")
+    plus_dm = g.h.diff().clip(lower=0)
+    minus_dm = -g.l.diff().clip(upper=0)
+    tr_sum = tr.rolling(14).sum()
+    plus_di = 100 * (plus_dm.rolling(14).sum() / tr_sum)
+    minus_di = 100 * (minus_dm.rolling(14).sum() / tr_sum)
+    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di + 1e-10)
+    return {"adx": dx.rolling(14).mean()}
+
+
+def _cci(g):
+    # === 8. CCI (Commodity Channel Index) ===
+    tp = (g.h + g.l + g.c) / 3
+    return {"cci": (tp - tp.rolling(20).mean()) / (0.015 * tp.rolling(20).std() + 1e-10)}
+
+
+def _roc(g):
+    # === 9. ROC (Rate of Change) ===
+    c = g.c
+    return {"roc": (c - c.shift(10)) / c.shift(10) * 100}
+
+
+def _williams_r(g):
+    # === 10. Williams %R ===
+    high14 = g.series("high14")
+    return {"williams_r": -100 * (high14 - g.c) / (high14 - g.series("low14") + 1e-10)}
+
+
+def _obv(g):
+    # === 11. OBV (On Balance Volume) ===
+    return {"obv": g.cumulative(g.v * np.sign(g.c.diff()), lag=1)}
+
+
+def _vwap(g):
+    # === 12. VWAP ===
+    h, l, c, v = g.h, g.l, g.c, g.v
+    vwap = g.cumulative(v * (h + l + c) / 3) / g.cumulative(v)
+    return {"vwap": vwap, "price_vs_vwap": (c - vwap) / vwap * 100}
+
+
+def _volume(g):
+    # === 13. Volume ===
+    return {"volume_ratio": g.v / g.v.rolling(20).mean()}
+
+
+def _volatility(g):
+    # === 14. Volatilité ===
+    return {"volatility": g.c.pct_change(fill_method=None).rolling(20).std() * 100}
+
+
+def _momentum(g):
+    # === 15. Momentum ===
+    return {"momentum": g.c - g.c.shift(9)}
+
+
+def _supertrend(g):
+    # === 16. SuperTrend (noyau NumPy vectorisé) ===
+    supertrend, supertrend_dir = supertrend_kernel(
+        g.c.to_numpy(np.float64), g.h.to_numpy(np.float64), g.l.to_numpy(np.float64),
+        g.series("atr").to_numpy(np.float64)
+    )
+    index = g.c.index
+    return {"supertrend": pd.Series(supertrend, index=index), "supertrend_dir": pd.Series(supertrend_dir, index=index)}
+
+
+def _trend(name, fast, slow):
+    # === 17. Trends (court/moyen/long terme) ===
+    def node(g):
+        up = (g.series(fast) > g.series(slow)).to_numpy()
+        return {name: pd.Series(np.where(up, "UP", "DOWN"), index=g.c.index, dtype=object)}
+    return node
+
+
+# (sorties, nœud), dans l'ordre des clés de calculate_all_indicators
+NODES = [
+    (["rsi"], _rsi),
+    *(([f"ema{p}", f"price_vs_ema{p}"], _ema_node(p)) for p in EMA_PERIODS),
+    (["macd", "macd_signal", "macd_histogram"], _macd),
+    (["stoch_k", "stoch_d"], _stochastic),
+    (["bb_upper", "bb_middle", "bb_lower", "bb_width"], _bollinger),
+    (["atr"], _atr),
+    (["adx"], _adx),
+    (["cci"], _cci),
+    (["roc"], _roc),
+    (["williams_r"], _williams_r),
+    (["obv"], _obv),
+    (["vwap", "price_vs_vwap"], _vwap),
+    (["volume_ratio"], _volume),
+    (["volatility"], _volatility),
+    (["momentum"], _momentum),
+    (["supertrend", "supertrend_dir"], _supertrend),
+    (["trend_short"], _trend("trend_short", "ema8", "ema21")),
+    (["trend_medium"], _trend("trend_medium", "ema21", "ema50")),
+    (["trend_long"], _trend("trend_long", "ema50", "ema200")),
+]
+OUTPUTS = {key: node for keys, node in NODES for key in keys}
+
+
+class IndicatorGraph:
+    """Séries des indicateurs d'un actif (une valeur par bougie), nœud par nœud à la demande
+
+    window : OBV et VWAP cumulés sur les window dernières bougies, comme le bot
+    qui n'en garde que CANDLE_HISTORY (None = depuis la première bougie).
+    """
+
+    def __init__(self, df, window=None):
+        self.c = df["close"]
+        self.h = df["high"]
+        self.l = df["low"]
+        self.v = df["volume"]
+        self.window = window
+        self._series = {}
+        self._outputs = {}
+
+    def series(self, name):
+        """Série intermédiaire partagée, calculée une fois"""
+        values = self._series.get(name)
+        if values is None:
+            values = self._series[name] = SERIES[name](self)
+        return values
+
+    def cumulative(self, x, lag=0):
+        """Somme cumulée (fenêtre glissante de window - lag bougies si window)"""
+        if self.window is None:
+            return x.cumsum()
+        return x.rolling(self.window - lag, min_periods=1).sum()
+
+    def node_outputs(self, node):
+        """Séries des sorties d'un nœud (calculées une fois)"""
+        outputs = self._outputs.get(node)
+        if outputs is None:
+            outputs = self._outputs[node] = node(self)
+        return outputs
+
+    def frame(self):
+        """DataFrame de toutes les sorties, une ligne par bougie (price = clôture)"""
+        columns = {"price": self.c}
+        for keys, node in NODES:
+            columns.update(self.node_outputs(node))
+        return pd.DataFrame(columns)
+
+
+class LazyIndicators(dict):
+    """Indicateurs d'un actif à sa dernière bougie, calculés nœud par nœud au premier accès"""
+
+    def __init__(self, df):
+        super().__init__(price=df["close"].iloc[-1])
+        self.graph = IndicatorGraph(df)
+
+    def __missing__(self, key):
+        node = OUTPUTS.get(key)
+        if node is None:
+            raise KeyError(key)
+        self.update((name, values.iloc[-1]) for name, values in self.graph.node_outputs(node).items())
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def materialize(self):
+        """Dictionnaire complet (toutes les sorties), sans référence aux bougies"""
+        out = {"price": self["price"]}
+        out.update((key, self[key]) for key in OUTPUTS)
+        out.update(self)  # Clés ajoutées par le bot (scores, timeframes supérieurs)
+        return out
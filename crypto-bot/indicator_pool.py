@@ -0,0 +1,49 @@
+"""Calcul des indicateurs dans un pool de processus (univers complet des perps)
+
+Au fil de l'eau, un moteur incrémental ne coûte qu'une bougie par cycle : le
+travail lourd est la chauffe d'un moteur (CANDLE_HISTORY bougies : premier
+cycle, nouvel actif, historique réécrit, et chacun des timeframes supérieurs).
+Les chauffes sont réparties entre les workers ; les moteurs reviennent dans le
+processus principal (un IndicatorEngine se sérialise en ~12 Ko), qui garde
+seul l'état. Le mode batch reste dans le processus principal : sa passe 2-D
+coûte moins que l'envoi des DataFrames aux workers.
+
+Contexte fork : tous les workers sont lancés à la création du pool, qui doit
+donc précéder les threads du bot (writer BDD, surveillance des stops, flux).
+"""
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from indicator_engine import IndicatorEngine
+
+
+def warm_engine(timestamps, values, window):
+    """Moteur incrémental alimenté par des bougies triées (timestamps (n,), OHLCV (n, 5))"""
+    engine = IndicatorEngine(window=window)
+    for timestamp, row in zip(timestamps.tolist(), values.tolist()):
+        engine.update(timestamp, *row)
+    return engine
+
+
+class IndicatorPool:
+    """Pool de processus partagé par tous les cycles"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+        self.executor.submit(int).result()  # Lance les workers maintenant, avant les threads du bot
+        self.warmed = 0
+
+    def warm_engines(self, jobs, window):
+        """{clé: (timestamps, valeurs)} -> {clé: IndicatorEngine chauffé}"""
+        keys = list(jobs)
+        chunksize = max(1, len(keys) // (self.workers * 4))
+        engines = self.executor.map(warm_engine, (jobs[k][0] for k in keys), (jobs[k][1] for k in keys),
+                                    itertools.repeat(window), chunksize=chunksize)
+        self.warmed += len(keys)
+        return dict(zip(keys, engines))
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
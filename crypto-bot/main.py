@@ -1,18 +1,60 @@
+import asyncio
+import itertools
+import threading
 import time
-import requests
-import pandas as pd
 import numpy as np
 import sqlite3
 from datetime import datetime
 import json
+import os
+import signal as os_signal
+
+from indicator_engine import IndicatorEngine
+from indicator_graph import LazyIndicators
+from batch_indicators import calculate_indicators_batch
+from indicator_pool import IndicatorPool
+from candle_buffer import INTERVAL_MS, CandleBuffer
+from candle_parser import CandleParser
+from candle_store import CandleStore
+from resample import TimeframeResampler
+from hl_client import (HyperliquidInfoClient, HyperliquidAPIError, WEIGHT_PER_MINUTE, DEFAULT_WEIGHT,
+                       CANDLES_PER_EXTRA_WEIGHT)
+from meta_cache import MetaCache
+from ws_feed import CandleStream
+from risk_monitor import RiskMonitor, rest_price_source
+from db_writer import DBWriter
+from trade_stats import TradeStats
+from checkpoint import Checkpointer, load_checkpoint
+from metrics import Metrics
+from feature_log import FeatureLog
 
 # ==================== CONFIGURATION ====================
 ASSETS = ["BTC", "ETH", "SOL", "ARB", "MATIC"]  # Cryptos à trader
+UNIVERSE_MODE = "assets"      # "assets" (liste ASSETS) ou "all" (tous les perps avec levier max >= 2)
+MAX_OPEN_POSITIONS = 5        # Positions simultanées max : les meilleurs signaux du cycle sont ouverts en premier
 INITIAL_CAPITAL = 1000         # Capital de simulation
 LEVERAGE = 2
 RISK_PER_TRADE = 0.01         # 1% risque par trade
 LOOP_INTERVAL = 60            # Check toutes les 1 minute
+RUN_MODE = "async"            # "async" (actifs récupérés en parallèle) ou "sync" (un par un)
+FETCH_CONCURRENCY = 8         # Requêtes Hyperliquid simultanées max en mode async
+REST_WEIGHT_SHARE = 0.8       # Part du budget de poids Hyperliquid pour les bougies (reste : allMids, métadonnées)
+DATA_SOURCE = "rest"          # "rest" (polling candleSnapshot) ou "websocket" (flux temps réel)
+WS_URL = "wss://api.hyperliquid.xyz/ws"  # ou ws://127.0.0.1:8765 avec ws_replay.py serve (SIGNAL_MEMO = False si --speed > 1)
 MIN_CONFIRMATIONS = 5         # Signal min 5/7 (réduit pour plus de trades)
+RSI_BULL = 36                 # Condition haussière : RSI < 36
+RSI_BEAR = 64                 # Condition baissière : RSI > 64
+RSI_OVERBOUGHT = 70           # Filtre : pas de LONG au-dessus (marché surchauffé)
+RSI_OVERSOLD = 30             # Filtre : pas de SHORT en dessous (marché survendu)
+CANDLE_INTERVAL = "5m"        # Timeframe des bougies
+CANDLE_HISTORY = 300          # Bougies conservées par actif
+CANDLE_STORE_DIR = "candles"  # Archive locale des bougies téléchargées (None pour désactiver)
+INDICATOR_MODE = "incremental" # "incremental" (O(1) par bougie), "batch" (tous les actifs en 2-D) ou "full"
+BATCH_FLOAT32 = False         # Mode batch en float32 (moins de bande passante mémoire)
+INDICATOR_WORKERS = 2         # Processus pour la chauffe des moteurs d'indicateurs (0 = thread principal)
+HIGHER_TIMEFRAMES = ["15m", "1h", "4h"]  # Rééchantillonnés localement depuis les bougies 5m ([] pour désactiver)
+MTF_CONFIRMATIONS = 0         # Timeframes supérieurs requis dans le sens du signal (0 = information seule)
+SIGNAL_MEMO = True            # Signal sur bougies clôturées, réutilisé jusqu'à la clôture suivante (seul le prix est mis à jour)
 
 # Configuration pour trades de 5min à 2h
 STOP_LOSS_PCT = 0.01          # 1% stop loss initial (plus large pour laisser respirer)
@@ -26,94 +68,177 @@ TRAILING_CONFIGS = [
     {"min_profit": 0.05, "trail_pct": 0.008},   # 0.8% à partir de 5%
 ]
 
+# Surveillance des stops indépendante de la boucle des signaux
+RISK_MONITOR = True           # Thread de surveillance haute fréquence des positions ouvertes
+RISK_CHECK_INTERVAL = 0.25    # Secondes entre deux vérifications des stops
+RISK_REST_PRICE_AGE = 1.0     # REST : allMids réutilisé pendant 1s (poids 2, 120/min) ; WebSocket : prix du dernier trade
+RISK_LATENCY_TARGET_MS = 1000 # Latence de détection visée pour une sortie
+
 DB_FILE = "trading_simulation.db"
+CHECKPOINT_FILE = "checkpoint.pkl"  # État en mémoire pour redémarrage à chaud (None pour désactiver)
+CHECKPOINT_INTERVAL = 60      # Secondes entre deux checkpoints
+METRICS_PORT = 9101           # Endpoint Prometheus local http://127.0.0.1:9101/metrics (None pour désactiver)
+FEATURE_LOG_DIR = "features"  # Indicateurs de chaque bougie évaluée, journal binaire (None pour désactiver ; lit tous les indicateurs, annule le gain du mode full paresseux)
+FEATURE_LOG_SEGMENT_MB = 64   # Taille d'un segment du journal...
+FEATURE_LOG_SEGMENTS = 16     # ...et segments conservés (les plus anciens sont supprimés)
+DB_COMMIT_INTERVAL = 1.0      # Écritures BDD validées par lots toutes les 1s...
+DB_COMMIT_BATCH = 100         # ...ou toutes les 100 requêtes
+META_SNAPSHOT_FILE = "meta_snapshot.json"  # Snapshot local des métadonnées Hyperliquid
+META_TTL = 6 * 3600           # Rafraîchissement des métadonnées toutes les 6h
 # =======================================================
 
-# Initialisation SQLite
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-cursor = conn.cursor()
-
-# Création des tables
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS trades (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    asset TEXT NOT NULL,
-    timestamp TEXT NOT NULL,
-    side TEXT NOT NULL,
-    entry_price REAL NOT NULL,
-    exit_price REAL,
-    size REAL NOT NULL,
-    leverage INTEGER,
-    pnl REAL,
-    pnl_pct REAL,
-    duration_minutes INTEGER,
-    exit_reason TEXT,
-    status TEXT DEFAULT 'OPEN',
-    
-    -- 30+ Indicateurs au moment de l'entrée
-    rsi REAL,
-    ema8 REAL,
-    ema21 REAL,
-    ema50 REAL,
-    ema200 REAL,
-    macd REAL,
-    macd_signal REAL,
-    macd_histogram REAL,
-    stoch_k REAL,
-    stoch_d REAL,
-    bb_upper REAL,
-    bb_middle REAL,
-    bb_lower REAL,
-    bb_width REAL,
-    atr REAL,
-    adx REAL,
-    cci REAL,
-    roc REAL,
-    williams_r REAL,
-    obv REAL,
-    vwap REAL,
-    volume_ratio REAL,
-    volatility REAL,
-    momentum REAL,
-    supertrend REAL,
-    supertrend_dir INTEGER,
-    price_vs_ema8 REAL,
-    price_vs_ema21 REAL,
-    price_vs_ema50 REAL,
-    price_vs_vwap REAL,
-    
-    -- Scores des signaux
-    bull_score INTEGER,
-    bear_score INTEGER,
-    
-    -- Contexte marché
-    trend_short TEXT,
-    trend_medium TEXT,
-    trend_long TEXT
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS portfolio (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp TEXT NOT NULL,
-    total_capital REAL,
-    available_capital REAL,
-    total_pnl REAL,
-    total_trades INTEGER,
-    winning_trades INTEGER,
-    losing_trades INTEGER,
-    win_rate REAL,
-    avg_win REAL,
-    avg_loss REAL,
-    max_drawdown REAL,
-    sharpe_ratio REAL
-)
-""")
-
-conn.commit()
+# Initialisation SQLite (connexion ouverte par init_db au démarrage du bot)
+conn = None  # Lectures ; les écritures passent par db_writer
+
+# Migration : colonnes ajoutées après la création initiale de la table
+TRADES_MIGRATIONS = [
+    ("exit_latency_ms", "REAL"),
+]
+
+
+# Index des requêtes du bot et des scripts view_*.sh (filtre status, tri timestamp, regroupement asset)
+TRADES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_trades_status_timestamp ON trades (status, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_asset_status ON trades (asset, status)",
+    "CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)",
+]
+
+
+def next_trade_id(db):
+    """Premier id libre de trades : le bot attribue les ids, le writer étant asynchrone"""
+    max_id = db.execute("SELECT MAX(id) FROM trades").fetchone()[0] or 0
+    seq = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'trades'").fetchone()
+    return max(max_id, seq[0] if seq else 0) + 1
+
+
+def init_db(path=DB_FILE):
+    """Ouvre la base SQLite, crée les tables et applique les migrations"""
+    db = sqlite3.connect(path, check_same_thread=False)
+    cur = db.cursor()
+    
+    # Création des tables
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asset TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        side TEXT NOT NULL,
+        entry_price REAL NOT NULL,
+        exit_price REAL,
+        size REAL NOT NULL,
+        leverage INTEGER,
+        pnl REAL,
+        pnl_pct REAL,
+        duration_minutes INTEGER,
+        exit_reason TEXT,
+        exit_latency_ms REAL,
+        status TEXT DEFAULT 'OPEN',
+    
+        -- 30+ Indicateurs au moment de l'entrée
+        rsi REAL,
+        ema8 REAL,
+        ema21 REAL,
+        ema50 REAL,
+        ema200 REAL,
+        macd REAL,
+        macd_signal REAL,
+        macd_histogram REAL,
+        stoch_k REAL,
+        stoch_d REAL,
+        bb_upper REAL,
+        bb_middle REAL,
+        bb_lower REAL,
+        bb_width REAL,
+        atr REAL,
+        adx REAL,
+        cci REAL,
+        roc REAL,
+        williams_r REAL,
+        obv REAL,
+        vwap REAL,
+        volume_ratio REAL,
+        volatility REAL,
+        momentum REAL,
+        supertrend REAL,
+        supertrend_dir INTEGER,
+        price_vs_ema8 REAL,
+        price_vs_ema21 REAL,
+        price_vs_ema50 REAL,
+        price_vs_vwap REAL,
+    
+        -- Scores des signaux
+        bull_score INTEGER,
+        bear_score INTEGER,
+    
+        -- Contexte marché
+        trend_short TEXT,
+        trend_medium TEXT,
+        trend_long TEXT
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS portfolio (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        total_capital REAL,
+        available_capital REAL,
+        total_pnl REAL,
+        total_trades INTEGER,
+        winning_trades INTEGER,
+        losing_trades INTEGER,
+        win_rate REAL,
+        avg_win REAL,
+        avg_loss REAL,
+        max_drawdown REAL,
+        sharpe_ratio REAL
+    )
+    """)
+    
+    existing_columns = {row[1] for row in cur.execute("PRAGMA table_info(trades)")}
+    for column, column_type in TRADES_MIGRATIONS:
+        if column not in existing_columns:
+            cur.execute(f"ALTER TABLE trades ADD COLUMN {column} {column_type}")
+    
+    for statement in TRADES_INDEXES:
+        cur.execute(statement)
+    
+    db.commit()
+    return db
+
+
+# Latences par étape et par cycle (exposées sur METRICS_PORT)
+metrics = Metrics("cryptobot")
+metrics.describe("stage_seconds", "Latence par étape du cycle (fetch, parse, buffer, archive, warmup, indicators, indicators_batch, signal, decision, selection), par actif sauf en UNIVERSE_MODE \"all\"")
+metrics.describe("cycle_seconds", "Durée d'un cycle complet (hors attente)")
+metrics.describe("universe_assets", "Actifs de l'univers tradable")
+metrics.describe("cycle_assets", "Actifs mis à jour et évalués au dernier cycle (budget de poids REST)")
+metrics.describe("cycle_overruns_total", "Cycles plus longs que LOOP_INTERVAL")
+metrics.describe("signal_memo_total", "Résultats par actif repris de la mémoire (hit) ou recalculés (miss), SIGNAL_MEMO")
+metrics.describe("db_commit_seconds", "Durée des commits groupés du writer SQLite")
+metrics.describe("db_errors_total", "Écritures SQLite perdues par type (execute, no_row : UPDATE sans ligne, commit)")
+
+
+def asset_label(asset):
+    """Label asset des latences par étape : tous les actifs confondus en UNIVERSE_MODE "all" (cardinalité)"""
+    return {} if UNIVERSE_MODE == "all" else {"asset": asset}
+
+
+# Client Hyperliquid partagé (keep-alive + budget de poids)
+info_client = HyperliquidInfoClient(pool_size=FETCH_CONCURRENCY)
+
+# Métadonnées des perps (szDecimals, maxLeverage...) : cache + snapshot disque
+meta_cache = MetaCache(info_client, META_SNAPSHOT_FILE, META_TTL)
 
 # Variables globales
+portfolio_lock = threading.RLock()  # Partagé entre la boucle des signaux et la surveillance des stops
+risk_monitor = None                 # RiskMonitor si RISK_MONITOR
+db_writer = None                    # DBWriter : écritures BDD hors du thread de trading
+trade_ids = None                    # Compteur des ids de trades (itertools.count)
+feature_log = None                  # FeatureLog si FEATURE_LOG_DIR
+indicator_pool = None               # IndicatorPool si INDICATOR_WORKERS
+trade_stats = TradeStats(INITIAL_CAPITAL)  # Statistiques cumulées, mises à jour à chaque fermeture
+checkpointer = Checkpointer(CHECKPOINT_FILE, CHECKPOINT_INTERVAL) if CHECKPOINT_FILE else None
 portfolio = {
     "capital": INITIAL_CAPITAL,
     "positions": {},  # {asset: {...}}
@@ -125,308 +250,607 @@ portfolio = {
 
 
 def get_tradable_assets():
-    """Récupère la liste des actifs tradables sur Hyperliquid"""
-    try:
-        url = "https://api.hyperliquid.xyz/info"
-        payload = {"type": "meta"}
-        r = requests.post(url, json=payload, timeout=5)
-        
-        if r.status_code != 200:
-            return ASSETS
-        
-        data = r.json()
-        
-        if isinstance(data, dict) and "universe" in data:
-            universe = data["universe"]
-            assets = [a["name"] for a in universe if a.get("maxLeverage", 0) >= 2]
-            filtered = [a for a in assets if a in ASSETS]
-            return filtered
-        else:
-            return ASSETS
-    except Exception:
+    """Récupère la liste des actifs tradables sur Hyperliquid (métadonnées en cache)
+    
+    UNIVERSE_MODE "all" : tous les perps avec un levier max >= 2, sinon ceux de ASSETS.
+    """
+    assets = meta_cache.assets(min_leverage=2)
+    
+    if not assets:
+        if meta_cache.last_error:
+            print(f"⚠️ Liste des actifs indisponible ({meta_cache.last_error}), fallback sur ASSETS")
         return ASSETS  # Fallback
+    
+    if UNIVERSE_MODE == "all":
+        return assets
+    return [a for a in assets if a in ASSETS]
 
 
-def get_ohlcv(asset):
-    """Récupère les données OHLCV réelles depuis Hyperliquid"""
+candle_parser = CandleParser()  # Schéma des réponses candleSnapshot, détecté à la première
+
+
+def fetch_candles(asset, start_time, end_time):
+    """Récupère les bougies réelles d'un actif depuis Hyperliquid sur [start_time, end_time] (ms)
+    
+    Retourne (timestamps int64 (n,), valeurs OHLCV float64 (n, 5)) ou None.
+    """
     try:
-        url = "https://api.hyperliquid.xyz/info"
         payload = {
             "type": "candleSnapshot",
-            "req": {"coin": asset, "interval": "5m", "startTime": 0}
+            "req": {"coin": asset, "interval": CANDLE_INTERVAL, "startTime": start_time, "endTime": end_time}
         }
-        
-        r = requests.post(url, json=payload, timeout=10)
-        
-        if r.status_code != 200:
-            return None
-        
-        response = r.json()
-        
-        # L'API Hyperliquid retourne un dictionnaire avec 'data' contenant les bougies
-        data = None
-        if isinstance(response, dict):
-            if 'data' in response:
-                data = response['data']
-            else:
-                # Essayer d'autres clés possibles
-                for key in ['candles', 'candle', 'snapshot', 'result']:
-                    if key in response:
-                        data = response[key]
-                        break
-        elif isinstance(response, list):
-            data = response
-        
-        if not data or len(data) == 0:
-            return None
-        
-        # Créer le DataFrame
-        try:
-            if len(data) > 0 and isinstance(data[0], dict):
-                mapped_data = []
-                for row in data:
-                    if isinstance(row, dict):
-                        mapped_row = {
-                            'timestamp': row.get('t', row.get('timestamp')),
-                            'open': row.get('o', row.get('open')),
-                            'high': row.get('h', row.get('high')),
-                            'low': row.get('l', row.get('low')),
-                            'close': row.get('c', row.get('close')),
-                            'volume': row.get('v', row.get('volume'))
-                        }
-                        mapped_data.append(mapped_row)
-                
-                df = pd.DataFrame(mapped_data)
-            else:
-                df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
-        except Exception as e:
-            return None
-        
-        # Vérifier que les colonnes nécessaires existent
-        required_cols = ["timestamp", "open", "high", "low", "close", "volume"]
-        if not all(col in df.columns for col in required_cols):
-            return None
-        
-        # Convertir en float (sauf timestamp)
-        for col in ["open", "high", "low", "close", "volume"]:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        df["timestamp"] = pd.to_numeric(df["timestamp"], errors='coerce')
-        df = df.dropna()
-        
-        if len(df) < 50:
-            return None
-        
-        return df.iloc[-300:]  # Garde 300 dernières bougies
-        
+    
+        with metrics.timer("stage_seconds", stage="fetch", **asset_label(asset)):
+            response = info_client.post(payload)
+        with metrics.timer("stage_seconds", stage="parse", **asset_label(asset)):
+            return candle_parser.parse(response)
+    
+    except HyperliquidAPIError as e:
+        print(f"  ❌ [{asset}] Erreur récupération données: {e}")
+        return None
     except Exception:
         return None
-        
-    except Exception as e:
-        print(f"  ❌ [{asset}] Erreur récupération données: {e}")
-        import traceback
-        traceback.print_exc()
+
+
+candle_buffers = {}  # {asset: CandleBuffer}
+fetched_at = {}      # {asset: time.monotonic() de la dernière requête REST de bougies}
+candle_stream = None  # CandleStream si DATA_SOURCE == "websocket"
+candle_store = CandleStore(CANDLE_STORE_DIR) if CANDLE_STORE_DIR else None
+
+
+def get_candle_buffer(asset):
+    """Buffer de bougies de l'actif (créé au premier accès)"""
+    buffer = candle_buffers.get(asset)
+    if buffer is None:
+        buffer = CandleBuffer(CANDLE_HISTORY, CANDLE_INTERVAL)
+        # Chauffe depuis l'archive locale : l'API ne complète que les bougies manquantes
+        if candle_store is not None:
+            timestamps, values = candle_store.tail(asset, CANDLE_INTERVAL, CANDLE_HISTORY)
+            if len(timestamps):
+                buffer.merge_arrays(np.array(timestamps), np.array(values))
+        candle_buffers[asset] = buffer
+    return buffer
+
+
+def archive_candles(asset, buffer):
+    """Ajoute à l'archive les nouvelles bougies du buffer (et celles des trous comblés)"""
+    if candle_store is not None and len(buffer):
+        candle_store.append(asset, CANDLE_INTERVAL, buffer.timestamps, buffer.values)
+
+
+def is_stream_fresh(buffer, now_ms):
+    """Le flux WebSocket tient-il le buffer à jour (connecté, sans trou, bougie récente) ?"""
+    if candle_stream is None or not candle_stream.connected or len(buffer) < CANDLE_HISTORY:
+        return False
+    return now_ms - buffer.last_timestamp < 2 * buffer.interval_ms and not buffer.gaps()
+
+
+def apply_stream_updates(updates):
+    """Applique les bougies reçues par WebSocket aux buffers (thread principal uniquement)"""
+    for kind, asset, candle in updates:
+        if kind != "candle" or asset not in candle_buffers:
+            continue  # Actif pas encore chauffé par REST : la chauffe le rattrapera
+        if candle_buffers[asset].merge_candle(*candle):
+            indicator_engines.pop(asset, None)
+
+
+def wait_next_cycle():
+    """Attend le prochain cycle : LOOP_INTERVAL, ou la clôture d'une bougie en mode WebSocket"""
+    if candle_stream is None:
+        time.sleep(LOOP_INTERVAL)
+        return
+    apply_stream_updates(candle_stream.wait_for_close(LOOP_INTERVAL))
+
+
+def get_ohlcv(asset):
+    """Récupère les données OHLCV : chauffe complète puis seulement les nouvelles bougies
+    
+    En mode WebSocket, le buffer est alimenté par le flux et REST ne sert
+    plus qu'à la chauffe et au comblement des trous.
+    """
+    buffer = get_candle_buffer(asset)
+    now_ms = int(time.time() * 1000)
+    if is_stream_fresh(buffer, now_ms):
+        archive_candles(asset, buffer)
+        return buffer.to_frame()
+    
+    fetched_at[asset] = time.monotonic()
+    candles = fetch_candles(asset, buffer.next_start_time(now_ms), now_ms)
+    if candles is None:
+        return None
+    
+    with metrics.timer("stage_seconds", stage="buffer", **asset_label(asset)):
+        rewritten = buffer.merge_arrays(*candles)
+    
+    # Combler les trous détectés dans l'historique (une seule tentative par trou)
+    for start, end in buffer.gaps():
+        candles = fetch_candles(asset, start, end)
+        if candles is not None:
+            rewritten |= buffer.merge_arrays(*candles)
+        buffer.known_gaps.add((start, end))
+    
+    # Historique réécrit : l'état incrémental des indicateurs doit être reconstruit
+    if rewritten:
+        indicator_engines.pop(asset, None)
+    
+    with metrics.timer("stage_seconds", stage="archive", **asset_label(asset)):
+        archive_candles(asset, buffer)
+    
+    if len(buffer) < 50:
         return None
+    
+    return buffer.to_frame()
+
+
+def get_candles(asset, until=None):
+    """Bougies à évaluer : celles de get_ohlcv, jusqu'à until inclus (dernière bougie clôturée)"""
+    df = get_ohlcv(asset)
+    if df is None or until is None:
+        return df
+    df = df[df["timestamp"] <= until]
+    return df if len(df) >= 50 else None
+
+
+def fetch_weight(asset, now_ms):
+    """Poids REST estimé pour mettre l'actif à jour (0 si le flux WebSocket le tient à jour)"""
+    if SIGNAL_MEMO and memo_entry(asset, now_ms) is not None:
+        return 0  # Aucune bougie clôturée depuis le dernier calcul : pas de requête
+    buffer = candle_buffers.get(asset)
+    if buffer is None:
+        missing = CANDLE_HISTORY  # Chauffe (l'archive locale peut la raccourcir)
+    elif is_stream_fresh(buffer, now_ms):
+        return 0
+    else:
+        missing = (now_ms - buffer.next_start_time(now_ms)) // buffer.interval_ms + 1
+    return DEFAULT_WEIGHT + missing // CANDLES_PER_EXTRA_WEIGHT
+
+
+def schedule_assets(assets):
+    """Actifs mis à jour ce cycle, dans le budget de poids REST d'un LOOP_INTERVAL
+    
+    Positions ouvertes d'abord, puis les actifs rafraîchis il y a le plus
+    longtemps : au-delà du budget (~48 actifs par minute en REST), l'univers
+    est parcouru en plusieurs cycles. Les actifs tenus à jour par le flux
+    WebSocket ne coûtent rien. Un actif non rafraîchi n'est pas évalué (pas de
+    signal sur des bougies périmées).
+    """
+    budget = WEIGHT_PER_MINUTE * LOOP_INTERVAL / 60 * REST_WEIGHT_SHARE
+    now_ms = int(time.time() * 1000)
+    selected = set()
+    for asset in sorted(assets, key=lambda a: (a not in portfolio["positions"], fetched_at.get(a, 0))):
+        weight = fetch_weight(asset, now_ms)
+        if weight <= budget:
+            budget -= weight
+            selected.add(asset)
+    return [a for a in assets if a in selected]
 
 
 def calculate_all_indicators(df):
-    """Calcule 30+ indicateurs techniques"""
+    """Calcule 30+ indicateurs techniques (toutes les sorties du graphe indicator_graph)"""
     if df is None or len(df) < 50:
         return None
     
-    c = df["close"]
-    h = df["high"]
-    l = df["low"]
-    v = df["volume"]
-    
-    indicators = {"price": c.iloc[-1]}
-    
-    # === 1. RSI ===
-    delta = c.diff()
-    gain = delta.clip(lower=0).rolling(14).mean()
-    loss = -delta.clip(upper=0).rolling(14).mean()
-    rs = gain / (loss + 1e-10)
-    rsi = 100 - (100 / (1 + rs))
-    indicators["rsi"] = rsi.iloc[-1]
-    
-    # === 2. EMAs (8, 21, 50, 200) ===
-    for period in [8, 21, 50, 200]:
-        ema = c.ewm(span=period, adjust=False).mean()
-        indicators[f"ema{period}"] = ema.iloc[-1]
-        indicators[f"price_vs_ema{period}"] = (c.iloc[-1] - ema.iloc[-1]) / ema.iloc[-1] * 100
-    
-    # === 3. MACD ===
-    ema12 = c.ewm(span=12, adjust=False).mean()
-    ema26 = c.ewm(span=26, adjust=False).mean()
-    macd = ema12 - ema26
-    macd_signal = macd.ewm(span=9, adjust=False).mean()
-    macd_histogram = macd - macd_signal
-    indicators["macd"] = macd.iloc[-1]
-    indicators["macd_signal"] = macd_signal.iloc[-1]
-    indicators["macd_histogram"] = macd_histogram.iloc[-1]
-    
-    # === 4. Stochastic ===
-    low14 = l.rolling(14).min()
-    high14 = h.rolling(14).max()
-    k = 100 * (c - low14) / (high14 - low14 + 1e-10)
-    d = k.rolling(3).mean()
-    indicators["stoch_k"] = k.iloc[-1]
-    indicators["stoch_d"] = d.iloc[-1]
-    
-    # === 5. Bollinger Bands ===
-    bb_mid = c.rolling(20).mean()
-    bb_std = c.rolling(20).std()
-    bb_upper = bb_mid + 2 * bb_std
-    bb_lower = bb_mid - 2 * bb_std
-    indicators["bb_upper"] = bb_upper.iloc[-1]
-    indicators["bb_middle"] = bb_mid.iloc[-1]
-    indicators["bb_lower"] = bb_lower.iloc[-1]
-    indicators["bb_width"] = (bb_upper.iloc[-1] - bb_lower.iloc[-1]) / bb_mid.iloc[-1] * 100
-    
-    # === 6. ATR (Average True Range) ===
-    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
-    atr = tr.rolling(14).mean()
-    indicators["atr"] = atr.iloc[-1]
-    
-    # === 7. ADX (Average Directional Index) ===
-    plus_dm = h.diff().clip(lower=0)
-    minus_dm = -l.diff().clip(upper=0)
-    tr_sum = tr.rolling(14).sum()
-    plus_di = 100 * (plus_dm.rolling(14).sum() / tr_sum)
-    minus_di = 100 * (minus_dm.rolling(14).sum() / tr_sum)
-    dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di + 1e-10)
-    adx = dx.rolling(14).mean()
-    indicators["adx"] = adx.iloc[-1]
-    
-    # === 8. CCI (Commodity Channel Index) ===
-    tp = (h + l + c) / 3
-    cci = (tp - tp.rolling(20).mean()) / (0.015 * tp.rolling(20).std() + 1e-10)
-    indicators["cci"] = cci.iloc[-1]
-    
-    # === 9. ROC (Rate of Change) ===
-    roc = ((c - c.shift(10)) / c.shift(10) * 100)
-    indicators["roc"] = roc.iloc[-1]
-    
-    # === 10. Williams %R ===
-    williams_r = -100 * (high14 - c) / (high14 - low14 + 1e-10)
-    indicators["williams_r"] = williams_r.iloc[-1]
-    
-    # === 11. OBV (On Balance Volume) ===
-    obv = (v * np.sign(c.diff())).cumsum()
-    indicators["obv"] = obv.iloc[-1]
-    
-    # === 12. VWAP ===
-    vwap = (v * (h + l + c) / 3).cumsum() / v.cumsum()
-    indicators["vwap"] = vwap.iloc[-1]
-    indicators["price_vs_vwap"] = (c.iloc[-1] - vwap.iloc[-1]) / vwap.iloc[-1] * 100
-    
-    # === 13. Volume ===
-    vol_avg = v.rolling(20).mean()
-    indicators["volume_ratio"] = v.iloc[-1] / vol_avg.iloc[-1]
-    
-    # === 14. Volatilité ===
-    indicators["volatility"] = c.pct_change(fill_method=None).rolling(20).std().iloc[-1] * 100
-    
-    # === 15. Momentum ===
-    indicators["momentum"] = c.iloc[-1] - c.iloc[-10]
-    
-    # === 16. SuperTrend ===
-    hl2 = (h + l) / 2
-    upper_band = hl2 + 3 * atr
-    lower_band = hl2 - 3 * atr
-    supertrend = pd.Series(index=c.index, dtype=float)
-    supertrend_dir = pd.Series(index=c.index, dtype=int)
-    
-    for i in range(1, len(c)):
-        if c.iloc[i] > upper_band.iloc[i-1]:
-            supertrend.iloc[i] = lower_band.iloc[i]
-            supertrend_dir.iloc[i] = 1
-        elif c.iloc[i] < lower_band.iloc[i-1]:
-            supertrend.iloc[i] = upper_band.iloc[i]
-            supertrend_dir.iloc[i] = -1
-        else:
-            supertrend.iloc[i] = supertrend.iloc[i-1]
-            supertrend_dir.iloc[i] = supertrend_dir.iloc[i-1]
+    return LazyIndicators(df).materialize()
+
+
+indicator_engines = {}  # {asset: IndicatorEngine}
+
+
+def update_indicators(asset, df):
+    """Met à jour les indicateurs d'un actif avec les nouvelles bougies uniquement"""
+    if INDICATOR_MODE != "incremental":
+        # Mode full : entrées du signal d'abord, le reste à l'ouverture ou pour le journal des features
+        return LazyIndicators(df) if df is not None and len(df) >= 50 else None
     
-    indicators["supertrend"] = supertrend.iloc[-1]
-    indicators["supertrend_dir"] = supertrend_dir.iloc[-1]
+    if df is None or len(df) < 50:
+        return None
     
-    # === 17. Trends (court/moyen/long terme) ===
-    indicators["trend_short"] = "UP" if indicators["ema8"] > indicators["ema21"] else "DOWN"
-    indicators["trend_medium"] = "UP" if indicators["ema21"] > indicators["ema50"] else "DOWN"
-    indicators["trend_long"] = "UP" if indicators["ema50"] > indicators["ema200"] else "DOWN"
+    engine = indicator_engines.get(asset)
+    # Premier passage ou trou dans l'historique : on repart des bougies reçues
+    if engine is None or not engine.is_contiguous(df["timestamp"].iloc[0]):
+        engine = IndicatorEngine(window=CANDLE_HISTORY)
+        indicator_engines[asset] = engine
+    
+    return engine.feed(df)
+
+
+timeframe_resamplers = {}  # {(asset, intervalle): TimeframeResampler}
+timeframe_engines = {}     # {(asset, intervalle): IndicatorEngine}
+
+
+def get_resampler(asset, interval):
+    """Bougies du timeframe supérieur de l'actif (créées au premier accès, chauffées depuis l'archive)"""
+    key = (asset, interval)
+    resampler = timeframe_resamplers.get(key)
+    if resampler is None:
+        resampler = TimeframeResampler(interval, CANDLE_HISTORY)
+        if candle_store is not None:
+            factor = resampler.interval_ms // get_candle_buffer(asset).interval_ms
+            timestamps, values = candle_store.tail(asset, CANDLE_INTERVAL, CANDLE_HISTORY * factor)
+            resampler.warm(np.array(timestamps), np.array(values))
+        timeframe_resamplers[key] = resampler
+    return resampler
+
+
+def add_higher_timeframes(asset, indicators, until=None):
+    """Ajoute RSI, tendance (EMA8/EMA21) et SuperTrend de chaque timeframe supérieur, bougie en cours comprise
     
+    until : dernière bougie de base intégrée (None = tout le buffer).
+    None tant que le timeframe n'a pas assez de bougies (chauffe depuis l'archive, puis le fil de l'eau).
+    """
+    if indicators is None:
+        return None
+    base = get_candle_buffer(asset)
+    for interval in HIGHER_TIMEFRAMES:
+        key = (asset, interval)
+        resampler = get_resampler(asset, interval)
+        if resampler.update(base, until):
+            timeframe_engines.pop(key, None)
+        engine = timeframe_engines.get(key)
+        if engine is None:
+            engine = timeframe_engines[key] = IndicatorEngine(window=CANDLE_HISTORY)
+        
+        # Seules les bougies depuis la dernière intégrée (en cours comprise) passent dans le moteur
+        timestamps, values = resampler.buffer.timestamps, resampler.buffer.values
+        start = 0 if engine.last_timestamp is None else np.searchsorted(timestamps, engine.last_timestamp)
+        for timestamp, row in zip(timestamps[start:].tolist(), values[start:].tolist()):
+            engine.update(timestamp, *row)
+        
+        ind = engine.indicators
+        indicators[f"rsi_{interval}"] = ind["rsi"] if ind else None
+        indicators[f"trend_{interval}"] = ("UP" if ind["ema8"] > ind["ema21"] else "DOWN") if ind else None
+        indicators[f"supertrend_dir_{interval}"] = ind["supertrend_dir"] if ind else None
     return indicators
 
 
-def get_signal(ind):
-    """Génère signal LONG/SHORT avec score + filtres de sécurité"""
+def signal_rules(ind, params=None):
+    """Règles du signal, élément par élément : valeurs d'une bougie (get_signal) ou tableaux NumPy (backtest)
+    
+    ind : dictionnaire (ou DataFrame) des indicateurs ; trend_<tf> vaut "UP", "DOWN" ou None.
+    Retourne (long_ok, short_ok, bull_score, bear_score).
+    """
+    p = params or strategy_params()
+    rsi = ind["rsi"]
+    short_up = ind["ema8"] > ind["ema21"]      # trend_short == "UP"
+    medium_up = ind["ema21"] > ind["ema50"]    # trend_medium == "UP"
     
-    bull_conditions = [
-        ind["rsi"] < 36,
-        ind["ema8"] > ind["ema21"],
-        ind["macd"] > ind["macd_signal"] and ind["macd_histogram"] > 0,
-        ind["stoch_k"] < 25 and ind["stoch_k"] > ind["stoch_d"],
+    bull_score = sum([
+        rsi < p["rsi_bull"],
+        short_up,
+        (ind["macd"] > ind["macd_signal"]) & (ind["macd_histogram"] > 0),
+        (ind["stoch_k"] < 25) & (ind["stoch_k"] > ind["stoch_d"]),
         ind["price"] < ind["bb_lower"],
         ind["volume_ratio"] > 1.3,
-        ind["supertrend_dir"] == 1
-    ]
-    bull_score = sum(bull_conditions)
-    
-    bear_conditions = [
-        ind["rsi"] > 64,
+        ind["supertrend_dir"] == 1,
+    ])
+    bear_score = sum([
+        rsi > p["rsi_bear"],
         ind["ema8"] < ind["ema21"],
-        ind["macd"] < ind["macd_signal"] and ind["macd_histogram"] < 0,
-        ind["stoch_k"] > 75 and ind["stoch_k"] < ind["stoch_d"],
+        (ind["macd"] < ind["macd_signal"]) & (ind["macd_histogram"] < 0),
+        (ind["stoch_k"] > 75) & (ind["stoch_k"] < ind["stoch_d"]),
         ind["price"] > ind["bb_upper"],
         ind["volume_ratio"] > 1.3,
-        ind["supertrend_dir"] == -1
-    ]
-    bear_score = sum(bear_conditions)
-    
-    signal = None
+        ind["supertrend_dir"] == -1,
+    ])
     
     # ===== FILTRES DE SÉCURITÉ (éviter les trades à contre-tendance) =====
+    # (x ^ True : négation valable pour un booléen comme pour un tableau, NaN compris)
+    is_bull = bull_score >= p["min_confirmations"]
+    # LONG : RSI pas surchauffé, pas de tendance baissière court + moyen terme
+    long_ok = is_bull & ((rsi > p["rsi_overbought"]) ^ True) & (short_up | medium_up)
+    # SHORT : RSI pas survendu, pas de tendance haussière court + moyen terme
+    short_ok = ((is_bull ^ True) & (bear_score >= p["min_confirmations"])
+                & ((rsi < p["rsi_oversold"]) ^ True) & ((short_up & medium_up) ^ True))
     
-    # Pour un LONG: vérifier que RSI n'est pas trop élevé et tendance court terme favorable
-    if bull_score >= MIN_CONFIRMATIONS:
-        # Filtres de sécurité LONG
-        if ind["rsi"] > 70:  # Marché surchauffé, pas de LONG
-            pass
-        elif ind["trend_short"] == "DOWN" and ind["trend_medium"] == "DOWN":  # Tendance baissière forte
-            pass
-        else:
-            signal = "LONG"
-    
-    # Pour un SHORT: vérifier que RSI n'est pas trop bas et tendance court terme favorable
-    elif bear_score >= MIN_CONFIRMATIONS:
-        # Filtres de sécurité SHORT
-        if ind["rsi"] < 30:  # Marché survendu, pas de SHORT
-            pass
-        elif ind["trend_short"] == "UP" and ind["trend_medium"] == "UP":  # Tendance haussière forte
-            pass
-        else:
-            signal = "SHORT"
+    # Confirmation par les timeframes supérieurs (tendance dans le sens du signal)
+    if p["mtf_confirmations"]:
+        trends = [ind.get(f"trend_{interval}") for interval in HIGHER_TIMEFRAMES]
+        long_ok = long_ok & (sum([trend == "UP" for trend in trends]) >= p["mtf_confirmations"])
+        short_ok = short_ok & (sum([trend == "DOWN" for trend in trends]) >= p["mtf_confirmations"])
     
+    return long_ok, short_ok, bull_score, bear_score
+
+
+def get_signal(ind, params=None):
+    """Génère signal LONG/SHORT avec score + filtres de sécurité"""
+    long_ok, short_ok, bull_score, bear_score = signal_rules(ind, params)
+    signal = "LONG" if long_ok else "SHORT" if short_ok else None
     return signal, bull_score, bear_score
 
 
-def open_position_simulation(asset, side, price, indicators):
-    """Simule l'ouverture d'une position"""
+def with_signal(indicators):
+    """Ajoute les scores au dictionnaire d'indicateurs et retourne (indicateurs, signal)"""
+    if indicators is None:
+        return None
+    
+    signal, bull_score, bear_score = get_signal(indicators)
+    indicators["bull_score"] = bull_score
+    indicators["bear_score"] = bear_score
+    return indicators, signal
+
+
+def frame_end(df):
+    """Timestamp de la dernière bougie d'un DataFrame (None sans données)"""
+    return None if df is None or not len(df) else int(df["timestamp"].iloc[-1])
+
+
+def evaluate_asset(asset, df):
+    """Indicateurs et signal d'un actif à partir de ses bougies"""
+    if df is None:
+        return None
+    with metrics.timer("stage_seconds", stage="indicators", **asset_label(asset)):
+        indicators = add_higher_timeframes(asset, update_indicators(asset, df), frame_end(df))
+    with metrics.timer("stage_seconds", stage="signal", **asset_label(asset)):
+        return with_signal(indicators)
+
+
+def warm_engines(assets, frames):
+    """Chauffe dans le pool de processus les moteurs à (re)construire : base et timeframes supérieurs
+    
+    Les moteurs chauffés remplacent ceux du processus principal ; evaluate_asset
+    et add_higher_timeframes n'y intègrent plus que la bougie en cours.
+    """
+    jobs = {}
+    for asset in assets:
+        df = frames.get(asset)
+        if df is None or len(df) < 50:
+            continue
+        engine = indicator_engines.get(asset)
+        if INDICATOR_MODE == "incremental" and (engine is None or not engine.is_contiguous(df["timestamp"].iloc[0])):
+            jobs[asset] = (df["timestamp"].to_numpy(np.int64), df[["open", "high", "low", "close", "volume"]].to_numpy(np.float64))
+        for interval in HIGHER_TIMEFRAMES:
+            key = (asset, interval)
+            if key in timeframe_engines:
+                continue  # Réécriture d'historique (rare) : reconstruit par add_higher_timeframes
+            resampler = get_resampler(asset, interval)
+            resampler.update(get_candle_buffer(asset), frame_end(df))
+            if len(resampler.buffer):
+                jobs[key] = (resampler.buffer.timestamps, resampler.buffer.values)
+    if not jobs:
+        return
+    with metrics.timer("stage_seconds", stage="warmup"):
+        for key, engine in indicator_pool.warm_engines(jobs, CANDLE_HISTORY).items():
+            if isinstance(key, tuple):
+                timeframe_engines[key] = engine
+            else:
+                indicator_engines[key] = engine
+
+
+def evaluate_batch(assets, frames):
+    """Indicateurs de tous les actifs en une passe 2-D, puis signaux"""
+    with metrics.timer("stage_seconds", stage="indicators_batch"):
+        batch = calculate_indicators_batch(frames, CANDLE_HISTORY, float32=BATCH_FLOAT32)
+    results = []
+    for asset in assets:
+        with metrics.timer("stage_seconds", stage="indicators", **asset_label(asset)):
+            indicators = add_higher_timeframes(asset, batch.get(asset), frame_end(frames.get(asset)))
+        with metrics.timer("stage_seconds", stage="signal", **asset_label(asset)):
+            results.append(with_signal(indicators))
+    return results
+
+
+def evaluate_frames(assets, frames):
+    """Indicateurs et signaux de tous les actifs récupérés (chauffe dans le pool de processus)"""
+    if indicator_pool is not None:
+        warm_engines(assets, frames)
+    if INDICATOR_MODE == "batch":
+        return evaluate_batch(assets, frames)
+    return [evaluate_asset(asset, frames[asset]) for asset in assets]
+
+
+async def evaluate_cycle_async(assets, until=None):
+    """Récupère tous les actifs en parallèle (concurrence bornée)
+    
+    Chaque actif est calculé dès que ses bougies arrivent, ou tous ensemble
+    une fois récupérés (mode batch, pool de processus) ; les résultats sont
+    rendus dans l'ordre des actifs.
+    """
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    
+    async def fetch(asset):
+        async with semaphore:
+            return await asyncio.to_thread(get_candles, asset, until)
+    
+    if INDICATOR_MODE == "batch" or indicator_pool is not None:
+        frames = await asyncio.gather(*(fetch(asset) for asset in assets))
+        return evaluate_frames(assets, dict(zip(assets, frames)))
+    
+    async def fetch_and_evaluate(asset):
+        return evaluate_asset(asset, await fetch(asset))
+    
+    return await asyncio.gather(*(fetch_and_evaluate(asset) for asset in assets))
+
+
+def compute_cycle(assets, until=None):
+    """Récupération + indicateurs + signaux de chaque actif, jusqu'à la bougie until (None = en cours)"""
+    if RUN_MODE == "async":
+        return asyncio.run(evaluate_cycle_async(assets, until))
+    
+    if INDICATOR_MODE == "batch" or indicator_pool is not None:
+        return evaluate_frames(assets, {asset: get_candles(asset, until) for asset in assets})
+    
+    return [evaluate_asset(asset, get_candles(asset, until)) for asset in assets]
+
+
+signal_memo = {}  # {asset: {"candle_time", "revision", "indicators", "signal", "logged"}} si SIGNAL_MEMO
+rest_prices = rest_price_source(info_client, RISK_REST_PRICE_AGE)
+
+
+def live_prices():
+    """Derniers prix : trades WebSocket si le flux est connecté, sinon allMids REST"""
+    if candle_stream is not None and candle_stream.connected:
+        return dict(candle_stream.last_prices)
+    return rest_prices()
+
+
+def signal_candle_time(now_ms):
+    """Ouverture de la dernière bougie clôturée à now_ms"""
+    interval_ms = INTERVAL_MS[CANDLE_INTERVAL]
+    return now_ms - now_ms % interval_ms - interval_ms
+
+
+def memo_entry(asset, now_ms):
+    """Résultat mémorisé encore valable : même dernière bougie clôturée, historique non réécrit"""
+    entry = signal_memo.get(asset)
+    if entry is None or entry["candle_time"] != signal_candle_time(now_ms):
+        return None
+    buffer = candle_buffers.get(asset)
+    return entry if buffer is not None and buffer.revision == entry["revision"] else None
+
+
+def remember(asset, result, until):
+    """Mémorise le résultat calculé jusqu'à la bougie clôturée until"""
+    buffer = candle_buffers.get(asset)
+    end = 0 if buffer is None else np.searchsorted(buffer.timestamps, until, side="right")
+    if result is None or end == 0:
+        signal_memo.pop(asset, None)
+        return
+    signal_memo[asset] = {
+        "candle_time": int(buffer.timestamps[end - 1]),  # Bougie absente de l'API : pas de hit au cycle suivant
+        "revision": buffer.revision,
+        "indicators": result[0],
+        "signal": result[1],
+        "logged": False,
+    }
+
+
+def evaluate_cycle(assets):
+    """Résultats (indicateurs, signal) ou None pour chaque actif, dans l'ordre
+    
+    SIGNAL_MEMO : les signaux sont calculés jusqu'à la dernière bougie
+    clôturée, clé (actif, bougie). Tant qu'aucune autre ne se clôture, l'actif
+    reprend son résultat mémorisé sans requête de bougies ni calcul : seul le
+    prix en cours (allMids ou flux WebSocket) est mis à jour, pour les stops
+    et l'ouverture.
+    """
+    if not SIGNAL_MEMO:
+        return compute_cycle(assets)
+    
+    now_ms = int(time.time() * 1000)
+    until = signal_candle_time(now_ms)
+    hits = {}
+    for asset in assets:
+        entry = memo_entry(asset, now_ms)
+        if entry is not None:
+            hits[asset] = entry
+    prices = {}
+    if hits:
+        try:
+            prices = live_prices()
+        except HyperliquidAPIError as e:
+            print(f"⚠️ Prix indisponibles ({e}), recalcul complet")
+        hits = {asset: entry for asset, entry in hits.items() if asset in prices}
+    
+    misses = [asset for asset in assets if asset not in hits]
+    computed = dict(zip(misses, compute_cycle(misses, until)))
+    for asset in misses:
+        remember(asset, computed[asset], until)
+    metrics.inc("signal_memo_total", len(hits), result="hit")
+    metrics.inc("signal_memo_total", len(misses), result="miss")
+    
+    results = []
+    for asset in assets:
+        entry = hits.get(asset)
+        if entry is None:
+            results.append(computed[asset])
+            continue
+        entry["indicators"]["price"] = prices[asset][0]
+        results.append((entry["indicators"], entry["signal"]))
+    return results
+
+
+def strategy_params(**overrides):
+    """Paramètres de la stratégie (constantes du module), surchargeables pour le backtest"""
+    params = {
+        "min_confirmations": MIN_CONFIRMATIONS,
+        "rsi_bull": RSI_BULL,
+        "rsi_bear": RSI_BEAR,
+        "rsi_overbought": RSI_OVERBOUGHT,
+        "rsi_oversold": RSI_OVERSOLD,
+        "mtf_confirmations": MTF_CONFIRMATIONS,
+        "max_open_positions": MAX_OPEN_POSITIONS,
+        "stop_loss_pct": STOP_LOSS_PCT,
+        "min_trade_duration": MIN_TRADE_DURATION,
+        "max_trade_duration": MAX_TRADE_DURATION,
+        "trailing_configs": TRAILING_CONFIGS,
+        "risk_per_trade": RISK_PER_TRADE,
+        "leverage": LEVERAGE,
+    }
+    params.update(overrides)
+    return params
+
+
+def position_size(capital, price, params=None):
+    """Taille de position (size_usd, size_asset) basée sur le risque"""
+    p = params or strategy_params()
+    
     # Calcul de la taille basée sur le risque (si stop loss touché, on perd RISK_PER_TRADE % du capital)
     # Formule: size_usd × STOP_LOSS_PCT × LEVERAGE = capital × RISK_PER_TRADE
     # Donc: size_usd = (capital × RISK_PER_TRADE) / (STOP_LOSS_PCT × LEVERAGE)
-    size_risk_based = (portfolio["capital"] * RISK_PER_TRADE) / (STOP_LOSS_PCT * LEVERAGE)
+    size_risk_based = (capital * p["risk_per_trade"]) / (p["stop_loss_pct"] * p["leverage"])
     
     # Limiter par le capital disponible avec levier (on ne peut pas trader plus que capital × levier)
-    size_max_available = portfolio["capital"] * LEVERAGE
+    size_max_available = capital * p["leverage"]
     
     # Prendre le minimum des deux (respecter le risque ET le capital disponible)
     size_usd = min(size_risk_based, size_max_available)
     
-    size_asset = size_usd / price
+    return size_usd, size_usd / price
+
+
+def trade_pnl(side, entry_price, exit_price, size_usd, params=None):
+    """P&L d'un trade : (pnl_pct en fraction, pnl_usd)"""
+    leverage = (params or strategy_params())["leverage"]
+    if side == "LONG":
+        pnl_pct = (exit_price - entry_price) / entry_price
+    else:
+        pnl_pct = (entry_price - exit_price) / entry_price
+    
+    return pnl_pct, pnl_pct * size_usd * leverage
+
+
+INSERT_TRADE_SQL = """
+    INSERT INTO trades (
+        id, asset, timestamp, side, entry_price, size, leverage,
+        rsi, ema8, ema21, ema50, ema200,
+        macd, macd_signal, macd_histogram,
+        stoch_k, stoch_d,
+        bb_upper, bb_middle, bb_lower, bb_width,
+        atr, adx, cci, roc, williams_r, obv, vwap,
+        volume_ratio, volatility, momentum,
+        supertrend, supertrend_dir,
+        price_vs_ema8, price_vs_ema21, price_vs_ema50, price_vs_vwap,
+        bull_score, bear_score,
+        trend_short, trend_medium, trend_long
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def trade_row(trade_id, asset, timestamp, side, price, size_asset, indicators):
+    """Paramètres de INSERT_TRADE_SQL : trade ouvert avec les indicateurs d'entrée (id None = auto)"""
+    return (
+        trade_id, asset, timestamp, side, price, size_asset, LEVERAGE,
+        indicators["rsi"], indicators["ema8"], indicators["ema21"], indicators["ema50"], indicators["ema200"],
+        indicators["macd"], indicators["macd_signal"], indicators["macd_histogram"],
+        indicators["stoch_k"], indicators["stoch_d"],
+        indicators["bb_upper"], indicators["bb_middle"], indicators["bb_lower"], indicators["bb_width"],
+        indicators["atr"], indicators["adx"], indicators["cci"], indicators["roc"], indicators["williams_r"],
+        indicators["obv"], indicators["vwap"], indicators["volume_ratio"], indicators["volatility"], indicators["momentum"],
+        indicators["supertrend"], indicators["supertrend_dir"],
+        indicators["price_vs_ema8"], indicators["price_vs_ema21"], indicators["price_vs_ema50"], indicators["price_vs_vwap"],
+        indicators.get("bull_score", 0), indicators.get("bear_score", 0),
+        indicators["trend_short"], indicators["trend_medium"], indicators["trend_long"]
+    )
+
+
+def open_position_simulation(asset, side, price, indicators):
+    """Simule l'ouverture d'une position"""
+    if isinstance(indicators, LazyIndicators):
+        indicators = indicators.materialize()  # Sorties restantes pour l'INSERT, sans garder les bougies
+    size_usd, size_asset = position_size(portfolio["capital"], price)
     
     position = {
+        "id": next(trade_ids),  # Clé primaire de la ligne trades (fermeture par id)
         "asset": asset,
         "side": side,
         "entry_price": price,
@@ -441,34 +865,7 @@ def open_position_simulation(asset, side, price, indicators):
     portfolio["positions"][asset] = position
     
     # Sauvegarder en BDD
-    cursor.execute("""
-        INSERT INTO trades (
-            asset, timestamp, side, entry_price, size, leverage,
-            rsi, ema8, ema21, ema50, ema200,
-            macd, macd_signal, macd_histogram,
-            stoch_k, stoch_d,
-            bb_upper, bb_middle, bb_lower, bb_width,
-            atr, adx, cci, roc, williams_r, obv, vwap,
-            volume_ratio, volatility, momentum,
-            supertrend, supertrend_dir,
-            price_vs_ema8, price_vs_ema21, price_vs_ema50, price_vs_vwap,
-            bull_score, bear_score,
-            trend_short, trend_medium, trend_long
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        asset, datetime.now().isoformat(), side, price, size_asset, LEVERAGE,
-        indicators["rsi"], indicators["ema8"], indicators["ema21"], indicators["ema50"], indicators["ema200"],
-        indicators["macd"], indicators["macd_signal"], indicators["macd_histogram"],
-        indicators["stoch_k"], indicators["stoch_d"],
-        indicators["bb_upper"], indicators["bb_middle"], indicators["bb_lower"], indicators["bb_width"],
-        indicators["atr"], indicators["adx"], indicators["cci"], indicators["roc"], indicators["williams_r"],
-        indicators["obv"], indicators["vwap"], indicators["volume_ratio"], indicators["volatility"], indicators["momentum"],
-        indicators["supertrend"], indicators["supertrend_dir"],
-        indicators["price_vs_ema8"], indicators["price_vs_ema21"], indicators["price_vs_ema50"], indicators["price_vs_vwap"],
-        indicators.get("bull_score", 0), indicators.get("bear_score", 0),
-        indicators["trend_short"], indicators["trend_medium"], indicators["trend_long"]
-    ))
-    conn.commit()
+    db_writer.execute(INSERT_TRADE_SQL, trade_row(position["id"], asset, datetime.now().isoformat(), side, price, size_asset, indicators))
     
     # Calcul du risque réel
     actual_risk_pct = (size_usd * STOP_LOSS_PCT * LEVERAGE / portfolio["capital"]) * 100
@@ -484,23 +881,28 @@ def open_position_simulation(asset, side, price, indicators):
     print(f"{'='*70}\n")
 
 
-def close_position_simulation(asset, exit_price, reason):
-    """Simule la fermeture d'une position"""
+def close_position_simulation(asset, exit_price, reason, price_time_ms=None):
+    """Simule la fermeture d'une position
+    
+    price_time_ms : moment où le prix de sortie a été observé, pour mesurer
+    la latence de détection de la sortie.
+    """
     pos = portfolio["positions"].get(asset)
     if not pos:
         return
     
+    latency_ms = None
+    if price_time_ms is not None:
+        latency_ms = max(0, time.time() * 1000 - price_time_ms)
+        if risk_monitor is not None:
+            risk_monitor.record_exit(latency_ms)
+    
     entry_price = pos["entry_price"]
     side = pos["side"]
     duration = (datetime.now() - pos["entry_time"]).total_seconds() / 60
     
     # Calcul PnL
-    if side == "LONG":
-        pnl_pct = (exit_price - entry_price) / entry_price
-    else:
-        pnl_pct = (entry_price - exit_price) / entry_price
-    
-    pnl_usd = pnl_pct * pos["size_usd"] * LEVERAGE
+    pnl_pct, pnl_usd = trade_pnl(side, entry_price, exit_price, pos["size_usd"])
     
     # Mise à jour portfolio
     portfolio["capital"] += pnl_usd
@@ -511,16 +913,15 @@ def close_position_simulation(asset, exit_price, reason):
         portfolio["winning_trades"] += 1
     else:
         portfolio["losing_trades"] += 1
+    trade_stats.record(asset, pnl_usd)
     
     # Mise à jour BDD
-    cursor.execute("""
+    db_writer.execute("""
         UPDATE trades 
         SET exit_price = ?, pnl = ?, pnl_pct = ?, duration_minutes = ?, 
-            exit_reason = ?, status = 'CLOSED'
-        WHERE asset = ? AND status = 'OPEN'
-        ORDER BY id DESC LIMIT 1
-    """, (exit_price, pnl_usd, pnl_pct * 100, duration, reason, asset))
-    conn.commit()
+            exit_reason = ?, exit_latency_ms = ?, status = 'CLOSED'
+        WHERE id = ?
+    """, (exit_price, pnl_usd, pnl_pct * 100, duration, reason, latency_ms, pos["id"]), expect_rows=True)
     
     win_rate = portfolio["winning_trades"] / portfolio["total_trades"] * 100 if portfolio["total_trades"] > 0 else 0
     
@@ -538,20 +939,26 @@ def close_position_simulation(asset, exit_price, reason):
     del portfolio["positions"][asset]
 
 
-def check_stop_loss(asset, current_price):
-    """Vérifie stop-loss, trailing stop et durée maximale"""
-    pos = portfolio["positions"].get(asset)
-    if not pos:
-        return False
+def initial_stop(pos, params=None):
+    """Niveau du stop-loss initial d'une position"""
+    stop_loss_pct = (params or strategy_params())["stop_loss_pct"]
+    if pos["side"] == "LONG":
+        return pos["entry_price"] * (1 - stop_loss_pct)
+    return pos["entry_price"] * (1 + stop_loss_pct)
+
+
+def evaluate_exit(pos, current_price, duration, params=None):
+    """Règles de sortie : raison de fermeture ou None (met à jour le trailing stop de pos)
     
+    duration : minutes depuis l'ouverture (horloge réelle ou simulée).
+    """
+    p = params or strategy_params()
     entry_price = pos["entry_price"]
     side = pos["side"]
-    duration = (datetime.now() - pos["entry_time"]).total_seconds() / 60
     
     # Vérifier durée maximale (fermeture forcée après 2h)
-    if duration >= MAX_TRADE_DURATION:
-        close_position_simulation(asset, current_price, f"Durée max ({MAX_TRADE_DURATION}min)")
-        return True
+    if duration >= p["max_trade_duration"]:
+        return f"Durée max ({p['max_trade_duration']}min)"
     
     # Calcul profit actuel
     if side == "LONG":
@@ -560,10 +967,11 @@ def check_stop_loss(asset, current_price):
         profit_pct = (entry_price - current_price) / entry_price
     
     # Trailing stop dynamique (seulement si durée > MIN_TRADE_DURATION)
-    if duration >= MIN_TRADE_DURATION:
+    if duration >= p["min_trade_duration"]:
         if profit_pct > pos["highest_profit"]:
             pos["highest_profit"] = profit_pct
-            trail_distance = next((c["trail_pct"] for c in reversed(TRAILING_CONFIGS) if profit_pct >= c["min_profit"]), TRAILING_CONFIGS[0]["trail_pct"])
+            trailing_configs = p["trailing_configs"]
+            trail_distance = next((c["trail_pct"] for c in reversed(trailing_configs) if profit_pct >= c["min_profit"]), trailing_configs[0]["trail_pct"])
             
             if side == "LONG":
                 new_trail = current_price * (1 - trail_distance)
@@ -577,32 +985,46 @@ def check_stop_loss(asset, current_price):
                     pos["trailing_stop"] = max(pos["trailing_stop"], new_trail)
                 else:
                     pos["trailing_stop"] = min(pos["trailing_stop"], new_trail)
-        
+    
         # Check trailing stop
         if pos["trailing_stop"]:
             if (side == "LONG" and current_price <= pos["trailing_stop"]) or \
                (side == "SHORT" and current_price >= pos["trailing_stop"]):
-                close_position_simulation(asset, current_price, "Trailing Stop")
-                return True
+                return "Trailing Stop"
     
     # Check stop-loss initial (toujours actif)
-    initial_stop = entry_price * (1 - STOP_LOSS_PCT) if side == "LONG" else entry_price * (1 + STOP_LOSS_PCT)
-    if (side == "LONG" and current_price <= initial_stop) or \
-       (side == "SHORT" and current_price >= initial_stop):
-        close_position_simulation(asset, current_price, "Stop-Loss Initial")
-        return True
+    stop = initial_stop(pos, p)
+    if (side == "LONG" and current_price <= stop) or \
+       (side == "SHORT" and current_price >= stop):
+        return "Stop-Loss Initial"
+    
+    return None
+
+
+def check_stop_loss(asset, current_price, price_time_ms=None):
+    """Vérifie stop-loss, trailing stop et durée maximale"""
+    pos = portfolio["positions"].get(asset)
+    if not pos:
+        return False
     
-    return False
+    duration = (datetime.now() - pos["entry_time"]).total_seconds() / 60
+    reason = evaluate_exit(pos, current_price, duration)
+    if reason is None:
+        return False
+    
+    close_position_simulation(asset, current_price, reason, price_time_ms)
+    return True
 
 
 def save_portfolio_snapshot():
     """Sauvegarde l'état du portfolio"""
     win_rate = portfolio["winning_trades"] / portfolio["total_trades"] * 100 if portfolio["total_trades"] > 0 else 0
     
-    cursor.execute("""
+    db_writer.execute("""
         INSERT INTO portfolio (timestamp, total_capital, available_capital, total_pnl, 
-                              total_trades, winning_trades, losing_trades, win_rate)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                              total_trades, winning_trades, losing_trades, win_rate,
+                              avg_win, avg_loss, max_drawdown, sharpe_ratio)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         datetime.now().isoformat(),
         portfolio["capital"],
@@ -611,144 +1033,412 @@ def save_portfolio_snapshot():
         portfolio["total_trades"],
         portfolio["winning_trades"],
         portfolio["losing_trades"],
-        win_rate
+        win_rate,
+        trade_stats.avg_win,
+        trade_stats.avg_loss,
+        trade_stats.max_drawdown * 100,
+        trade_stats.sharpe
     ))
-    conn.commit()
 
 
 def print_statistics():
     """Affiche les statistiques de trading"""
-    cursor.execute("SELECT COUNT(*), AVG(pnl), SUM(pnl) FROM trades WHERE status='CLOSED'")
-    total, avg_pnl, sum_pnl = cursor.fetchone()
-    
-    cursor.execute("SELECT COUNT(*) FROM trades WHERE status='CLOSED' AND pnl > 0")
-    wins = cursor.fetchone()[0]
+    total = trade_stats.count
+    sum_pnl = trade_stats.total_pnl
+    wins = trade_stats.wins.count
     
-    if total and total > 0:
+    if total > 0:
         print("\n" + "="*70)
         print("📊 STATISTIQUES DE SIMULATION")
         print("="*70)
         print(f"Capital actuel: ${portfolio['capital']:.2f} (Initial: ${INITIAL_CAPITAL})")
         print(f"PnL Total: ${sum_pnl:.2f} ({(sum_pnl/INITIAL_CAPITAL)*100:+.2f}%)")
         print(f"Trades: {total} | Gagnants: {wins} | Win Rate: {wins/total*100:.1f}%")
-        print(f"PnL moyen: ${avg_pnl:.2f}")
+        print(f"PnL moyen: ${trade_stats.pnl.mean:.2f} | Gain moyen: ${trade_stats.avg_win or 0:.2f} | Perte moyenne: ${trade_stats.avg_loss or 0:.2f}")
+        print(f"Drawdown max: {trade_stats.max_drawdown*100:.1f}% | Sharpe (par trade): {trade_stats.sharpe or 0:.2f}")
+        for line in trade_stats.asset_lines():
+            print(f"   {line}")
         print(f"Positions ouvertes: {len(portfolio['positions'])}")
+        for line in info_client.format_stats():
+            print(f"API {line}")
+        if risk_monitor is not None:
+            print(risk_monitor.summary())
+        print(db_writer.summary())
+        if feature_log is not None:
+            print(feature_log.summary())
+        print(cycle_summary())
         print("="*70 + "\n")
 
 
-# ==================== BOUCLE PRINCIPALE ====================
-# S'assurer que le dossier logs existe
-import os
-os.makedirs("logs", exist_ok=True)
+def checkpoint_state():
+    """État en mémoire à sauvegarder (à appeler sous portfolio_lock)"""
+    return {
+        "interval": CANDLE_INTERVAL,
+        "portfolio": portfolio,
+        "trade_stats": trade_stats,
+        "candle_buffers": candle_buffers,
+        "indicator_engines": indicator_engines,
+        "timeframe_resamplers": timeframe_resamplers,
+        "timeframe_engines": timeframe_engines,
+    }
 
-print("="*70)
-print("🤖 BOT SIMULATION - Collecte de données ML")
-print("="*70)
-print(f"Capital: ${INITIAL_CAPITAL} | Assets: {', '.join(ASSETS)}")
-print(f"Database: {DB_FILE}")
-print("="*70 + "\n")
 
-iteration = 0
-while True:
-    try:
-        iteration += 1
+def restore_checkpoint(db):
+    """Reprend le dernier checkpoint, réconcilié avec la table trades
+    
+    Les lignes OPEN de la base font foi pour les positions ouvertes ; le
+    checkpoint leur rend leur état (trailing stop, plus haut profit). Les
+    fermetures postérieures au checkpoint sont reprises depuis la base.
+    """
+    global trade_stats
+    state = load_checkpoint(CHECKPOINT_FILE) if CHECKPOINT_FILE else None
+    saved_positions = {}
+    
+    if state is None:
+        trade_stats.load(db)
+    else:
+        saved_positions = {pos["id"]: pos for pos in state["portfolio"]["positions"].values()}
+        saved_stats = state["trade_stats"]
+        closed = db.execute("SELECT COUNT(*) FROM trades WHERE status = 'CLOSED'").fetchone()[0]
+        if closed != saved_stats.count:
+            trade_stats = TradeStats(INITIAL_CAPITAL)
+            trade_stats.load(db)
+        else:
+            trade_stats = saved_stats
         
-        tradable_assets = get_tradable_assets()
+        # Compteurs de la session + trades fermés après le checkpoint
+        saved = state["portfolio"]
+        pnl_since = trade_stats.total_pnl - saved_stats.total_pnl
+        portfolio["capital"] = saved["capital"] + pnl_since
+        portfolio["total_pnl"] = saved["total_pnl"] + pnl_since
+        portfolio["total_trades"] = saved["total_trades"] + trade_stats.count - saved_stats.count
+        portfolio["winning_trades"] = saved["winning_trades"] + trade_stats.wins.count - saved_stats.wins.count
+        portfolio["losing_trades"] = saved["losing_trades"] + trade_stats.losses.count - saved_stats.losses.count
         
-        # Afficher un header toutes les 10 cycles
-        if iteration % 10 == 1:
-            cursor.execute("SELECT COUNT(*), SUM(pnl) FROM trades WHERE status='CLOSED'")
-            result = cursor.fetchone()
-            total_trades = result[0] if result[0] else 0
-            total_pnl = result[1] if result[1] else 0.0
+        if state["interval"] == CANDLE_INTERVAL:
+            candle_buffers.update(state["candle_buffers"])
+            indicator_engines.update(state["indicator_engines"])
+            timeframe_resamplers.update(state.get("timeframe_resamplers", {}))
+            timeframe_engines.update(state.get("timeframe_engines", {}))
+    
+    portfolio["positions"].clear()
+    rows = db.execute("SELECT id, asset, side, entry_price, size, timestamp FROM trades WHERE status = 'OPEN' ORDER BY id")
+    for trade_id, asset, side, entry_price, size, timestamp in rows:
+        if asset in portfolio["positions"]:
+            print(f"⚠️ {asset}: trade OPEN #{portfolio['positions'][asset]['id']} remplacé par #{trade_id}")
+        pos = saved_positions.pop(trade_id, None)
+        if pos is None:
+            # Position ouverte après le checkpoint : état de trailing stop reconstruit
+            pos = {
+                "id": trade_id,
+                "asset": asset,
+                "side": side,
+                "entry_price": entry_price,
+                "entry_time": datetime.fromisoformat(timestamp),
+                "size": size,
+                "size_usd": size * entry_price,
+                "highest_profit": 0.0,
+                "trailing_stop": None,
+                "indicators": {}
+            }
+        portfolio["positions"][asset] = pos
+    
+    lost = [pos["asset"] for pos in saved_positions.values()
+            if db.execute("SELECT 1 FROM trades WHERE id = ?", (pos["id"],)).fetchone() is None]
+    if lost:
+        print(f"⚠️ Positions du checkpoint absentes de la base (écriture perdue): {', '.join(lost)}")
+    return state is not None
+
+
+def save_checkpoint(background=True):
+    """Sauvegarde l'état en mémoire (sérialisation ici, écriture disque en arrière-plan)"""
+    if checkpointer is None:
+        return
+    with portfolio_lock:
+        checkpointer.save(checkpoint_state(), background)
+
+
+def record_cycle_metrics(elapsed, universe_size, evaluated):
+    """Durée du cycle face à la taille de l'univers, dépassements de LOOP_INTERVAL et état du portfolio"""
+    metrics.observe("cycle_seconds", elapsed)
+    if elapsed > LOOP_INTERVAL:
+        metrics.inc("cycle_overruns_total")
+    metrics.set("cycle_last_seconds", elapsed)
+    metrics.set("universe_assets", universe_size)
+    metrics.set("cycle_assets", evaluated)
+    metrics.set("loop_interval_seconds", LOOP_INTERVAL)
+    metrics.set("open_positions", len(portfolio["positions"]))
+    metrics.set("capital_usd", portfolio["capital"])
+    metrics.set("db_queue_size", db_writer.queue.qsize())
+
+
+def cycle_summary():
+    """Durée moyenne des cycles face à LOOP_INTERVAL et à la taille de l'univers"""
+    cycles = metrics.histograms.get(("cycle_seconds", ()))
+    if cycles is None or not cycles.count:
+        return "Cycles: aucun"
+    gauges = metrics.gauges
+    line = (f"Cycles: {cycles.sum / cycles.count:.1f}s en moyenne (dernier {gauges[('cycle_last_seconds', ())]:.1f}s) "
+            f"/ {LOOP_INTERVAL}s | Univers: {gauges[('universe_assets', ())]} actifs, "
+            f"{gauges[('cycle_assets', ())]} évalués au dernier cycle | "
+            f"{metrics.counters.get(('cycle_overruns_total', ()), 0)} dépassements")
+    if indicator_pool is not None:
+        line += f" | {indicator_pool.warmed} moteurs chauffés ({indicator_pool.workers} workers)"
+    if SIGNAL_MEMO:
+        hits = metrics.counters.get(("signal_memo_total", (("result", "hit"),)), 0)
+        misses = metrics.counters.get(("signal_memo_total", (("result", "miss"),)), 0)
+        if hits + misses:
+            line += f" | Mémo signaux: {hits} hits / {misses} misses ({hits / (hits + misses) * 100:.0f}%)"
+    return line
+
+
+def log_features(asset, indicators, signal, time_ms):
+    """Ajoute les indicateurs de la bougie évaluée au journal (avec ou sans signal)"""
+    if feature_log is None:
+        return
+    entry = signal_memo.get(asset) if SIGNAL_MEMO else None
+    if entry is None:
+        feature_log.append(time_ms, get_candle_buffer(asset).last_timestamp, asset, indicators, signal)
+    elif not entry["logged"]:  # Une ligne par bougie clôturée
+        entry["logged"] = True
+        feature_log.append(time_ms, entry["candle_time"], asset, indicators, signal)
+
+
+def process_asset(asset, indicators, signal, iteration, price_time_ms):
+    """Suivi de la position ou affichage du signal ; True si le signal peut ouvrir une position"""
+    bull_score = indicators["bull_score"]
+    bear_score = indicators["bear_score"]
+    
+    current_price = indicators["price"]
+    has_position = asset in portfolio["positions"]
+    
+    # Gestion positions existantes
+    if has_position:
+        pos = portfolio["positions"][asset]
+        duration = (datetime.now() - pos["entry_time"]).total_seconds() / 60
+    
+        if pos["side"] == "LONG":
+            pnl_pct = (current_price - pos["entry_price"]) / pos["entry_price"] * 100
+        else:
+            pnl_pct = (pos["entry_price"] - current_price) / pos["entry_price"] * 100
+    
+        pnl_usd = pnl_pct * pos["size_usd"] * LEVERAGE / 100
+        duration_str = f"{int(duration)}min" if duration < 60 else f"{int(duration/60)}h{int(duration%60)}min"
+        pnl_emoji = "🟢" if pnl_usd > 0 else "🔴" if pnl_usd < 0 else "⚪"
+    
+        print(f"{pnl_emoji} {asset} {pos['side']}: ${current_price:.2f} | P&L: {pnl_pct:+.2f}% (${pnl_usd:+.2f}) | Durée: {duration_str}")
+    
+        check_stop_loss(asset, current_price, price_time_ms)
+    else:
+        # Afficher les scores même sans position (pour voir ce qui se passe)
+        rsi = indicators.get("rsi", 0)
+        signal_emoji = "🟢" if signal == "LONG" else "🔴" if signal == "SHORT" else "⚪"
+        bull_emoji = "✅" if bull_score >= MIN_CONFIRMATIONS else "⏳"
+        bear_emoji = "✅" if bear_score >= MIN_CONFIRMATIONS else "⏳"
+    
+        # Afficher toutes les 2 itérations pour ne pas surcharger
+        if iteration % 2 == 0:
+            # Afficher les raisons de filtrage
+            filter_reason = ""
+            if bull_score >= MIN_CONFIRMATIONS and not signal:
+                if rsi > RSI_OVERBOUGHT:
+                    filter_reason = " ⚠️ LONG filtré (RSI surchauffé)"
+                elif indicators["trend_short"] == "DOWN" and indicators["trend_medium"] == "DOWN":
+                    filter_reason = " ⚠️ LONG filtré (tendance baissière)"
+                else:
+                    filter_reason = " ⚠️ LONG filtré (timeframes supérieurs)"
+            elif bear_score >= MIN_CONFIRMATIONS and not signal:
+                if rsi < RSI_OVERSOLD:
+                    filter_reason = " ⚠️ SHORT filtré (RSI survendu)"
+                elif indicators["trend_short"] == "UP" and indicators["trend_medium"] == "UP":
+                    filter_reason = " ⚠️ SHORT filtré (tendance haussière)"
+                else:
+                    filter_reason = " ⚠️ SHORT filtré (timeframes supérieurs)"
             
-            print(f"\n{'='*70}")
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] Cycle #{iteration} | Trades fermés: {total_trades} | P&L Total: ${total_pnl:+.2f}")
-            print(f"{'='*70}")
-        
-        # Afficher un message de surveillance au début de chaque cycle
-        if iteration % 2 == 0 and len(portfolio["positions"]) == 0:
-            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 🔍 Analyse des signaux...")
-        
-        for asset in tradable_assets:
-            df = get_ohlcv(asset)
-            if df is None:
-                continue
+            print(f"{signal_emoji} {asset}: ${current_price:.2f} | RSI:{rsi:.1f} | Bull:{bull_emoji}{bull_score}/7 | Bear:{bear_emoji}{bear_score}/7 | Signal: {signal or 'AUCUN'}{filter_reason}")
+    
+    # Signaux de trading (ouverts par open_best_signals après tous les actifs du cycle)
+    return signal is not None and not has_position
+
+
+def signal_rank(signal, bull_score, bear_score, volume_ratio):
+    """Clé de classement d'un signal : confirmations dans son sens, puis volume relatif"""
+    score = bull_score if signal == "LONG" else bear_score
+    return score, 0.0 if np.isnan(volume_ratio) else volume_ratio
+
+
+def open_best_signals(candidates):
+    """Ouvre les meilleurs signaux du cycle dans la limite de MAX_OPEN_POSITIONS
+    
+    candidates : [(actif, signal, indicateurs)] ; retourne le nombre de signaux écartés.
+    """
+    ranked = sorted(candidates, reverse=True, key=lambda c: signal_rank(
+        c[1], c[2]["bull_score"], c[2]["bear_score"], c[2]["volume_ratio"]))
+    slots = max(0, MAX_OPEN_POSITIONS - len(portfolio["positions"]))
+    for asset, signal, indicators in ranked[:slots]:
+        open_position_simulation(asset, signal, indicators["price"], indicators)
+    skipped = len(ranked) - min(slots, len(ranked))
+    if skipped:
+        print(f"⏭️ {skipped} signal(s) écarté(s) : {MAX_OPEN_POSITIONS} positions max "
+              f"({', '.join(f'{a} {s}' for a, s, _ in ranked[slots:])})")
+    return skipped
+
+
+# ==================== BOUCLE PRINCIPALE ====================
+def stop_on_sigterm(signum, frame):
+    """SIGTERM (systemd) : interrompt la boucle comme un Ctrl-C"""
+    raise KeyboardInterrupt
+
+
+def shutdown():
+    """Arrêt : plus aucune écriture, checkpoint final, file BDD vidée, puis statistiques finales
+
+    Appelé quelle que soit la sortie de la boucle (Ctrl-C, SIGTERM, erreur
+    fatale) : le thread écrivain est un daemon, une requête encore en file à la
+    sortie du processus serait perdue (fermeture d'un trade restée OPEN), et
+    sans checkpoint final le redémarrage reprendrait un état d'un cycle plus ancien.
+    """
+    os_signal.signal(os_signal.SIGTERM, os_signal.SIG_IGN)  # Un second SIGTERM n'interrompt pas l'arrêt
+    if risk_monitor is not None:
+        risk_monitor.stop()  # Plus de fermeture de position pendant l'arrêt
+    if candle_stream is not None:
+        candle_stream.stop()
+    save_portfolio_snapshot()
+    try:
+        save_checkpoint(background=False)  # Même état que la base une fois la file vidée
+    except Exception as e:
+        print(f"⚠️ Checkpoint final non écrit: {e}")
+    db_writer.close()  # Vide la file d'écriture avant les statistiques finales
+    print_statistics()
+    if feature_log is not None:
+        feature_log.close()
+    if indicator_pool is not None:
+        indicator_pool.close()
+    conn.close()
+
+
+def main():
+    """Boucle principale du bot"""
+    global conn, db_writer, trade_ids, candle_stream, risk_monitor, feature_log, indicator_pool
+    
+    # S'assurer que le dossier logs existe
+    os.makedirs("logs", exist_ok=True)
+    
+    conn = init_db(DB_FILE)
+    trade_ids = itertools.count(next_trade_id(conn))
+    
+    restore_start = time.perf_counter()
+    if restore_checkpoint(conn):
+        print(f"♻️ Checkpoint restauré en {(time.perf_counter() - restore_start)*1000:.0f}ms: "
+              f"{len(portfolio['positions'])} positions, {len(candle_buffers)} buffers de bougies")
+    elif portfolio["positions"]:
+        print(f"♻️ {len(portfolio['positions'])} positions OPEN reprises depuis la base")
+    if INDICATOR_WORKERS:
+        indicator_pool = IndicatorPool(INDICATOR_WORKERS)  # Avant tout thread (workers forkés)
+    db_writer = DBWriter(DB_FILE, DB_COMMIT_INTERVAL, DB_COMMIT_BATCH,
+                         on_commit=lambda seconds: metrics.observe("db_commit_seconds", seconds),
+                         on_error=lambda kind: metrics.inc("db_errors_total", kind=kind))
+    db_writer.start()
+    if FEATURE_LOG_DIR:
+        feature_log = FeatureLog(FEATURE_LOG_DIR, FEATURE_LOG_SEGMENT_MB * 2**20, FEATURE_LOG_SEGMENTS)
+    
+
+    print("="*70)
+    print("🤖 BOT SIMULATION - Collecte de données ML")
+    print("="*70)
+    if UNIVERSE_MODE == "all":
+        print(f"Capital: ${INITIAL_CAPITAL} | Univers: {len(get_tradable_assets())} perps | Positions max: {MAX_OPEN_POSITIONS}")
+    else:
+        print(f"Capital: ${INITIAL_CAPITAL} | Assets: {', '.join(ASSETS)}")
+    print(f"Database: {DB_FILE}")
+    print("="*70 + "\n")
+
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        print(f"📈 Métriques: http://127.0.0.1:{METRICS_PORT}/metrics\n")
+
+    if DATA_SOURCE == "websocket":
+        candle_stream = CandleStream(get_tradable_assets(), CANDLE_INTERVAL, WS_URL)
+        candle_stream.start()
+        print(f"📡 Flux WebSocket: {WS_URL}\n")
+
+    if RISK_MONITOR:
+        risk_monitor = RiskMonitor(portfolio["positions"], check_stop_loss, live_prices, portfolio_lock,
+                                   RISK_CHECK_INTERVAL, RISK_LATENCY_TARGET_MS)
+        risk_monitor.start()
+        print(f"🛡️ Surveillance des stops toutes les {RISK_CHECK_INTERVAL}s\n")
+
+    os_signal.signal(os_signal.SIGTERM, stop_on_sigterm)  # systemctl stop/restart : même arrêt que Ctrl-C
+    iteration = 0
+    try:
+        while True:
+            try:
+                iteration += 1
+                cycle_start = time.perf_counter()
             
-            indicators = calculate_all_indicators(df)
-            if indicators is None:
-                continue
+                tradable_assets = get_tradable_assets()
+                cycle_assets = schedule_assets(tradable_assets)
             
-            signal, bull_score, bear_score = get_signal(indicators)
-            indicators["bull_score"] = bull_score
-            indicators["bear_score"] = bear_score
+                # Afficher un header toutes les 10 cycles
+                if iteration % 10 == 1:
+                    print(f"\n{'='*70}")
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] Cycle #{iteration} | Trades fermés: {trade_stats.count} | P&L Total: ${trade_stats.total_pnl:+.2f}")
+                    print(f"{'='*70}")
             
-            current_price = indicators["price"]
-            has_position = asset in portfolio["positions"]
+                # Afficher un message de surveillance au début de chaque cycle
+                if iteration % 2 == 0 and len(portfolio["positions"]) == 0:
+                    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 🔍 Analyse des signaux...")
             
-            # Gestion positions existantes
-            if has_position:
-                pos = portfolio["positions"][asset]
-                duration = (datetime.now() - pos["entry_time"]).total_seconds() / 60
-                
-                if pos["side"] == "LONG":
-                    pnl_pct = (current_price - pos["entry_price"]) / pos["entry_price"] * 100
-                else:
-                    pnl_pct = (pos["entry_price"] - current_price) / pos["entry_price"] * 100
-                
-                pnl_usd = pnl_pct * pos["size_usd"] * LEVERAGE / 100
-                duration_str = f"{int(duration)}min" if duration < 60 else f"{int(duration/60)}h{int(duration%60)}min"
-                pnl_emoji = "🟢" if pnl_usd > 0 else "🔴" if pnl_usd < 0 else "⚪"
+                # Récupération + indicateurs + signaux (concurrents en mode async),
+                # puis décisions et écritures BDD dans l'ordre des actifs
+                cycle_time_ms = time.time() * 1000
+                candidates = []
+                for asset, result in zip(cycle_assets, evaluate_cycle(cycle_assets)):
+                    if result is None:
+                        continue
                 
-                print(f"{pnl_emoji} {asset} {pos['side']}: ${current_price:.2f} | P&L: {pnl_pct:+.2f}% (${pnl_usd:+.2f}) | Durée: {duration_str}")
-                
-                check_stop_loss(asset, current_price)
-            else:
-                # Afficher les scores même sans position (pour voir ce qui se passe)
-                rsi = indicators.get("rsi", 0)
-                signal_emoji = "🟢" if signal == "LONG" else "🔴" if signal == "SHORT" else "⚪"
-                bull_emoji = "✅" if bull_score >= MIN_CONFIRMATIONS else "⏳"
-                bear_emoji = "✅" if bear_score >= MIN_CONFIRMATIONS else "⏳"
-                
-                # Afficher toutes les 2 itérations pour ne pas surcharger
-                if iteration % 2 == 0:
-                    # Afficher les raisons de filtrage
-                    filter_reason = ""
-                    if bull_score >= MIN_CONFIRMATIONS and not signal:
-                        if rsi > 70:
-                            filter_reason = " ⚠️ LONG filtré (RSI surchauffé)"
-                        elif indicators["trend_short"] == "DOWN" and indicators["trend_medium"] == "DOWN":
-                            filter_reason = " ⚠️ LONG filtré (tendance baissière)"
-                    elif bear_score >= MIN_CONFIRMATIONS and not signal:
-                        if rsi < 30:
-                            filter_reason = " ⚠️ SHORT filtré (RSI survendu)"
-                        elif indicators["trend_short"] == "UP" and indicators["trend_medium"] == "UP":
-                            filter_reason = " ⚠️ SHORT filtré (tendance haussière)"
-                    
-                    print(f"{signal_emoji} {asset}: ${current_price:.2f} | RSI:{rsi:.1f} | Bull:{bull_emoji}{bull_score}/7 | Bear:{bear_emoji}{bear_score}/7 | Signal: {signal or 'AUCUN'}{filter_reason}")
+                    indicators, signal = result
+                    log_features(asset, indicators, signal, cycle_time_ms)
+                    with portfolio_lock, metrics.timer("stage_seconds", stage="decision", **asset_label(asset)):
+                        if process_asset(asset, indicators, signal, iteration, cycle_time_ms):
+                            candidates.append((asset, signal, indicators))
             
-            # Signaux de trading
-            if signal == "LONG" and not has_position:
-                open_position_simulation(asset, "LONG", current_price, indicators)
-            elif signal == "SHORT" and not has_position:
-                open_position_simulation(asset, "SHORT", current_price, indicators)
-        
-        # Sauvegarde snapshot toutes les 10 itérations
-        if iteration % 10 == 0:
-            save_portfolio_snapshot()
-            print_statistics()
-        
-        # Ligne vide pour séparer les cycles
-        if len(portfolio["positions"]) == 0:
-            print()  # Ligne vide pour aération
+                # Ouverture des meilleurs signaux du cycle (positions limitées)
+                if candidates:
+                    with portfolio_lock, metrics.timer("stage_seconds", stage="selection"):
+                        open_best_signals(candidates)
+            
+                if feature_log is not None:
+                    feature_log.flush()
+            
+                # Sauvegarde snapshot toutes les 10 itérations
+                if iteration % 10 == 0:
+                    save_portfolio_snapshot()
+                    print_statistics()
+            
+                # Checkpoint pour redémarrage à chaud
+                if checkpointer is not None and checkpointer.due():
+                    save_checkpoint()
+            
+                # Ligne vide pour séparer les cycles
+                if len(portfolio["positions"]) == 0:
+                    print()  # Ligne vide pour aération
+            
+                elapsed = time.perf_counter() - cycle_start
+                record_cycle_metrics(elapsed, len(tradable_assets), len(cycle_assets))
+                if UNIVERSE_MODE == "all":
+                    print(f"⏱️ Cycle {elapsed:.1f}s / {LOOP_INTERVAL}s | Univers: {len(tradable_assets)} actifs, "
+                          f"{len(cycle_assets)} évalués, {len(candidates)} signaux")
+            
+            except Exception as e:
+                print(f"❌ ERREUR: {e}")
         
+            wait_next_cycle()
     except KeyboardInterrupt:
         print("\n\n🛑 Arrêt du bot...")
-        save_portfolio_snapshot()
-        print_statistics()
-        conn.close()
-        break
-    except Exception as e:
-        print(f"❌ ERREUR: {e}")
-    
-    time.sleep(LOOP_INTERVAL)
\ No newline at end of file
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
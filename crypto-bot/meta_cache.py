@@ -0,0 +1,101 @@
+"""Cache des métadonnées Hyperliquid (univers des perps)
+
+L'univers change quelques fois par mois : on le garde en mémoire avec un TTL,
+on le rafraîchit en arrière-plan quand il expire, et on le persiste dans un
+snapshot local pour démarrer sans attendre le réseau.
+"""
+import json
+import os
+import threading
+import time
+
+import requests
+
+from hl_client import HyperliquidAPIError
+
+
+class MetaCache:
+    """Univers Hyperliquid avec TTL, rafraîchissement en tâche de fond et snapshot disque"""
+
+    def __init__(self, client, path="meta_snapshot.json", ttl=3600):
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.universe = {}            # {nom: {"szDecimals": ..., "maxLeverage": ..., "isDelisted": ...}}
+        self.fetched_at = 0.0         # time.time() du dernier rafraîchissement réussi
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load_snapshot()
+
+    def _load_snapshot(self):
+        """Charge le snapshot disque s'il existe (démarrage instantané)"""
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            self.universe = {a["name"]: a for a in snapshot["universe"]}
+            self.fetched_at = snapshot["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save_snapshot(self, universe, fetched_at):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fetched_at": fetched_at, "universe": universe}, f)
+        os.replace(tmp, self.path)  # Écriture atomique
+
+    @property
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def refresh(self):
+        """Récupère l'univers depuis l'API (bloquant) ; garde l'ancien (ou le snapshot) en cas d'échec"""
+        try:
+            data = self.client.post({"type": "meta"}, timeout=5)
+            universe = data["universe"]
+            by_name = {a["name"]: a for a in universe}
+        except (HyperliquidAPIError, requests.RequestException, ValueError, KeyError, TypeError) as e:
+            self.last_error = e
+            kept = f"{len(self.universe)} actifs en cache conservés" if self.universe else "aucun univers en cache"
+            print(f"⚠️ Métadonnées Hyperliquid non rafraîchies ({e}) : {kept}")
+            return False
+        fetched_at = time.time()
+        with self._lock:
+            self.universe = by_name
+            self.fetched_at = fetched_at
+            self.last_error = None
+        try:
+            self._save_snapshot(universe, fetched_at)
+        except OSError as e:
+            self.last_error = e
+        return True
+
+    def _refresh_background(self):
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def ensure_fresh(self):
+        """Rafraîchit si expiré : en tâche de fond si on a déjà des données, sinon bloquant"""
+        if not self.is_stale:
+            return
+        if not self.universe:
+            self.refresh()
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_background, daemon=True).start()
+
+    def assets(self, min_leverage=2):
+        """Noms des perps tradables (non délistés) avec un levier max suffisant"""
+        self.ensure_fresh()
+        return [name for name, a in self.universe.items()
+                if not a.get("isDelisted", False) and a.get("maxLeverage", 0) >= min_leverage]
+
+    def get(self, asset):
+        """Métadonnées d'un actif (szDecimals, maxLeverage, onlyIsolated...) ou None"""
+        self.ensure_fresh()
+        return self.universe.get(asset)
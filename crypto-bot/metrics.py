@@ -0,0 +1,137 @@
+"""Instrumentation légère et endpoint HTTP au format texte Prometheus
+
+Histogrammes de latence par étape (et par actif), compteurs et jauges, tenus
+en mémoire : une mesure coûte un perf_counter et une recherche dichotomique
+dans les bornes des buckets. Le serveur HTTP (thread de fond, 127.0.0.1 par
+défaut) sert /metrics pour Prometheus ou un simple curl.
+
+Même module dans crypto-bot/ et sp500-bot/ (chaque bot est autonome).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes des buckets en secondes (0.5ms -> 60s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernier = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Registre des métriques d'un bot (préfixe commun aux noms)"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.histograms = {}   # {(nom, labels): Histogram}
+        self.counters = {}     # {(nom, labels): valeur}
+        self.gauges = {}       # {(nom, labels): valeur}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mesure la durée du bloc dans l'histogramme name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def render(self):
+        """Toutes les métriques au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        def header(name, kind, seen):
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {self.prefix}_{name} {self.help[name]}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        seen = set()
+        for (name, labels), h in histograms:
+            header(name, "histogram", seen)
+            full = f"{self.prefix}_{name}"
+            cumulative = 0
+            for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{full}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{full}_sum{_labels(labels)} {h.sum}")
+            lines.append(f"{full}_count{_labels(labels)} {h.count}")
+        for (name, labels), value in counters:
+            header(name, "counter", seen)
+            lines.append(f"{self.prefix}_{name}{_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            header(name, "gauge", seen)
+            lines.append(f"{self.prefix}_{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Démarre le endpoint /metrics dans un thread de fond"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Pas de log par requête dans la console du bot
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,79 @@
+"""Bougies de timeframes supérieurs (15m, 1h, 4h...) construites localement
+
+Les bougies de base (5m) du CandleBuffer sont agrégées par tranche de temps
+alignée sur UTC (open = premier, high = max, low = min, close = dernier,
+volume = somme), sans requête supplémentaire à l'API. À chaque mise à jour,
+seule la tranche en cours (et les suivantes) est recalculée : la bougie
+supérieure en cours suit la bougie de base ouverte.
+
+Le buffer de base ne couvre que CANDLE_HISTORY bougies : les bougies
+supérieures sont conservées dans leur propre CandleBuffer, chauffé depuis
+l'archive locale. Une tranche dont le début n'est pas couvert par les bougies
+de base est ignorée (jamais de bougie supérieure incomplète).
+"""
+import numpy as np
+
+from candle_buffer import INTERVAL_MS, CandleBuffer
+
+
+def resample_arrays(timestamps, values, interval_ms):
+    """Agrège des bougies triées (timestamps (n,), OHLCV (n, 5)) en bougies de interval_ms"""
+    buckets = timestamps - timestamps % interval_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    out = np.empty((len(starts), 5), dtype=np.float64)
+    out[:, 0] = values[starts, 0]
+    out[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    out[:, 3] = values[ends, 3]
+    out[:, 4] = np.add.reduceat(values[:, 4], starts)
+    return buckets[starts], out
+
+
+def first_complete_bucket(first_timestamp, interval_ms):
+    """Début de la première tranche entièrement couverte à partir de first_timestamp"""
+    start = first_timestamp - first_timestamp % interval_ms
+    return start if start == first_timestamp else start + interval_ms
+
+
+class TimeframeResampler:
+    """Bougies d'un timeframe supérieur pour un actif"""
+
+    def __init__(self, interval, maxlen=300):
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.buffer = CandleBuffer(maxlen, interval)
+        self.last_base = None         # Dernière bougie de base intégrée
+        self.base_revision = None     # Révision du buffer de base à la dernière mise à jour
+
+    def _merge(self, timestamps, values, start):
+        i = np.searchsorted(timestamps, start)
+        if i == len(timestamps):
+            return False
+        new_ts, new_values = resample_arrays(timestamps[i:], values[i:], self.interval_ms)
+        self.last_base = int(timestamps[-1])
+        return self.buffer.merge_arrays(new_ts, new_values)
+
+    def warm(self, timestamps, values):
+        """Chauffe depuis un historique de bougies de base (archive locale)"""
+        if len(timestamps):
+            self._merge(timestamps, values, first_complete_bucket(int(timestamps[0]), self.interval_ms))
+
+    def update(self, base, until=None):
+        """Intègre les bougies nouvelles ou modifiées du buffer de base (jusqu'à until inclus)
+
+        Retourne True si des bougies supérieures déjà clôturées ont été réécrites
+        (l'état incrémental de leurs indicateurs est alors invalide).
+        """
+        timestamps, values = base.timestamps, base.values
+        if until is not None:
+            end = np.searchsorted(timestamps, until, side="right")
+            timestamps, values = timestamps[:end], values[:end]
+        if not len(timestamps):
+            return False
+        start = first_complete_bucket(int(timestamps[0]), self.interval_ms)
+        if self.last_base is not None and base.revision == self.base_revision:
+            # Cas courant : tranche de la dernière bougie intégrée (en cours) et suivantes
+            start = max(start, self.last_base - self.last_base % self.interval_ms)
+        self.base_revision = base.revision
+        return self._merge(timestamps, values, start)
@@ -0,0 +1,100 @@
+"""Surveillance haute fréquence des positions ouvertes
+
+Boucle indépendante de la boucle des signaux : toutes les RISK_CHECK_INTERVAL
+secondes, elle lit le prix des seuls actifs en position et déclenche les
+sorties (stop-loss, trailing stop, durée max) via la fonction de sortie du
+bot. Chaque sortie enregistre sa latence de détection : temps écoulé entre
+l'observation du prix (trade WebSocket ou requête allMids) et la fermeture.
+
+En REST, une réponse allMids sert pendant max_age secondes : des vérifications
+toutes les 0.25s ne coûtent pas 4 requêtes par seconde au budget de poids.
+Une erreur (prix, position invalide, sortie) est journalisée et comptée,
+sans arrêter la surveillance.
+"""
+import threading
+import time
+from collections import deque
+
+from hl_client import HyperliquidAPIError
+
+
+def rest_price_source(client, max_age=0.0):
+    """Prix moyens de tous les actifs en une requête allMids (poids 2) : {coin: (prix, ms)}
+
+    La dernière réponse est réutilisée tant qu'elle a moins de max_age secondes.
+    """
+    lock = threading.Lock()
+    cache = {"prices": None, "at": 0.0}
+
+    def prices():
+        with lock:
+            if cache["prices"] is not None and time.monotonic() - cache["at"] < max_age:
+                return cache["prices"]
+            observed_ms = int(time.time() * 1000)
+            mids = client.post({"type": "allMids"}, timeout=2)
+            cache["prices"] = {coin: (float(px), observed_ms) for coin, px in mids.items()}
+            cache["at"] = time.monotonic()
+            return cache["prices"]
+    return prices
+
+
+class RiskMonitor:
+    """Thread de surveillance des stops, avec suivi de la latence de détection"""
+
+    def __init__(self, positions, check_exit, price_source, lock, interval=1.0, latency_target_ms=1000):
+        self.positions = positions          # dict {asset: position}, partagé avec la boucle principale
+        self.check_exit = check_exit        # check_exit(asset, prix, prix_ms) -> True si position fermée
+        self.price_source = price_source    # () -> {asset: (prix, timestamp ms)}
+        self.lock = lock
+        self.interval = interval
+        self.latency_target_ms = latency_target_ms
+        self.latencies_ms = deque(maxlen=1000)
+        self.exits = 0
+        self.late_exits = 0
+        self.errors = 0
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def record_exit(self, latency_ms):
+        """Enregistre la latence d'une sortie (appelé par la fonction de sortie)"""
+        self.latencies_ms.append(latency_ms)
+        self.exits += 1
+        if latency_ms > self.latency_target_ms:
+            self.late_exits += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._check()
+            except HyperliquidAPIError:
+                self.errors += 1
+            except Exception as e:  # La surveillance ne doit jamais s'arrêter
+                self.errors += 1
+                print(f"❌ Surveillance stops: {type(e).__name__}: {e}")
+
+    def _check(self):
+        with self.lock:
+            assets = list(self.positions)
+        if not assets:
+            return
+        prices = self.price_source()
+        for asset in assets:
+            if asset in prices:
+                price, observed_ms = prices[asset]
+                with self.lock:
+                    self.check_exit(asset, price, observed_ms)
+
+    def summary(self):
+        """Résumé lisible des latences de détection"""
+        if not self.latencies_ms:
+            return f"Surveillance stops: aucune sortie ({self.errors} erreurs)"
+        ordered = sorted(self.latencies_ms)
+        p50 = ordered[len(ordered) // 2]
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"Surveillance stops: {self.exits} sorties | latence p50 {p50:.0f}ms p95 {p95:.0f}ms "
+                f"max {ordered[-1]:.0f}ms | {self.late_exits} au-delà de {self.latency_target_ms}ms | {self.errors} erreurs")
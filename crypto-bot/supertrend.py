@@ -0,0 +1,60 @@
+"""SuperTrend vectorisé sur tableaux NumPy contigus
+
+Même règle que la boucle historique de calculate_all_indicators :
+    - clôture > bande haute précédente  -> supertrend = bande basse, direction 1
+    - clôture < bande basse précédente  -> supertrend = bande haute, direction -1
+    - sinon on garde la valeur précédente
+L'état ne change qu'aux croisements : on marque les croisements puis on
+propage la dernière valeur (forward-fill par maximum cumulé des indices),
+sans aucun accès élément par élément.
+"""
+import numpy as np
+
+
+def supertrend_batch(close, high, low, atr, multiplier=3.0):
+    """SuperTrend pour plusieurs actifs à la fois
+
+    Tableaux 2-D (actifs × bougies), alignés sur les bougies. Les NaN (ATR en
+    cours de chauffe, bougies absentes) ne déclenchent jamais de croisement.
+    Retourne (supertrend, direction) en float64, NaN avant le premier croisement.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+
+    hl2 = (high + low) / 2
+    upper_band = hl2 + multiplier * atr
+    lower_band = hl2 - multiplier * atr
+
+    n_assets, n_bars = close.shape
+    cross_up = np.zeros((n_assets, n_bars), dtype=bool)
+    cross_down = np.zeros((n_assets, n_bars), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        cross_up[:, 1:] = close[:, 1:] > upper_band[:, :-1]
+        cross_down[:, 1:] = ~cross_up[:, 1:] & (close[:, 1:] < lower_band[:, :-1])
+
+    events = np.full((n_assets, n_bars), np.nan)
+    events[cross_up] = lower_band[cross_up]
+    events[cross_down] = upper_band[cross_down]
+    directions = np.full((n_assets, n_bars), np.nan)
+    directions[cross_up] = 1.0
+    directions[cross_down] = -1.0
+
+    # Indice du dernier croisement pour chaque bougie (0 = aucun, la bougie 0 reste NaN)
+    idx = np.where(cross_up | cross_down, np.arange(n_bars), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    rows = np.arange(n_assets)[:, None]
+    return events[rows, idx], directions[rows, idx]
+
+
+def supertrend(close, high, low, atr, multiplier=3.0):
+    """SuperTrend d'un seul actif (tableaux 1-D)"""
+    st, direction = supertrend_batch(
+        np.asarray(close, dtype=np.float64)[None, :],
+        np.asarray(high, dtype=np.float64)[None, :],
+        np.asarray(low, dtype=np.float64)[None, :],
+        np.asarray(atr, dtype=np.float64)[None, :],
+        multiplier,
+    )
+    return st[0], direction[0]
@@ -0,0 +1,157 @@
+"""Balayage parallèle des paramètres de la stratégie crypto
+
+Les indicateurs sont calculés une seule fois par actif, alignés en tableaux
+(backtest.market_arrays), puis partagés en lecture seule avec les workers
+d'un pool de processus : chaque combinaison ne refait que les signaux
+vectorisés et la simulation du portefeuille.
+
+Spécification JSON, grille complète ou recherche aléatoire :
+    {"grid": {"min_confirmations": [4, 5, 6], "stop_loss_pct": [0.005, 0.01, 0.02]}}
+    {"random": {"n": 2000, "seed": 0,
+                "space": {"stop_loss_pct": {"min": 0.003, "max": 0.03},
+                          "max_trade_duration": [60, 120, 240]}}}
+Listes = valeurs possibles, {"min", "max"} = tirage uniforme (entier si les bornes
+sont entières). Clés : celles de main.strategy_params().
+
+    python sweep.py --spec sweep.json --csv-dir data/ --top 20 --out sweep_results.csv
+    python sweep.py --grid min_confirmations=4,5,6 rsi_bull=30,36,40 --synthetic 105120
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import main as bot
+from backtest import indicator_frame, load_csv_dir, load_store, market_arrays, run_backtest, synthetic_candles
+
+RANK_BY = "total_pnl"
+
+_market = None  # Tableaux partagés, positionnés dans chaque worker
+
+
+def grid_combinations(grid):
+    """Produit cartésien d'un dict {paramètre: [valeurs]}"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_combinations(space, n, seed=0):
+    """n tirages dans un espace {paramètre: [choix] | {"min", "max"}}"""
+    rng = random.Random(seed)
+    combos = []
+    for _ in range(n):
+        combo = {}
+        for key, dist in space.items():
+            if isinstance(dist, dict):
+                low, high = dist["min"], dist["max"]
+                both_int = isinstance(low, int) and isinstance(high, int)
+                combo[key] = rng.randint(low, high) if both_int else rng.uniform(low, high)
+            else:
+                combo[key] = rng.choice(dist)
+        combos.append(combo)
+    return combos
+
+
+def combinations_from_spec(spec):
+    if "grid" in spec:
+        return grid_combinations(spec["grid"])
+    random_spec = spec["random"]
+    return random_combinations(random_spec["space"], random_spec["n"], random_spec.get("seed", 0))
+
+
+def _init_worker(market):
+    global _market
+    _market = market
+
+
+def _evaluate(overrides):
+    result = run_backtest(params=bot.strategy_params(**overrides), market=_market)
+    return {**overrides, **result}
+
+
+def run_sweep(frames, combinations, workers=None, chunksize=None):
+    """Évalue chaque combinaison (dict de surcharges de strategy_params) sur un pool de processus
+
+    Retourne un DataFrame trié par RANK_BY décroissant.
+    """
+    unknown = {key for combo in combinations for key in combo} - set(bot.strategy_params())
+    if unknown:
+        raise ValueError(f"Paramètres inconnus: {', '.join(sorted(unknown))}")
+
+    market = market_arrays(frames)
+    workers = workers or os.cpu_count()
+    chunksize = chunksize or max(1, len(combinations) // (workers * 4))
+
+    # fork : les workers héritent des tableaux sans copie ; sinon ils sont envoyés une fois par worker
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                             initializer=_init_worker, initargs=(market,)) as pool:
+        results = list(pool.map(_evaluate, combinations, chunksize=chunksize))
+
+    table = pd.DataFrame(results).sort_values(RANK_BY, ascending=False).reset_index(drop=True)
+    table.index += 1
+    return table
+
+
+def parse_grid_args(pairs):
+    """["cle=v1,v2", ...] -> {cle: [v1, v2]} (valeurs JSON : nombres, listes...)"""
+    grid = {}
+    for pair in pairs:
+        key, _, values = pair.partition("=")
+        grid[key] = [json.loads(v) for v in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balayage parallèle des paramètres de la stratégie crypto")
+    parser.add_argument("--spec", help="fichier JSON (grid ou random)")
+    parser.add_argument("--grid", nargs="+", metavar="CLE=V1,V2", help="grille en ligne de commande")
+    parser.add_argument("--assets", nargs="+", default=bot.ASSETS)
+    parser.add_argument("--csv-dir", help="dossier contenant <ACTIF>.csv")
+    parser.add_argument("--store", help="archive de bougies du bot (CANDLE_STORE_DIR)")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="N bougies synthétiques par actif")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="CSV des résultats complets")
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec) as f:
+            combinations = combinations_from_spec(json.load(f))
+    elif args.grid:
+        combinations = grid_combinations(parse_grid_args(args.grid))
+    else:
+        parser.error("--spec ou --grid requis")
+    if args.csv_dir:
+        candles = load_csv_dir(args.csv_dir, args.assets)
+    elif args.store:
+        candles = load_store(args.store, args.assets)
+    elif args.synthetic:
+        candles = synthetic_candles(args.assets, args.synthetic)
+    else:
+        parser.error("--csv-dir, --store ou --synthetic requis")
+
+    start = time.perf_counter()
+    frames = {asset: indicator_frame(df) for asset, df in candles.items()}
+    print(f"📈 Indicateurs calculés une fois ({len(frames)} actifs) en {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    table = run_sweep(frames, combinations, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"⚡ {len(combinations)} combinaisons en {elapsed:.1f}s ({len(combinations) / elapsed:.1f}/s)\n")
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table.head(args.top).to_string(float_format=lambda x: f"{x:.4g}"))
+    if args.out:
+        table.to_csv(args.out, index_label="rank")
+        print(f"\n💾 Résultats: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Statistiques de performance tenues à jour à chaque fermeture de trade
+
+Remplace les COUNT/AVG/SUM sur toute la table trades : chaque fermeture met
+à jour en O(1) moyennes et variances (algorithme de Welford), gains et pertes
+moyens, courbe de capital (pic et drawdown max) et le détail par actif.
+L'historique existant est relu une seule fois au démarrage (load).
+"""
+import math
+
+
+class RunningStats:
+    """Moyenne et variance en une passe (Welford)"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def total(self):
+        return self.mean * self.count
+
+    @property
+    def std(self):
+        """Écart-type échantillon (ddof=1), NaN sous 2 valeurs"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float("nan")
+
+
+class TradeStats:
+    """Performance cumulée des trades fermés (global et par actif)"""
+
+    def __init__(self, initial_capital):
+        self.pnl = RunningStats()       # P&L ($) de tous les trades
+        self.returns = RunningStats()   # Rendement de chaque trade sur le capital avant le trade
+        self.wins = RunningStats()      # P&L des trades gagnants
+        self.losses = RunningStats()    # P&L des trades perdants (ou nuls)
+        self.by_asset = {}              # {actif: [RunningStats P&L, nombre de gains]}
+        self.equity = float(initial_capital)
+        self.peak = self.equity
+        self.max_drawdown = 0.0         # Baisse max depuis un pic, en fraction du pic
+
+    def record(self, asset, pnl_usd):
+        """Intègre un trade fermé"""
+        self.returns.push(pnl_usd / self.equity if self.equity else 0.0)
+        self.pnl.push(pnl_usd)
+        (self.wins if pnl_usd > 0 else self.losses).push(pnl_usd)
+
+        asset_stats = self.by_asset.setdefault(asset, [RunningStats(), 0])
+        asset_stats[0].push(pnl_usd)
+        if pnl_usd > 0:
+            asset_stats[1] += 1
+
+        self.equity += pnl_usd
+        self.peak = max(self.peak, self.equity)
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, (self.peak - self.equity) / self.peak)
+
+    def load(self, db):
+        """Relit une fois les trades fermés de la base, dans l'ordre de fermeture probable (id)"""
+        for asset, pnl in db.execute("SELECT asset, pnl FROM trades WHERE status = 'CLOSED' ORDER BY id"):
+            self.record(asset, pnl or 0.0)
+
+    @property
+    def count(self):
+        return self.pnl.count
+
+    @property
+    def total_pnl(self):
+        return self.pnl.total
+
+    @property
+    def win_rate(self):
+        return self.wins.count / self.count * 100 if self.count else 0.0
+
+    @property
+    def avg_win(self):
+        return self.wins.mean if self.wins.count else None
+
+    @property
+    def avg_loss(self):
+        return self.losses.mean if self.losses.count else None
+
+    @property
+    def sharpe(self):
+        """Ratio de Sharpe par trade (rendement moyen / écart-type, non annualisé)"""
+        std = self.returns.std
+        return self.returns.mean / std if std and not math.isnan(std) else None
+
+    def asset_lines(self):
+        """Une ligne par actif, triées par P&L décroissant"""
+        ordered = sorted(self.by_asset.items(), key=lambda item: item[1][0].total, reverse=True)
+        return [f"{asset}: {s.count} trades | P&L ${s.total:+.2f} (moy ${s.mean:+.2f}) | Win Rate {wins / s.count * 100:.0f}%"
+                for asset, (s, wins) in ordered]
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-DB_FILE="trading_simulation.db"
+DB_FILE="${1:-trading_simulation.db}"  # Base live par défaut, ou base de backtest en argument
 
 echo "======================================================================"
 echo "📊 POSITIONS OUVERTES - BOT CRYPTO"
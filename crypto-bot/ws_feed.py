@@ -0,0 +1,136 @@
+"""Flux WebSocket Hyperliquid (bougies + trades)
+
+Le flux tourne dans un thread dédié avec sa propre boucle asyncio. Il
+s'abonne aux canaux `candle` et `trades` des actifs suivis : les bougies
+passent par une file, les trades mettent à jour le dernier prix connu. La
+boucle principale applique les bougies à ses buffers (un seul thread
+modifie les buffers) et se réveille dès qu'une bougie se clôture au lieu
+d'attendre LOOP_INTERVAL.
+
+Dépendance optionnelle : websockets (uniquement pour DATA_SOURCE = "websocket").
+"""
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+
+try:
+    import websockets
+except ImportError:  # Mode REST uniquement
+    websockets = None
+
+WS_URL = "wss://api.hyperliquid.xyz/ws"
+
+
+def parse_candle(data):
+    """Message `candle` -> (coin, (t, o, h, l, c, v))"""
+    return data["s"], (int(data["t"]), float(data["o"]), float(data["h"]),
+                       float(data["l"]), float(data["c"]), float(data["v"]))
+
+
+class CandleStream:
+    """Abonnement WebSocket aux bougies et trades d'une liste d'actifs"""
+
+    def __init__(self, assets, interval="5m", url=WS_URL, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.assets = list(assets)
+        self.interval = interval
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.updates = queue.Queue()  # ("candle", coin, bougie) | ("close", coin, t)
+        self.connected = False
+        self.last_prices = {}         # {coin: (prix, timestamp ms)} du dernier trade
+        self.reconnects = 0
+        self.bad_messages = 0         # Messages illisibles ignorés
+        self._live_ts = {}            # {coin: timestamp de la bougie en cours}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Démarre le flux dans un thread de fond"""
+        if websockets is None:
+            raise RuntimeError("Le mode WebSocket nécessite le paquet 'websockets' (pip install websockets)")
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    await self._subscribe(ws)
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    while not self._stop.is_set():
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        try:
+                            self._handle(json.loads(raw))
+                        except (ValueError, KeyError, TypeError, IndexError, AttributeError) as e:
+                            self.bad_messages += 1
+                            print(f"⚠️ Message WebSocket ignoré ({type(e).__name__}: {e})")
+            except (OSError, websockets.WebSocketException, asyncio.TimeoutError) as e:
+                print(f"⚠️ WebSocket déconnecté ({e}), reconnexion dans {delay:.0f}s")
+            except Exception as e:
+                print(f"❌ Erreur du flux WebSocket ({type(e).__name__}: {e}), reconnexion dans {delay:.0f}s")
+            finally:
+                self.connected = False  # Prix et bougies repassent par REST tant que le flux est coupé
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _subscribe(self, ws):
+        for coin in self.assets:
+            for subscription in ({"type": "candle", "coin": coin, "interval": self.interval},
+                                 {"type": "trades", "coin": coin}):
+                await ws.send(json.dumps({"method": "subscribe", "subscription": subscription}))
+
+    def _handle(self, msg):
+        channel = msg.get("channel")
+        data = msg.get("data")
+        if channel == "candle":
+            coin, candle = parse_candle(data)
+            live = self._live_ts.get(coin)
+            if live is not None and candle[0] > live:
+                self.updates.put(("close", coin, live))  # La bougie précédente est clôturée
+            if live is None or candle[0] >= live:
+                self._live_ts[coin] = candle[0]
+            self.updates.put(("candle", coin, candle))
+        elif channel == "trades":
+            # Seul le dernier prix est utile : pas de passage par la file
+            for trade in data:
+                self.last_prices[trade["coin"]] = (float(trade["px"]), int(trade["time"]))
+
+    def drain(self):
+        """Toutes les mises à jour en attente, sans bloquer"""
+        items = []
+        while True:
+            try:
+                items.append(self.updates.get_nowait())
+            except queue.Empty:
+                return items
+
+    def wait_for_close(self, timeout):
+        """Attend la clôture d'une bougie (ou le timeout) et retourne les mises à jour reçues"""
+        deadline = time.monotonic() + timeout
+        items = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return items
+            try:
+                item = self.updates.get(timeout=remaining)
+            except queue.Empty:
+                return items
+            items.append(item)
+            if item[0] == "close":
+                return items + self.drain()
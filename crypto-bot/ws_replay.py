@@ -0,0 +1,181 @@
+"""Enregistrement et rejeu local du flux WebSocket Hyperliquid
+
+Permet de développer et tester le flux (ws_feed.CandleStream) hors ligne :
+
+    # Enregistrer 1h de bougies/trades BTC et ETH
+    python ws_replay.py record --out logs/ws_btc_eth.jsonl --coins BTC ETH --duration 3600
+
+    # Rejouer l'enregistrement sur ws://127.0.0.1:8765 (temps réel)
+    python ws_replay.py serve --file logs/ws_btc_eth.jsonl
+
+    # 10x plus vite (bot lancé avec SIGNAL_MEMO = False, voir plus bas)
+    python ws_replay.py serve --file logs/ws_btc_eth.jsonl --speed 10 --memo-off
+
+Puis dans main.py : DATA_SOURCE = "websocket" et WS_URL = "ws://127.0.0.1:8765".
+Format du fichier : une ligne JSON par message, {"ts": ms de réception, "msg": {...}}.
+
+Les horodatages rejoués (bougies t/T, trades time) sont décalés d'un nombre
+entier de bougies : la première bougie enregistrée devient la bougie en cours
+au début du rejeu (puis à la suite du tour précédent avec --loop). Le flux
+prolonge ainsi le buffer chauffé par REST au lieu de réécrire son historique.
+
+Le décalage est fixé au début du rejeu : avec --speed > 1, les bougies rejouées
+prennent de l'avance sur l'horloge murale. Avec SIGNAL_MEMO, le bot ne calcule
+les signaux que jusqu'à la dernière bougie clôturée selon time.time() et
+ignorerait ces bougies « futures » (signaux sur des données périmées) : un
+rejeu accéléré est refusé sans --memo-off, qui confirme que le bot tourne avec
+SIGNAL_MEMO = False (signal sur la bougie en cours, sans horloge).
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import websockets
+
+from candle_buffer import INTERVAL_MS
+from ws_feed import WS_URL
+
+
+def message_key(msg):
+    """(canal, coin) d'un message de données, None pour les autres messages"""
+    channel = msg.get("channel")
+    data = msg.get("data")
+    if channel == "candle":
+        return channel, data["s"]
+    if channel == "trades" and data:
+        return channel, data[0]["coin"]
+    return None
+
+
+def recording_interval_ms(records):
+    """Intervalle des bougies de l'enregistrement (5m par défaut)"""
+    for record in records:
+        msg = record["msg"]
+        if msg.get("channel") == "candle":
+            return INTERVAL_MS[msg["data"]["i"]]
+    return INTERVAL_MS["5m"]
+
+
+def rebase(msg, shift_ms):
+    """Copie du message avec ses horodatages décalés de shift_ms"""
+    data = msg["data"]
+    if msg["channel"] == "candle":
+        data = dict(data, t=data["t"] + shift_ms, T=data["T"] + shift_ms)
+    else:
+        data = [dict(trade, time=trade["time"] + shift_ms) for trade in data]
+    return dict(msg, data=data)
+
+
+def load_recording(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def record(out, coins, interval, duration):
+    """Enregistre les messages bruts du flux réel"""
+    deadline = time.monotonic() + duration
+    count = 0
+    async with websockets.connect(WS_URL, ping_interval=20) as ws:
+        for coin in coins:
+            for sub in ({"type": "candle", "coin": coin, "interval": interval}, {"type": "trades", "coin": coin}):
+                await ws.send(json.dumps({"method": "subscribe", "subscription": sub}))
+        with open(out, "a") as f:
+            while time.monotonic() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+                msg = json.loads(raw)
+                if message_key(msg) is None:
+                    continue
+                f.write(json.dumps({"ts": int(time.time() * 1000), "msg": msg}) + "\n")
+                count += 1
+    print(f"✅ {count} messages enregistrés dans {out}")
+
+
+class ReplayServer:
+    """Serveur WebSocket qui rejoue un enregistrement aux clients abonnés"""
+
+    def __init__(self, records, speed=1.0, loop=False):
+        self.records = records
+        self.speed = speed
+        self.loop = loop
+
+    async def handler(self, ws):
+        subscriptions = set()
+        replay = None
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                method = request.get("method")
+                if method == "ping":
+                    await ws.send(json.dumps({"channel": "pong"}))
+                elif method == "subscribe":
+                    sub = request["subscription"]
+                    subscriptions.add((sub["type"], sub["coin"]))
+                    await ws.send(json.dumps({"channel": "subscriptionResponse", "data": request}))
+                    if replay is None:
+                        replay = asyncio.create_task(self._replay(ws, subscriptions))
+        finally:
+            if replay is not None:
+                replay.cancel()
+
+    async def _replay(self, ws, subscriptions):
+        if not self.records:
+            return
+        interval_ms = recording_interval_ms(self.records)
+        first, last = self.records[0]["ts"], self.records[-1]["ts"]
+        now_ms = int(time.time() * 1000)
+        # Nombre entier de bougies : les timestamps restent alignés sur l'intervalle
+        shift = (now_ms - now_ms % interval_ms) - (first - first % interval_ms)
+        span = (last - last % interval_ms) - (first - first % interval_ms) + interval_ms
+        while True:
+            previous = None
+            for record in self.records:
+                if previous is not None:
+                    await asyncio.sleep(max(0, record["ts"] - previous) / 1000 / self.speed)
+                previous = record["ts"]
+                if message_key(record["msg"]) in subscriptions:
+                    await ws.send(json.dumps(rebase(record["msg"], shift)))
+            if not self.loop:
+                return
+            shift += span  # Tour suivant : à la suite du précédent
+
+
+async def serve(path, host, port, speed, loop):
+    server = ReplayServer(load_recording(path), speed, loop)
+    async with websockets.serve(server.handler, host, port):
+        print(f"▶️ Rejeu de {len(server.records)} messages sur ws://{host}:{port} (x{speed})")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement / rejeu du flux WebSocket Hyperliquid")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--coins", nargs="+", default=["BTC", "ETH", "SOL", "ARB", "MATIC"])
+    rec.add_argument("--interval", default="5m")
+    rec.add_argument("--duration", type=float, default=3600, help="secondes")
+    srv = sub.add_parser("serve")
+    srv.add_argument("--file", required=True)
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--speed", type=float, default=1.0)
+    srv.add_argument("--loop", action="store_true", help="rejouer en boucle")
+    srv.add_argument("--memo-off", action="store_true",
+                     help="le bot tourne avec SIGNAL_MEMO = False (requis avec --speed > 1)")
+    args = parser.parse_args()
+    if args.command == "serve" and args.speed > 1 and not args.memo_off:
+        parser.error("--speed > 1 : les bougies rejouées devancent l'horloge du bot, que SIGNAL_MEMO utilise ; "
+                     "lancer le bot avec SIGNAL_MEMO = False et ajouter --memo-off")
+
+    if args.command == "record":
+        asyncio.run(record(args.out, args.coins, args.interval, args.duration))
+    else:
+        asyncio.run(serve(args.file, args.host, args.port, args.speed, args.loop))
+
+
+if __name__ == "__main__":
+    main()
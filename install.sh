@@ -35,6 +35,7 @@ cat > requirements_merged.txt << 'EOF'
 pandas>=2.0.0
 numpy>=1.24.0
 requests>=2.31.0
+websockets>=12.0
 matplotlib>=3.7.0
 seaborn>=0.12.0
 scikit-learn>=1.3.0
@@ -0,0 +1,89 @@
+"""Benchmarks des chemins chauds : score d'ouverture et RSI du suivi des positions
+
+Données synthétiques à graine fixe (fixtures.py). calculate_opening_score est
+appelé pour chaque action du scan ; quick_rsi pour chaque position à chaque
+cycle. Les sorties sont enregistrées dans la baseline avec les temps, et
+quick_rsi doit reproduire le calcul d'origine de get_current_data (rsi_reference).
+
+Usage:
+    python benchmarks/bench_hot_paths.py            # compare à benchmarks/baseline.json
+    python benchmarks/bench_hot_paths.py --save     # enregistre une nouvelle baseline
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as bot  # noqa: E402
+from benchmarks.fixtures import make_candles  # noqa: E402
+from benchmarks.harness import Suite, finish, parse_args  # noqa: E402
+
+SIZES = [78, 5_000, 50_000]   # 78 = une séance en bougies 5m
+SCAN_STOCKS = 502             # Actions notées par scan_all_stocks
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def rsi_reference(close):
+    """Calcul d'origine de get_current_data (référence)"""
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(14).mean()
+    rs = gain / (loss + 1e-10)
+    return 100 - (100 / (1 + rs))
+
+
+def opening_data(count, seed=0):
+    """Données d'ouverture (15 bougies 1m) de count actions, comme get_opening_data"""
+    rng = np.random.default_rng(seed)
+    stocks = []
+    for i in range(count):
+        df = make_candles(15, seed=seed + i, start_price=rng.uniform(20, 500), volatility=0.004)
+        stocks.append({
+            "symbol": f"S{i}",
+            "open_price": df["open"].iloc[0],
+            "current_price": df["close"].iloc[-1],
+            "first_5min_high": df["high"].head(5).max(),
+            "first_5min_low": df["low"].head(5).min(),
+            "first_5min_close": df["close"].iloc[4],
+            "volume_15min": df["volume"].sum() * 1000,
+            "avg_volume": rng.lognormal(14, 1),
+            "previous_close": df["open"].iloc[0] * (1 + rng.normal(0, 0.015)),
+        })
+    return stocks
+
+
+def bench_opening_score(suite):
+    stocks = opening_data(SCAN_STOCKS)
+
+    def score_all():
+        return [bot.calculate_opening_score(dict(data)) for data in stocks]
+
+    scored = [dict(data) for data in stocks]
+    outputs = [[bot.calculate_opening_score(data), data["gap_pct"], data["volume_ratio"],
+                data["first_5min_move"], data["opening_range"]] for data in scored]
+    suite.bench(f"calculate_opening_score x{SCAN_STOCKS}", score_all, outputs)
+
+
+def bench_rsi(suite, n):
+    close = make_candles(n, seed=n)["close"]
+    reference = rsi_reference(close)
+    suite.check(f"quick_rsi[{n}] == référence", reference, bot.quick_rsi(close))
+    suite.bench(f"quick_rsi[{n}]", lambda: bot.quick_rsi(close), reference.iloc[-1])
+
+
+def main():
+    args = parse_args(__doc__.splitlines()[0], SIZES)
+    suite = Suite("sp500-bot", BASELINE_FILE)
+
+    print("\n🔍 Scan")
+    bench_opening_score(suite)
+    for n in args.sizes:
+        print(f"\n📊 RSI ({n} bougies)")
+        bench_rsi(suite, n)
+    return finish(suite, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
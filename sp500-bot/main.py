@@ -9,6 +9,7 @@ import pytz
 # ==================== CONFIGURATION ====================
 # Charger la liste complète du S&P 500
 from sp500_tickers import SP500_TICKERS
+from metrics import Metrics
 
 INITIAL_CAPITAL = 10000       # $10,000
 MAX_POSITIONS = 20            # Top 20 actions seulement
@@ -27,59 +28,85 @@ STOP_LOSS_PCT = 0.02         # 2% stop loss
 TRAILING_STOP_PCT = 0.015    # 1.5% trailing stop
 
 DB_FILE = "sp500_daytrading.db"
+METRICS_PORT = 9102           # Endpoint Prometheus local http://127.0.0.1:9102/metrics (None pour désactiver)
 # =======================================================
 
-# Initialisation SQLite
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-cursor = conn.cursor()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS trades (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    symbol TEXT NOT NULL,
-    date TEXT NOT NULL,
-    timestamp TEXT NOT NULL,
-    side TEXT NOT NULL,
-    entry_price REAL NOT NULL,
-    exit_price REAL,
-    shares REAL NOT NULL,
-    pnl REAL,
-    pnl_pct REAL,
-    duration_minutes INTEGER,
-    exit_reason TEXT,
-    status TEXT DEFAULT 'OPEN',
-    
-    -- Scores et métriques d'ouverture
-    opening_score REAL,
-    gap_pct REAL,
-    volume_ratio REAL,
-    first_5min_move REAL,
-    opening_range REAL,
-    
-    -- Indicateurs techniques
-    rsi REAL,
-    macd REAL,
-    bb_position REAL,
-    trend TEXT
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS daily_scans (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    date TEXT NOT NULL,
-    timestamp TEXT NOT NULL,
-    symbol TEXT NOT NULL,
-    score REAL,
-    gap_pct REAL,
-    volume_ratio REAL,
-    first_5min_move REAL,
-    opening_range REAL,
-    selected BOOLEAN
-)
-""")
-
-conn.commit()
+# Initialisation SQLite (connexion ouverte par init_db au démarrage du bot)
+conn = None
+cursor = None
+
+
+def init_db(path=DB_FILE):
+    """Ouvre la base SQLite et crée les tables et index"""
+    db = sqlite3.connect(path, check_same_thread=False)
+    cur = db.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        side TEXT NOT NULL,
+        entry_price REAL NOT NULL,
+        exit_price REAL,
+        shares REAL NOT NULL,
+        pnl REAL,
+        pnl_pct REAL,
+        duration_minutes INTEGER,
+        exit_reason TEXT,
+        status TEXT DEFAULT 'OPEN',
+    
+        -- Scores et métriques d'ouverture
+        opening_score REAL,
+        gap_pct REAL,
+        volume_ratio REAL,
+        first_5min_move REAL,
+        opening_range REAL,
+    
+        -- Indicateurs techniques
+        rsi REAL,
+        macd REAL,
+        bb_position REAL,
+        trend TEXT
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS daily_scans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        score REAL,
+        gap_pct REAL,
+        volume_ratio REAL,
+        first_5min_move REAL,
+        opening_range REAL,
+        selected BOOLEAN
+    )
+    """)
+
+    # Index des requêtes du bot et des scripts view_*.sh
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS idx_trades_status_timestamp ON trades (status, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_trades_symbol_status ON trades (symbol, status)",
+        "CREATE INDEX IF NOT EXISTS idx_trades_date ON trades (date)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_scans_date_symbol ON daily_scans (date, symbol)",
+    ]:
+        cur.execute(statement)
+
+    db.commit()
+    return db
+
+
+# Latences par étape et par cycle (exposées sur METRICS_PORT)
+metrics = Metrics("sp500bot")
+metrics.describe("scan_stage_seconds", "Latence par étape du scan, tous symboles confondus (opening_data, score, db)")
+metrics.describe("scan_seconds", "Durée totale de scan_all_stocks")
+metrics.describe("stage_seconds", "Latence par étape du suivi des positions (current_data, exit_check) et par symbole (positions ouvertes, MAX_POSITIONS au plus)")
+metrics.describe("cycle_seconds", "Durée d'un cycle de la boucle principale (hors attente)")
+metrics.describe("cycle_overruns_total", "Cycles plus longs que LOOP_INTERVAL")
 
 portfolio = {
     "capital": INITIAL_CAPITAL,
@@ -239,15 +266,18 @@ def scan_all_stocks():
     
     results = []
     today = get_current_time().strftime('%Y-%m-%d')
+    scan_start = time.perf_counter()
     
     for i, symbol in enumerate(SP500_TICKERS, 1):
         if i % 50 == 0:
             print(f"   Progression: {i}/{len(SP500_TICKERS)} ({i/len(SP500_TICKERS)*100:.1f}%)")
         
-        data = get_opening_data(symbol)
+        with metrics.timer("scan_stage_seconds", stage="opening_data"):
+            data = get_opening_data(symbol)
         
         if data:
-            score = calculate_opening_score(data)
+            with metrics.timer("scan_stage_seconds", stage="score"):
+                score = calculate_opening_score(data)
             
             if score > 0:
                 results.append({
@@ -277,20 +307,20 @@ def scan_all_stocks():
                     False
                 ))
     
-    conn.commit()
-    
     # Trier par score et prendre les 20 meilleurs
     results.sort(key=lambda x: x['score'], reverse=True)
     top_20 = results[:MAX_POSITIONS]
     
-    # Marquer comme sélectionnés
+    # Marquer comme sélectionnés (même transaction : le scan apparaît complet, sélection comprise)
     for stock in top_20:
         cursor.execute("""
             UPDATE daily_scans 
             SET selected = TRUE 
             WHERE date = ? AND symbol = ?
         """, (today, stock['symbol']))
-    conn.commit()
+    with metrics.timer("scan_stage_seconds", stage="db"):
+        conn.commit()
+    metrics.observe("scan_seconds", time.perf_counter() - scan_start)
     
     # Afficher les résultats
     print()
@@ -309,6 +339,15 @@ def scan_all_stocks():
     return top_20
 
 
+def quick_rsi(close):
+    """RSI 14 rapide (moyennes simples des gains et pertes) sur une série de clôtures"""
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = -delta.where(delta < 0, 0).rolling(14).mean()
+    rs = gain / (loss + 1e-10)
+    return 100 - (100 / (1 + rs))
+
+
 def get_current_data(symbol):
     """Récupère les données actuelles pour un ticker"""
     try:
@@ -319,13 +358,7 @@ def get_current_data(symbol):
             return None
         
         price = df['Close'].iloc[-1]
-        
-        # Calcul RSI rapide
-        delta = df['Close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = -delta.where(delta < 0, 0).rolling(14).mean()
-        rs = gain / (loss + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
+        rsi = quick_rsi(df['Close'])
         
         return {
             "price": price,
@@ -367,8 +400,6 @@ def open_position(stock_data):
         "score": score
     }
     
-    portfolio['positions'][symbol] = position
-    
     # Sauvegarder en BDD
     today = get_current_time().strftime('%Y-%m-%d')
     cursor.execute("""
@@ -383,6 +414,9 @@ def open_position(stock_data):
     ))
     conn.commit()
     
+    position["id"] = cursor.lastrowid  # Clé primaire de la ligne trades (fermeture par id)
+    portfolio['positions'][symbol] = position
+    
     print(f"\n{'='*70}")
     print(f"🟢 POSITION OUVERTE: {side} {symbol}")
     print(f"   Prix: ${price:.2f} | Actions: {shares} (${shares * price:.2f})")
@@ -421,9 +455,8 @@ def close_position(symbol, exit_price, reason):
         UPDATE trades 
         SET exit_price = ?, pnl = ?, pnl_pct = ?, duration_minutes = ?, 
             exit_reason = ?, status = 'CLOSED'
-        WHERE symbol = ? AND status = 'OPEN'
-        ORDER BY id DESC LIMIT 1
-    """, (exit_price, pnl_usd, pnl_pct * 100, duration, reason, symbol))
+        WHERE id = ?
+    """, (exit_price, pnl_usd, pnl_pct * 100, duration, reason, pos['id']))
     conn.commit()
     
     win_rate = portfolio["winning_trades"] / portfolio["total_trades"] * 100 if portfolio["total_trades"] > 0 else 0
@@ -490,102 +523,134 @@ def check_exit_conditions(symbol, current_price):
     return False
 
 
+def record_cycle_metrics(elapsed):
+    """Durée du cycle, dépassements de LOOP_INTERVAL et état du portfolio"""
+    metrics.observe("cycle_seconds", elapsed)
+    if elapsed > LOOP_INTERVAL:
+        metrics.inc("cycle_overruns_total")
+    metrics.set("cycle_last_seconds", elapsed)
+    metrics.set("loop_interval_seconds", LOOP_INTERVAL)
+    metrics.set("open_positions", len(portfolio["positions"]))
+    metrics.set("capital_usd", portfolio["capital"])
+
+
 # ==================== BOUCLE PRINCIPALE ====================
-print("\n" + "="*70)
-print("📈 S&P 500 DAY TRADING BOT - STRATÉGIE OUVERTURE")
-print("="*70)
-print(f"Capital: ${INITIAL_CAPITAL:,}")
-print(f"Max positions: {MAX_POSITIONS}")
-print(f"Univers: {len(SP500_TICKERS)} actions")
-print(f"Database: {DB_FILE}")
-print("="*70)
-print()
-print("⏰ Horaires:")
-print("   - 9h30 : Ouverture du marché")
-print("   - 9h45 : Début du scan (attente 15 min)")
-print("   - 15h30 : Fermeture forcée de toutes les positions")
-print("="*70)
-print()
-
-while True:
-    try:
-        now = get_current_time()
-        today = now.strftime('%Y-%m-%d')
+def main():
+    """Boucle principale du bot"""
+    global conn, cursor
+    
+    conn = init_db(DB_FILE)
+    cursor = conn.cursor()
+    
+    print("\n" + "="*70)
+    print("📈 S&P 500 DAY TRADING BOT - STRATÉGIE OUVERTURE")
+    print("="*70)
+    print(f"Capital: ${INITIAL_CAPITAL:,}")
+    print(f"Max positions: {MAX_POSITIONS}")
+    print(f"Univers: {len(SP500_TICKERS)} actions")
+    print(f"Database: {DB_FILE}")
+    print("="*70)
+    print()
+    print("⏰ Horaires:")
+    print("   - 9h30 : Ouverture du marché")
+    print("   - 9h45 : Début du scan (attente 15 min)")
+    print("   - 15h30 : Fermeture forcée de toutes les positions")
+    print("="*70)
+    print()
+
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+        print(f"📈 Métriques: http://127.0.0.1:{METRICS_PORT}/metrics\n")
+
+    while True:
+        try:
+            now = get_current_time()
+            today = now.strftime('%Y-%m-%d')
         
-        # Nouveau jour : reset
-        if portfolio['today_date'] != today:
-            portfolio['today_date'] = today
-            portfolio['scan_done'] = False
-            portfolio['capital'] = INITIAL_CAPITAL
-            portfolio['total_pnl'] = 0
-            portfolio['total_trades'] = 0
-            portfolio['winning_trades'] = 0
-            portfolio['positions'] = {}
-            print(f"\n🌅 Nouveau jour de trading: {today}\n")
+            # Nouveau jour : reset
+            if portfolio['today_date'] != today:
+                portfolio['today_date'] = today
+                portfolio['scan_done'] = False
+                portfolio['capital'] = INITIAL_CAPITAL
+                portfolio['total_pnl'] = 0
+                portfolio['total_trades'] = 0
+                portfolio['winning_trades'] = 0
+                portfolio['positions'] = {}
+                print(f"\n🌅 Nouveau jour de trading: {today}\n")
         
-        # Vérifier si le marché est ouvert
-        if not is_market_open():
-            print(f"[{now.strftime('%H:%M:%S')}] 💤 Marché fermé. Attente...")
-            time.sleep(60)
-            continue
+            # Vérifier si le marché est ouvert
+            if not is_market_open():
+                metrics.set("market_open", 0)
+                print(f"[{now.strftime('%H:%M:%S')}] 💤 Marché fermé. Attente...")
+                time.sleep(60)
+                continue
         
-        # Scanner à 9h45
-        if not portfolio['scan_done'] and is_ready_to_scan():
-            top_stocks = scan_all_stocks()
-            portfolio['scan_done'] = True
+            cycle_start = time.perf_counter()
+            metrics.set("market_open", 1)
+        
+            # Scanner à 9h45
+            if not portfolio['scan_done'] and is_ready_to_scan():
+                top_stocks = scan_all_stocks()
+                portfolio['scan_done'] = True
             
-            # Ouvrir des positions sur les top 20
-            for stock in top_stocks:
-                if stock['score'] >= MIN_SCORE:
-                    open_position(stock)
+                # Ouvrir des positions sur les top 20
+                for stock in top_stocks:
+                    if stock['score'] >= MIN_SCORE:
+                        open_position(stock)
             
-            print(f"\n✅ {len(portfolio['positions'])} positions ouvertes\n")
+                print(f"\n✅ {len(portfolio['positions'])} positions ouvertes\n")
         
-        # Gérer les positions ouvertes
-        if portfolio['positions']:
-            print(f"[{now.strftime('%H:%M:%S')}] 📊 Suivi des positions ({len(portfolio['positions'])} actives)")
+            # Gérer les positions ouvertes
+            if portfolio['positions']:
+                print(f"[{now.strftime('%H:%M:%S')}] 📊 Suivi des positions ({len(portfolio['positions'])} actives)")
             
-            for symbol in list(portfolio['positions'].keys()):
-                data = get_current_data(symbol)
+                for symbol in list(portfolio['positions'].keys()):
+                    with metrics.timer("stage_seconds", stage="current_data", symbol=symbol):
+                        data = get_current_data(symbol)
                 
-                if data:
-                    pos = portfolio['positions'][symbol]
-                    duration = (datetime.now() - pos['entry_time']).total_seconds() / 60
+                    if data:
+                        pos = portfolio['positions'][symbol]
+                        duration = (datetime.now() - pos['entry_time']).total_seconds() / 60
                     
-                    if pos['side'] == "LONG":
-                        pnl_pct = (data['price'] - pos['entry_price']) / pos['entry_price'] * 100
-                    else:
-                        pnl_pct = (pos['entry_price'] - data['price']) / pos['entry_price'] * 100
+                        if pos['side'] == "LONG":
+                            pnl_pct = (data['price'] - pos['entry_price']) / pos['entry_price'] * 100
+                        else:
+                            pnl_pct = (pos['entry_price'] - data['price']) / pos['entry_price'] * 100
                     
-                    pnl_usd = pnl_pct * pos['size_usd'] / 100
-                    pnl_emoji = "🟢" if pnl_usd > 0 else "🔴" if pnl_usd < 0 else "⚪"
+                        pnl_usd = pnl_pct * pos['size_usd'] / 100
+                        pnl_emoji = "🟢" if pnl_usd > 0 else "🔴" if pnl_usd < 0 else "⚪"
                     
-                    print(f"   {pnl_emoji} {pos['side']:5} {symbol:6} | P&L: ${pnl_usd:+7.2f} ({pnl_pct:+.2f}%) | Durée: {int(duration)}min | Prix: ${data['price']:.2f}")
+                        print(f"   {pnl_emoji} {pos['side']:5} {symbol:6} | P&L: ${pnl_usd:+7.2f} ({pnl_pct:+.2f}%) | Durée: {int(duration)}min | Prix: ${data['price']:.2f}")
                     
-                    check_exit_conditions(symbol, data['price'])
+                        with metrics.timer("stage_seconds", stage="exit_check", symbol=symbol):
+                            check_exit_conditions(symbol, data['price'])
         
-        # Afficher le résumé
-        if portfolio['total_trades'] > 0:
-            win_rate = portfolio["winning_trades"] / portfolio["total_trades"] * 100
-            print(f"\n💰 Capital: ${portfolio['capital']:.2f} | P&L jour: ${portfolio['total_pnl']:+.2f} | Win Rate: {win_rate:.1f}%\n")
+            # Afficher le résumé
+            if portfolio['total_trades'] > 0:
+                win_rate = portfolio["winning_trades"] / portfolio["total_trades"] * 100
+                print(f"\n💰 Capital: ${portfolio['capital']:.2f} | P&L jour: ${portfolio['total_pnl']:+.2f} | Win Rate: {win_rate:.1f}%\n")
         
-        time.sleep(LOOP_INTERVAL)
+            record_cycle_metrics(time.perf_counter() - cycle_start)
+            time.sleep(LOOP_INTERVAL)
     
-    except KeyboardInterrupt:
-        print("\n\n🛑 Arrêt du bot...")
+        except KeyboardInterrupt:
+            print("\n\n🛑 Arrêt du bot...")
         
-        # Fermer toutes les positions
-        for symbol in list(portfolio['positions'].keys()):
-            data = get_current_data(symbol)
-            if data:
-                close_position(symbol, data['price'], "Arrêt manuel")
+            # Fermer toutes les positions
+            for symbol in list(portfolio['positions'].keys()):
+                data = get_current_data(symbol)
+                if data:
+                    close_position(symbol, data['price'], "Arrêt manuel")
         
-        print(f"\n💰 Capital final: ${portfolio['capital']:.2f}")
-        print(f"📊 P&L total: ${portfolio['total_pnl']:+.2f}")
-        conn.close()
-        break
+            print(f"\n💰 Capital final: ${portfolio['capital']:.2f}")
+            print(f"📊 P&L total: ${portfolio['total_pnl']:+.2f}")
+            conn.close()
+            break
     
-    except Exception as e:
-        print(f"❌ ERREUR: {e}")
-        time.sleep(60)
+        except Exception as e:
+            print(f"❌ ERREUR: {e}")
+            time.sleep(60)
+
 
+if __name__ == "__main__":
+    main()
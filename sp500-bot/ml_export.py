@@ -0,0 +1,246 @@
+"""Export colonnaire incrémental des tables SQLite pour l'entraînement ML
+
+Chaque table est exportée dans son dossier : un fichier binaire brut par
+colonne (<colonne>.bin) et un schema.json (types, lignes exportées, dernier id
+lu, ids en attente, vocabulaires). Les lignes d'id > dernier id lu sont lues
+par lots dans l'ordre des id. Une ligne n'est exportée qu'une fois définitive
+(FINAL_WHERE : trades fermés) ; les autres restent en attente (pending) et sont
+relues à chaque export jusqu'à ce qu'elles le deviennent. Un trade OPEN
+orphelin (jamais fermé) ne bloque donc pas les suivants. L'export reste en
+ajout seul, sans doublon ni mise à jour ; les lignes sont dans l'ordre où
+elles deviennent définitives (pas forcément celui des id).
+
+Types : id -> int64, INTEGER/REAL -> float64 (NULL = NaN), TEXT timestamp/date
+-> datetime64[ms], autres TEXT -> codes int32 d'un vocabulaire (NULL = -1),
+BOOLEAN -> int8 (NULL = -1).
+
+Lecture : load_columns() ouvre seulement les colonnes demandées, en memmap
+(aucune copie) ; load_frame() en fait un DataFrame (TEXT en Categorical).
+
+    python ml_export.py --db trading_simulation.db --out ml_data
+    python ml_export.py --db sp500_daytrading.db --tables daily_scans trades --out ml_data
+
+Même module dans crypto-bot/ et sp500-bot/ (chaque bot est autonome).
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 10_000
+DATETIME_COLUMNS = {"timestamp", "date"}
+FINAL_WHERE = {
+    "trades": "status = 'CLOSED'",   # Un trade OPEN sera encore mis à jour (sortie, P&L)
+}
+
+NAT = np.iinfo(np.int64).min
+DTYPES = {"id": "<i8", "float": "<f8", "datetime": "<i8", "category": "<i4", "bool": "i1"}
+FILL = {"id": 0, "float": math.nan, "datetime": NAT, "category": -1, "bool": -1}
+
+
+def column_kind(name, declared, pk):
+    """Type d'export d'une colonne SQLite (PRAGMA table_info)"""
+    declared = (declared or "").upper()
+    if pk:
+        return "id"
+    if declared.startswith("BOOL"):
+        return "bool"
+    if "INT" in declared or "REAL" in declared or "NUM" in declared:
+        return "float"
+    if name in DATETIME_COLUMNS:
+        return "datetime"
+    return "category"
+
+
+def exportable_tables(db):
+    """Tables avec une clé primaire entière `id` (watermark possible)"""
+    tables = []
+    for (table,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"):
+        info = db.execute(f"PRAGMA table_info({table})").fetchall()
+        if any(name == "id" and pk for _, name, _, _, _, pk in info):
+            tables.append(table)
+    return tables
+
+
+class TableExport:
+    """Dossier d'export d'une table : fichiers colonnes + schema.json"""
+
+    def __init__(self, root, table):
+        self.table = table
+        self.directory = os.path.join(root, table)
+        self.schema_path = os.path.join(self.directory, "schema.json")
+        try:
+            with open(self.schema_path) as f:
+                self.schema = json.load(f)
+        except FileNotFoundError:
+            self.schema = {"table": table, "rows": 0, "last_id": 0, "columns": {}}
+
+    @property
+    def rows(self):
+        return self.schema["rows"]
+
+    def column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _repair(self):
+        """Tronque les colonnes écrites au-delà du dernier schema.json (export interrompu)"""
+        for name, column in self.schema["columns"].items():
+            size = self.rows * np.dtype(DTYPES[column["kind"]]).itemsize
+            path = self.column_path(name)
+            if os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _sync_columns(self, db):
+        """Ajoute les colonnes apparues dans la table (migrations), remplies pour les lignes déjà exportées"""
+        names = []
+        for _, name, declared, _, _, pk in db.execute(f"PRAGMA table_info({self.table})"):
+            names.append(name)
+            if name in self.schema["columns"]:
+                continue
+            kind = column_kind(name, declared, pk)
+            self.schema["columns"][name] = {"kind": kind, "sqlite_type": declared}
+            if kind == "category":
+                self.schema["columns"][name]["vocabulary"] = []
+            with open(self.column_path(name), "wb") as f:
+                np.full(self.rows, FILL[kind], dtype=DTYPES[kind]).tofile(f)
+        return names
+
+    def _encode(self, name, values):
+        column = self.schema["columns"][name]
+        kind = column["kind"]
+        if kind == "id":
+            return np.array(values, dtype=DTYPES[kind])
+        if kind == "float":
+            return np.array([math.nan if v is None else v for v in values], dtype=DTYPES[kind])
+        if kind == "bool":
+            return np.array([-1 if v is None else bool(v) for v in values], dtype=DTYPES[kind])
+        if kind == "datetime":
+            return np.array(values, dtype="datetime64[ms]").view(np.int64)
+        vocabulary = column["vocabulary"]
+        codes = {v: i for i, v in enumerate(vocabulary)}
+        out = np.empty(len(values), dtype=DTYPES[kind])
+        for i, v in enumerate(values):
+            if v is None:
+                out[i] = -1
+                continue
+            v = str(v)
+            if v not in codes:
+                codes[v] = len(vocabulary)
+                vocabulary.append(v)
+            out[i] = codes[v]
+        return out
+
+    def _write_schema(self):
+        tmp = self.schema_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.schema, f, indent=1)
+        os.replace(tmp, self.schema_path)  # Écriture atomique : fait foi pour les lignes exportées
+
+    def append_from(self, db, chunk_rows=CHUNK_ROWS):
+        """Ajoute les lignes devenues définitives depuis le dernier export ; retourne le nombre de lignes ajoutées"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._repair()
+        names = self._sync_columns(db)
+        id_index = names.index("id")
+
+        pending = self.schema.get("pending", [])
+        final = FINAL_WHERE.get(self.table, "1")
+        query = f"SELECT {', '.join(names)}, ({final}) FROM {self.table} WHERE id > ?"
+        params = [self.schema["last_id"]]
+        if pending:
+            query += f" OR id IN ({', '.join('?' * len(pending))})"
+            params += pending
+        cursor = db.execute(query + " ORDER BY id", params)
+
+        waiting = set()     # Lignes lues pas encore définitives (les ids en attente supprimés disparaissent)
+        added = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_rows)
+            if not chunk:
+                break
+            rows = []
+            for row in chunk:
+                if row[-1]:
+                    rows.append(row[:-1])
+                else:
+                    waiting.add(row[id_index])
+            for name, values in zip(names, zip(*rows)):
+                with open(self.column_path(name), "ab") as f:
+                    self._encode(name, values).tofile(f)
+            self.schema["rows"] += len(rows)
+            self.schema["last_id"] = max(self.schema["last_id"], chunk[-1][id_index])
+            self.schema["pending"] = sorted(waiting | {i for i in pending if i > chunk[-1][id_index]})
+            self.schema["exported_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self._write_schema()
+            added += len(rows)
+        self.schema["pending"] = sorted(waiting)
+        self._write_schema()  # Attente à jour, colonnes ajoutées par une migration
+        return added
+
+
+def export_db(db_path, root, tables=None, chunk_rows=CHUNK_ROWS):
+    """Exporte les tables (toutes les tables à id par défaut) ; retourne {table: lignes ajoutées}"""
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)  # Lecture seule : ne bloque pas le bot (WAL)
+    try:
+        tables = tables or exportable_tables(db)
+        return {table: TableExport(root, table).append_from(db, chunk_rows) for table in tables}
+    finally:
+        db.close()
+
+
+def load_columns(root, table, columns=None):
+    """{colonne: tableau memmap en lecture seule} (datetime en datetime64[ms], TEXT en codes int32)"""
+    export = TableExport(root, table)
+    names = columns or list(export.schema["columns"])
+    out = {}
+    for name in names:
+        column = export.schema["columns"][name]
+        dtype = DTYPES[column["kind"]]
+        if export.rows == 0:
+            data = np.empty(0, dtype=dtype)
+        else:
+            data = np.memmap(export.column_path(name), dtype=dtype, mode="r", shape=(export.rows,))
+        out[name] = data.view("datetime64[ms]") if column["kind"] == "datetime" else data
+    return out
+
+
+def vocabulary(root, table, column):
+    """Valeurs des codes d'une colonne TEXT"""
+    return TableExport(root, table).schema["columns"][column]["vocabulary"]
+
+
+def load_frame(root, table, columns=None):
+    """DataFrame des colonnes demandées (TEXT en pandas.Categorical)"""
+    export = TableExport(root, table)
+    data = {}
+    for name, values in load_columns(root, table, columns).items():
+        column = export.schema["columns"][name]
+        if column["kind"] == "category":
+            values = pd.Categorical.from_codes(values, categories=column["vocabulary"])
+        data[name] = values
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export colonnaire incrémental des tables SQLite (ML)")
+    parser.add_argument("--db", required=True, help="base SQLite du bot")
+    parser.add_argument("--tables", nargs="+", help="tables à exporter (défaut : toutes les tables à id)")
+    parser.add_argument("--out", default="ml_data", help="dossier d'export")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="lignes lues par lot")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    added = export_db(args.db, args.out, args.tables, args.chunk)
+    for table, count in added.items():
+        print(f"💾 {table}: +{count} lignes ({TableExport(args.out, table).rows} au total)")
+    print(f"⏱️ Export en {time.perf_counter() - start:.2f}s -> {args.out}/")
+
+
+if __name__ == "__main__":
+    main()